@@ -1,10 +1,14 @@
 import shutil
 import time
-import msvcrt
 import sys
 import os
 import base64
-from ctypes import *
+import bisect
+import gc
+import heapq
+import re
+import struct
+from collections import deque
 from datetime import datetime, date
 
 # App settings
@@ -12,6 +16,32 @@ FPS = 30  # screen refresh rate
 MIN_SIDE_WIDTH = 20  # min side panel width
 MAX_SIDE_WIDTH_PERCENT = 33  # max side %
 INFO_PANEL_HEIGHT = 7  # info panel height
+CURSOR_BLINK_INTERVAL = 0.5  # notes caret blink (seconds)
+ESC_SEQUENCE_TIMEOUT = 0.05  # wait for the rest of an escape sequence (POSIX)
+VIEWPORT_OVERSCAN = 2  # rows kept visible around the selection when a list scrolls
+SEARCH_RESULT_LIMIT = 200  # results listed by '/' search
+SEARCH_BUILD_MS = 8  # search indexing per idle frame after a load
+PALETTE_RESULT_LIMIT = 200  # topics listed by the Ctrl-P palette
+PALETTE_SCAN_MS = 10  # palette matching per frame; a longer scan resumes next frame
+UNDO_LIMIT_BYTES = int(os.environ.get("TODO_UNDO_KB", "4096")) * 1024  # undo history memory cap (0 = off)
+
+# Profiling (Ctrl-T toggles the overlay)
+PROFILE_MODE = os.environ.get("TODO_PROFILE", "0") != "0"  # start with the timing overlay shown
+PROFILE_TRACE = os.environ.get("TODO_PROFILE_TRACE")  # append one JSON line per frame to this file
+PROFILE_WINDOW = 300  # frames behind the overlay's p50/p99
+
+# Storage settings
+JOURNAL_MODE = os.environ.get("TODO_JOURNAL", "1") != "0"  # append changes instead of rewriting
+JOURNAL_COMPACT_BYTES = 4 * 1024 * 1024  # fold the journal into the snapshot past this size
+JOURNAL_HEADER = "TODO_JOURNAL_V2"  # records address topics by ID
+JOURNAL_HEADER_V1 = "TODO_JOURNAL_V1"  # older records used topic names; still replayed
+SNAPSHOT_HEADER_V2 = b"TODO_V2\n"  # binary snapshot; TODO_V1 text files are still read
+AUTOSAVE_QUIET_MS = int(os.environ.get("TODO_AUTOSAVE_MS", "1500"))  # autosave after this much quiet (0 = off)
+AUTOSAVE_CHANGES = int(os.environ.get("TODO_AUTOSAVE_CHANGES", "100"))  # ...or as soon as this many changes pile up
+
+# Dates
+NO_DEADLINE = date.max.toordinal() + 1  # sorts after every real deadline
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
 
 # Priority options
 PRIORITIES = ["High", "Medium", "Low", "None"]  # priorities
@@ -54,11 +84,20 @@ DISABLE_LINEWRAP = "\033[7l"
 DISABLE_SCROLL = "\033[r"
 ALT_SCREEN = "\033[?1049h"
 NORMAL_SCREEN = "\033[?1049l"
+BRACKETED_PASTE_ON = "\033[?2004h"  # pasted text arrives between PASTE_START and PASTE_END
+BRACKETED_PASTE_OFF = "\033[?2004l"
+PASTE_START = b"\x1b[200~"
+PASTE_END = b"\x1b[201~"
 
 # Windows settings
+STD_INPUT_HANDLE = -10
 STD_OUTPUT_HANDLE = -11
 ENABLE_VIRTUAL_TERMINAL_PROCESSING = 0x0004
 ENABLE_PROCESSED_OUTPUT = 0x0001
+ENABLE_WINDOW_INPUT = 0x0008  # deliver resize events to the input handle
+WAIT_OBJECT_0 = 0
+INFINITE = 0xFFFFFFFF
+FOCUS_EVENT = 0x0010  # harmless input record used to wake the input wait
 HELP_COLOR = "\033[96m"  # light cyan for help text
 ALERT_BG = "\033[41m"  # red background for alert badge
 
@@ -66,8 +105,8 @@ ALERT_BG = "\033[41m"  # red background for alert badge
 app_state = {
     "active_tab": "topics",  # topics/todos/notes
     "nav_mode": True,        # nav vs focus
-    "topics": [],           # topics list
-    "todos": {},           # todos by topic
+    "topics": None,         # TopicRegistry: topic IDs in display order
+    "todos": {},           # todos by topic ID
     "topic_index": 0,       # selected topic
     "todo_index": 0,        # selected todo
     "last_topic_index": 0,  # last topic
@@ -77,7 +116,21 @@ app_state = {
     "input_callback": None,  # input done callback
     "multi_step_data": {},  # multi-step state
     "todo_priority": 0,     # default priority
-    "sort_mode": "priority"  # current sort
+    "sort_mode": "priority",  # current sort
+    "topic_scroll": 0,       # first visible topic row
+    "todo_scroll": 0,        # first visible todo row
+    "notes_scroll": 0,       # first visible notes row
+    "search_mode": False,    # '/' search active
+    "search_query": "",      # search text
+    "search_results": [],    # (topic, todo or None) matches
+    "search_total": 0,       # match count (results are capped)
+    "search_pos": 0,         # selected result
+    "palette_mode": False,   # Ctrl-P topic palette active
+    "palette_query": "",     # palette text
+    "palette_results": [],   # ranked topic indices
+    "palette_total": 0,      # match count (results are capped)
+    "palette_partial": False,  # not every topic was scanned: palette_total is a lower bound
+    "palette_pos": 0         # selected result
 }
 
 # status message shown briefly in the Info box
@@ -89,6 +142,15 @@ app_state["notes_selection_anchor"] = None  # raw offset where selection started
 app_state["clipboard"] = ""
 app_state["_cursor_last_blink"] = time.time()
 app_state["_cursor_visible"] = True
+# Today's day ordinal, refreshed when the date rolls over (see today_ordinal)
+app_state["_today_ordinal"] = 0
+app_state["_today_until"] = 0
+
+# DD-MM-YYYY -> day ordinal (see deadline_ordinal)
+_deadline_ordinals = {}
+# day ordinal -> DD-MM-YYYY (see deadline_text)
+_deadline_texts = {}
+_TWO_DIGITS = [f"{i:02}" for i in range(100)]
 
 
 def get_data_path():
@@ -97,322 +159,2776 @@ def get_data_path():
     return os.path.join(base, "todos.todo")
 
 
-def save_data(path=None):
-    """Serialize app_state topics/todos to a simple text .todo file.
+def get_journal_path(path):
+    """Return the journal file that accompanies the snapshot at `path`."""
+    return path + ".journal"
 
-    Format (TODO_V1):
-    TODO_V1
-    TOPIC:<topic_name>
-    NUM_TODOS:<n>
-    TODO_META:<name>\x1f<priority>\x1f<completed>\x1f<created_at>\x1f<deadline>\x1f<notes_b64>
-    ...
+
+def deadline_ordinal(deadline_str):
+    """Day ordinal of a DD-MM-YYYY deadline; NO_DEADLINE if empty or invalid.
+
+    Results are cached per string since many todos share a date.
     """
-    if path is None:
-        path = get_data_path()
+    if not deadline_str:
+        return NO_DEADLINE
+    ordinal = _deadline_ordinals.get(deadline_str)
+    if ordinal is None:
+        try:
+            ordinal = datetime.strptime(deadline_str, "%d-%m-%Y").toordinal()
+        except (ValueError, TypeError):
+            ordinal = NO_DEADLINE
+        _deadline_ordinals[deadline_str] = ordinal
+    return ordinal
+
+
+def deadline_text(ordinal):
+    """DD-MM-YYYY string of a day ordinal; the inverse of deadline_ordinal"""
+    text = _deadline_texts.get(ordinal)
+    if text is None:
+        d = date.fromordinal(ordinal)
+        text = _deadline_texts[ordinal] = sys.intern(f"{d.day:02}-{d.month:02}-{d.year:04}")
+    return text
+
+
+def created_text(ts):
+    """'DD-MM-YYYY HH:MM:SS' stamp of a created_timestamp value"""
+    days, rest = divmod(ts, 86400)
+    digits = _TWO_DIGITS
+    return f"{deadline_text(EPOCH_ORDINAL + days)} {digits[rest // 3600]}:{digits[rest // 60 % 60]}:{digits[rest % 60]}"
+
+
+def created_timestamp(created):
+    """Seconds since 1970-01-01 (local wall clock) of a 'DD-MM-YYYY HH:MM:SS' stamp; 0 if invalid"""
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            f.write("TODO_V1\n")
-            for topic in app_state.get("topics", []):
-                f.write(f"TOPIC:{topic}\n")
-                todos = app_state.get("todos", {}).get(topic, [])
-                f.write(f"NUM_TODOS:{len(todos)}\n")
-                for t in todos:
-                    notes = t.get("notes", "") or ""
-                    notes_b64 = base64.b64encode(notes.encode("utf-8")).decode("ascii")
-                    name = (t.get("name") or "").replace("\n", "\\n")
-                    created = t.get("created_at", "")
-                    deadline = t.get("deadline", "") or ""
-                    completed = "1" if t.get("completed") else "0"
-                    meta = "\x1f".join([name, str(t.get("priority", 3)), completed, created, deadline, notes_b64])
-                    f.write("TODO_META:" + meta + "\n")
-        # set status message
-        app_state["status_msg"] = f"Saved {os.path.basename(path)}"
-        app_state["status_msg_until"] = time.time() + 2
-        return True
-    except Exception as e:
-        app_state["status_msg"] = f"Save failed: {e}"
-        app_state["status_msg_until"] = time.time() + 3
-        return False
+        if created[2] != "-" or created[5] != "-" or created[10] != " ":
+            return 0
+        days = date(int(created[6:10]), int(created[3:5]), int(created[0:2])).toordinal() - EPOCH_ORDINAL
+        return days * 86400 + int(created[11:13]) * 3600 + int(created[14:16]) * 60 + int(created[17:19])
+    except (ValueError, IndexError, TypeError):
+        return 0
 
 
-def load_data(path=None):
-    """Deserialize the .todo file into app_state.
-    If file missing or invalid, do nothing.
+class FenwickTree:
+    """Prefix sums over a list of non-negative ints.
+
+    add() and find() are O(log n); rebuild() is O(n).
     """
-    if path is None:
-        path = get_data_path()
-    if not os.path.exists(path):
-        return False
+
+    __slots__ = ("tree", "size")
+
+    def __init__(self, values=()):
+        self.rebuild(values)
+
+    def rebuild(self, values):
+        tree = [0]
+        tree.extend(values)
+        n = len(tree) - 1
+        for i in range(1, n + 1):
+            j = i + (i & -i)
+            if j <= n:
+                tree[j] += tree[i]
+        self.tree = tree
+        self.size = n
+
+    def add(self, i, delta):
+        """values[i] += delta"""
+        tree = self.tree
+        n = self.size
+        i += 1
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i):
+        """Sum of values[:i]"""
+        tree = self.tree
+        total = 0
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, target):
+        """Return (i, rest): the element holding position `target` of the
+        concatenated values and the position inside it.
+
+        Zero-length elements are skipped; past the end, i == size.
+        """
+        tree = self.tree
+        n = self.size
+        pos = 0
+        rest = target
+        step = 1 << n.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt <= n and tree[nxt] <= rest:
+                pos = nxt
+                rest -= tree[nxt]
+            step >>= 1
+        return pos, rest
+
+
+class NotesBuffer:
+    """Editable notes text: a rope of string chunks indexed by a FenwickTree.
+
+    insert/delete touch one chunk of at most 2 * CHUNK characters plus an
+    O(log n) index update, so editing cost does not grow with the note.
+    The flat string is built only when asked for (saving, rendering) and
+    cached until the next edit.
+    """
+
+    CHUNK = 1024
+
+    __slots__ = ("chunks", "index", "length", "version", "_flat", "_wrap")
+
+    def __init__(self, text=""):
+        size = NotesBuffer.CHUNK
+        self.chunks = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        self.index = FenwickTree([len(c) for c in self.chunks])
+        self.length = len(text)
+        self.version = 0
+        self._flat = text
+        self._wrap = None
+
+    def __len__(self):
+        return self.length
+
+    def locate(self, offset):
+        """(chunk index, offset inside it) for a text offset"""
+        if offset >= self.length:
+            return len(self.chunks) - 1, len(self.chunks[-1])
+        return self.index.find(offset)
+
+    def changed(self):
+        self.version += 1
+        self._flat = None
+
+    def reindex(self):
+        self.index.rebuild([len(c) for c in self.chunks])
+
+    def insert(self, offset, text):
+        self.replace(offset, offset, text)
+
+    def delete(self, start, end):
+        self.replace(start, end, "")
+
+    def replace(self, start, end, text):
+        start = max(0, min(start, self.length))
+        end = max(start, min(end, self.length))
+        if start == end and not text:
+            return
+        if self._wrap is not None:
+            self._wrap.edit(start, self.slice(start, end), text)
+        self._delete(start, end)
+        self._insert(start, text)
+        if self._wrap is not None:
+            self._wrap.version = self.version
+
+    def _insert(self, offset, text):
+        if not text:
+            return
+        i, lo = self.locate(offset)
+        chunk = self.chunks[i]
+        chunk = chunk[:lo] + text + chunk[lo:]
+        size = NotesBuffer.CHUNK
+        if len(chunk) <= 2 * size:
+            self.chunks[i] = chunk
+            self.index.add(i, len(text))
+        else:
+            self.chunks[i:i + 1] = [chunk[k:k + size] for k in range(0, len(chunk), size)]
+            self.reindex()
+        self.length += len(text)
+        self.changed()
+
+    def _delete(self, start, end):
+        if start >= end:
+            return
+        i, lo = self.locate(start)
+        j, hi = self.locate(end)
+        if i == j:
+            chunk = self.chunks[i]
+            self.chunks[i] = chunk[:lo] + chunk[hi:]
+            if self.chunks[i] or len(self.chunks) == 1:
+                self.index.add(i, start - end)
+            else:
+                del self.chunks[i]
+                self.reindex()
+        else:
+            merged = self.chunks[i][:lo] + self.chunks[j][hi:]
+            size = NotesBuffer.CHUNK
+            if len(merged) <= 2 * size:
+                self.chunks[i:j + 1] = [merged] if merged else []
+            else:
+                self.chunks[i:j + 1] = [merged[k:k + size] for k in range(0, len(merged), size)]
+            if not self.chunks:
+                self.chunks = [""]
+            self.reindex()
+        self.length -= end - start
+        self.changed()
+
+    def slice(self, start, end):
+        """Return text[start:end] without flattening the whole buffer"""
+        start = max(0, start)
+        end = min(end, self.length)
+        if start >= end:
+            return ""
+        if self._flat is not None:
+            return self._flat[start:end]
+        i, lo = self.locate(start)
+        parts = []
+        need = end - start
+        while need > 0 and i < len(self.chunks):
+            piece = self.chunks[i][lo:lo + need]
+            parts.append(piece)
+            need -= len(piece)
+            i += 1
+            lo = 0
+        return "".join(parts)
+
+    def text(self):
+        if self._flat is None:
+            self._flat = "".join(self.chunks)
+        return self._flat
+
+    def wrap_index(self, width):
+        """WrapIndex for this text at `width`, kept up to date across edits"""
+        wrap = self._wrap
+        if wrap is None or wrap.width != width or wrap.version != self.version:
+            wrap = self._wrap = WrapIndex(self.text(), width, self.version)
+        return wrap
+
+
+class WrapIndex:
+    """Paragraph and wrapped-row layout of a note at one width.
+
+    Paragraph lengths (plus their newline) and row counts are kept in two
+    FenwickTrees, so offset <-> (row, col) is two O(log n) lookups. An edit
+    that neither adds nor removes a newline only re-wraps its paragraph;
+    splitting or joining paragraphs splices the length list and rebuilds.
+    A paragraph of n characters takes ceil(n / width) rows, an empty one
+    a single row.
+    """
+
+    __slots__ = ("width", "version", "lengths", "offsets", "rows")
+
+    def __init__(self, text, width, version=0):
+        self.width = max(1, width)
+        self.version = version
+        self.lengths = [len(p) for p in text.split("\n")]
+        self.reindex()
+
+    def reindex(self):
+        self.offsets = FenwickTree([n + 1 for n in self.lengths])
+        self.rows = FenwickTree([self.row_count(n) for n in self.lengths])
+
+    def row_count(self, n):
+        return (n + self.width - 1) // self.width if n else 1
+
+    def total_rows(self):
+        return self.rows.prefix(len(self.lengths))
+
+    def paragraph_at(self, offset):
+        """(paragraph, offset inside it); a newline belongs to the paragraph it ends"""
+        p, k = self.offsets.find(max(0, offset))
+        if p >= len(self.lengths):
+            p = len(self.lengths) - 1
+            k = self.lengths[p]
+        return p, k
+
+    def offset_to_rowcol(self, offset):
+        p, k = self.paragraph_at(offset)
+        r = min(k // self.width, self.row_count(self.lengths[p]) - 1)
+        return self.rows.prefix(p) + r, k - r * self.width
+
+    def rowcol_to_offset(self, row, col):
+        """Offset of display (row, col), clamped to the row's text"""
+        if row < 0:
+            return 0
+        p, r = self.rows.find(row)
+        if p >= len(self.lengths):
+            p = len(self.lengths) - 1
+            return self.offsets.prefix(p) + self.lengths[p]
+        start = r * self.width
+        line_len = min(self.width, self.lengths[p] - start)
+        return self.offsets.prefix(p) + start + max(0, min(col, line_len))
+
+    def row_spans(self, first, count):
+        """(start offset, length) of display rows first .. first + count - 1"""
+        spans = []
+        p, r = self.rows.find(max(0, first))
+        if p >= len(self.lengths):
+            return spans
+        off = self.offsets.prefix(p)
+        width = self.width
+        while len(spans) < count and p < len(self.lengths):
+            n = self.lengths[p]
+            start = r * width
+            spans.append((off + start, max(0, min(width, n - start))))
+            r += 1
+            if r >= self.row_count(n):
+                off += n + 1
+                p += 1
+                r = 0
+        return spans
+
+    def edit(self, start, removed, text):
+        """Update for text[start:start + len(removed)] being replaced by `text`"""
+        p, k = self.paragraph_at(start)
+        lengths = self.lengths
+        if "\n" not in removed and "\n" not in text:
+            n = lengths[p]
+            lengths[p] = n + len(text) - len(removed)
+            self.offsets.add(p, len(text) - len(removed))
+            self.rows.add(p, self.row_count(lengths[p]) - self.row_count(n))
+            return
+        q, kq = self.paragraph_at(start + len(removed))
+        pieces = [len(piece) for piece in text.split("\n")]
+        pieces[0] += k
+        pieces[-1] += lengths[q] - kq
+        lengths[p:q + 1] = pieces
+        self.reindex()
+
+
+class Todo:
+    """A single todo.
+
+    Slotted to keep per-todo memory small (no per-instance dict). Notes may
+    stay base64-encoded until first read through `notes`. The deadline is
+    kept as a day ordinal next to its DD-MM-YYYY string, and created_at is
+    parsed to a timestamp on first use, so sorting and urgency checks are
+    integer compares. Existing callers can keep using dict-style access:
+    todo["name"], todo.get("deadline").
+    """
+
+    __slots__ = ("name", "priority", "completed", "created_at", "_deadline", "deadline_ord",
+                 "_created_ts", "_notes", "_notes_b64")
+
+    FIELDS = ("name", "priority", "completed", "created_at", "deadline", "notes")
+
+    def __init__(self, name="", priority=len(PRIORITIES) - 1, completed=False, created_at="",
+                 deadline=None, notes="", notes_b64=None):
+        self.name = name
+        self.priority = priority
+        self.completed = completed
+        self.created_at = created_at
+        self._created_ts = None
+        self.deadline = deadline
+        self._notes = None if notes_b64 else notes
+        self._notes_b64 = notes_b64 or None
+
+    @property
+    def deadline(self):
+        """DD-MM-YYYY deadline string or None"""
+        return self._deadline
+
+    @deadline.setter
+    def deadline(self, value):
+        self._deadline = value or None
+        self.deadline_ord = deadline_ordinal(value)
+
+    @property
+    def created_ts(self):
+        """created_at as seconds since 1970-01-01, parsed once"""
+        if self._created_ts is None:
+            self._created_ts = created_timestamp(self.created_at)
+        return self._created_ts
+
+    @property
+    def notes(self):
+        """Notes text, decoded from base64 on first access"""
+        notes = self._notes
+        if notes is None:
+            try:
+                notes = base64.b64decode(self._notes_b64.encode("ascii")).decode("utf-8")
+            except Exception:
+                notes = ""
+            self._notes = notes
+            self._notes_b64 = None
+        elif type(notes) is NotesBuffer:
+            return notes.text()
+        return notes
+
+    def notes_size(self):
+        """Length of the stored notes (base64 if never decoded) without decoding"""
+        return len(self._notes_b64 or self._notes or "")
+
+    def notes_buffer(self):
+        """Return the editable NotesBuffer, converting the notes on first edit"""
+        if type(self._notes) is not NotesBuffer:
+            self._notes = NotesBuffer(self.notes)
+        return self._notes
+
+    @notes.setter
+    def notes(self, value):
+        self._notes = value or ""
+        self._notes_b64 = None
+
+    @property
+    def notes_b64(self):
+        """Stored base64 notes if they were never decoded, else None"""
+        return self._notes_b64
+
+    # Dict-compatible view
+    def __getitem__(self, key):
+        if key not in Todo.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in Todo.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in Todo.FIELDS
+
+    def get(self, key, default=None):
+        if key not in Todo.FIELDS:
+            return default
+        return getattr(self, key)
+
+    def keys(self):
+        return list(Todo.FIELDS)
+
+    def __repr__(self):
+        return f"Todo({self.name!r}, priority={self.priority}, completed={self.completed})"
+
+
+def get_notes(todo):
+    """Return a todo's notes, decoding the stored base64 on first use."""
+    return todo.notes or ""
+
+
+def encode_notes(todo):
+    """Return the base64 form of a todo's notes without decoding lazy ones."""
+    if todo.notes_b64 is not None:
+        return todo.notes_b64
+    notes = todo.notes
+    return base64.b64encode(notes.encode("utf-8")).decode("ascii") if notes else ""
+
+
+def format_todo_meta(t):
+    """Return the six TODO_META fields for a todo"""
+    return [
+        (t.name or "").replace("\n", "\\n"),
+        str(t.priority),
+        "1" if t.completed else "0",
+        t.created_at or "",
+        t.deadline or "",
+        encode_notes(t),
+    ]
+
+
+def parse_todo_meta(parts):
+    """Build a Todo from TODO_META fields (None if malformed).
+
+    Notes stay base64-encoded until first read (see Todo.notes).
+    """
+    if len(parts) < 6:
+        return None
+    return Todo(
+        parts[0].replace("\\n", "\n"),
+        min(int(parts[1]), len(PRIORITIES) - 1) if parts[1].isdigit() else len(PRIORITIES) - 1,
+        parts[2] == "1",
+        parts[3],
+        # deadlines repeat a lot; share one string per distinct date
+        sys.intern(parts[4]) if parts[4] else None,
+        "",
+        parts[5] or None,
+    )
+
+
+class TopicRegistry:
+    """Topics by stable integer ID, kept in display order.
+
+    Indexing and iteration yield IDs: app_state["topics"][i] is the ID of the
+    i-th topic and app_state["todos"] is keyed by ID, so topics can share a
+    name and a rename touches one dict entry. The order is a chunked list
+    indexed by a FenwickTree of chunk sizes (like NotesBuffer): position
+    lookups are O(log n) and insert/delete/move shift at most one chunk.
+    """
+
+    CHUNK = 512
+
+    def __init__(self):
+        self.names = {}  # id -> name
+        self.by_name = {}  # name -> ids with that name, oldest first
+        self.chunks = [[]]
+        self.sizes = FenwickTree([0])
+        self.chunk_of = {}  # id -> the chunk list holding it
+        self.chunk_pos = {}  # id(chunk) -> its index in chunks
+        self.next_id = 0
+        self.renumber()
+
+    def renumber(self):
+        self.chunk_pos = {id(chunk): i for i, chunk in enumerate(self.chunks)}
+        self.sizes.rebuild([len(chunk) for chunk in self.chunks])
+
+    def __len__(self):
+        return self.sizes.prefix(len(self.chunks))
+
+    def __bool__(self):
+        return bool(self.names)
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            yield from chunk
+
+    def __contains__(self, topic_id):
+        return topic_id in self.names
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += len(self)
+        i, rest = self.sizes.find(position)
+        if position < 0 or i >= len(self.chunks):
+            raise IndexError("topic position out of range")
+        return self.chunks[i][rest]
+
+    def index(self, topic_id):
+        """Display position of a topic (ValueError if unknown)"""
+        chunk = self.chunk_of.get(topic_id)
+        if chunk is None:
+            raise ValueError(f"no topic with id {topic_id}")
+        return self.sizes.prefix(self.chunk_pos[id(chunk)]) + chunk.index(topic_id)
+
+    def name(self, topic_id):
+        return self.names.get(topic_id, "")
+
+    def id_of(self, name):
+        """ID of the oldest topic called `name`, or None"""
+        ids = self.by_name.get(name)
+        return ids[0] if ids else None
+
+    def place(self, topic_id, position):
+        if position is None or position >= len(self):
+            i = len(self.chunks) - 1
+            rest = len(self.chunks[i])
+        else:
+            i, rest = self.sizes.find(max(0, position))
+        chunk = self.chunks[i]
+        chunk.insert(rest, topic_id)
+        self.chunk_of[topic_id] = chunk
+        if len(chunk) > 2 * TopicRegistry.CHUNK:
+            half = len(chunk) // 2
+            tail = chunk[half:]
+            del chunk[half:]
+            self.chunks.insert(i + 1, tail)
+            for moved in tail:
+                self.chunk_of[moved] = tail
+            self.renumber()
+        else:
+            self.sizes.add(i, 1)
+
+    def unplace(self, topic_id):
+        chunk = self.chunk_of.pop(topic_id)
+        i = self.chunk_pos[id(chunk)]
+        chunk.remove(topic_id)
+        if not chunk and len(self.chunks) > 1:
+            del self.chunks[i]
+            self.renumber()
+        else:
+            self.sizes.add(i, -1)
+
+    def add(self, name, position=None, topic_id=None):
+        """Insert a topic at `position` (default: the end); returns its ID"""
+        if topic_id is None:
+            topic_id = self.next_id
+        self.next_id = max(self.next_id, topic_id + 1)
+        self.names[topic_id] = name
+        bisect.insort(self.by_name.setdefault(name, []), topic_id)
+        self.place(topic_id, position)
+        return topic_id
+
+    def delete(self, topic_id):
+        self.unplace(topic_id)
+        name = self.names.pop(topic_id)
+        ids = self.by_name[name]
+        ids.remove(topic_id)
+        if not ids:
+            del self.by_name[name]
+
+    def rename(self, topic_id, name):
+        old = self.names[topic_id]
+        ids = self.by_name[old]
+        ids.remove(topic_id)
+        if not ids:
+            del self.by_name[old]
+        self.names[topic_id] = name
+        bisect.insort(self.by_name.setdefault(name, []), topic_id)
+
+    def move(self, topic_id, position):
+        self.unplace(topic_id)
+        self.place(topic_id, position)
+
+
+# app_state starts out with an empty registry
+app_state["topics"] = TopicRegistry()
+
+
+def topic_name(topic_id):
+    """Display name of a topic ID"""
+    return app_state["topics"].name(topic_id)
+
+
+def freeze_todo(t):
+    """Immutable copy of a Todo; notes stay base64 if they were never decoded"""
+    return (t.name, t.priority, t.completed, t.created_at, t.deadline,
+            t.notes if t.notes_b64 is None else None, t.notes_b64)
+
+
+def freeze_state():
+    """Copy topics/todos into immutable tuples a background writer can use.
+
+    Topics still undecoded in a TODO_V2 file (see LazyTodos) are passed on
+    as their raw (count, block) instead of a list of todos.
+    """
+    todos_map = app_state.get("todos", {})
+    lazy = isinstance(todos_map, LazyTodos)
+    if lazy and os.name == "nt":
+        todos_map.detach()  # Windows cannot replace a file that is mapped
+    topics = app_state["topics"]
+    frozen = []
+    for topic in topics:
+        raw = todos_map.raw(topic) if lazy else None
+        frozen.append((topic, topics.name(topic), raw if raw is not None else [
+            freeze_todo(t) for t in todos_map.get(topic, [])
+        ]))
+    return frozen
+
+
+def sync_dir(path):
+    """fsync the directory holding `path` so a rename into it is durable"""
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            lines = [ln.rstrip("\n") for ln in f]
-        if not lines or lines[0] != "TODO_V1":
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return  # Windows cannot open directories; its renames need no sync
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path, write, binary=False):
+    """Write a file through `write(f)` into <path>.tmp, fsync it and rename it
+    over `path`, so a crash leaves either the old file or the new one.
+    """
+    tmp = path + ".tmp"
+    try:
+        with (open(tmp, "wb") if binary else open(tmp, "w", encoding="utf-8", newline="\n")) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    sync_dir(path)
+
+
+def write_snapshot(f, frozen, seq=0):
+    """Write frozen state (see freeze_state) to `f` in TODO_V1 format.
+
+    JOURNAL_SEQ is the last journal record already contained in the snapshot.
+    """
+    f.write("TODO_V1\n")
+    f.write(f"JOURNAL_SEQ:{seq}\n")
+    for topic, name, todos in frozen:
+        if isinstance(todos, tuple):
+            todos = [freeze_todo(t) for t in decode_topic_block(todos[1], todos[0], 0)]
+        f.write(f"TOPIC_ID:{topic}\n")
+        f.write(f"TOPIC:{name}\n")
+        f.write(f"NUM_TODOS:{len(todos)}\n")
+        for todo_name, priority, completed, created, deadline, notes, notes_b64 in todos:
+            if notes_b64 is None:
+                notes_b64 = base64.b64encode(notes.encode("utf-8")).decode("ascii") if notes else ""
+            meta = [(todo_name or "").replace("\n", "\\n"), str(priority), "1" if completed else "0",
+                    created or "", deadline or "", notes_b64]
+            f.write("TODO_META:" + "\x1f".join(meta) + "\n")
+
+
+# TODO_V2 layout, all integers little-endian:
+#   SNAPSHOT_HEADER_V2, V2_HEADER (journal seq, topic count)
+#   per topic: V2_TOPIC (id, todo count, block offset, block length, name
+#     length), then the UTF-8 name
+#   per topic block of n todos: the columns priority u8[n], flags u8[n],
+#     deadline day ordinal i32[n] (0 = none or invalid), created timestamp
+#     i64[n], name length u32[n] and notes length u32[n]; then each todo's
+#     UTF-8 name and notes; then, for todos whose flags say a date column
+#     cannot reproduce the text exactly, the u32-length-prefixed deadline
+#     and/or created_at text
+V2_HEADER = struct.Struct("<QI")
+V2_TOPIC = struct.Struct("<IIQQI")
+V2_LENGTH = struct.Struct("<I")
+V2_DONE = 1
+V2_DEADLINE_TEXT = 2
+V2_CREATED_TEXT = 4
+V2_TEXT = V2_DEADLINE_TEXT | V2_CREATED_TEXT
+
+
+def encode_topic_block(todos):
+    """Encode frozen todos (see freeze_todo) as a TODO_V2 topic block"""
+    n = len(todos)
+    priorities = bytearray(n)
+    flags = bytearray(n)
+    deadlines = [0] * n
+    created = [0] * n
+    lengths = [0] * (2 * n)  # name lengths, then notes lengths
+    texts = []
+    extras = []
+    for i, (name, priority, completed, created_at, deadline, notes, notes_b64) in enumerate(todos):
+        priorities[i] = min(priority, 255)
+        flag = V2_DONE if completed else 0
+        if deadline:
+            ordinal = deadline_ordinal(deadline)
+            if ordinal != NO_DEADLINE:
+                deadlines[i] = ordinal  # what TopicStats counts, even when the text is kept
+            if ordinal == NO_DEADLINE or deadline_text(ordinal) != deadline:
+                flag |= V2_DEADLINE_TEXT
+                extras.append(deadline)
+        ts = created_timestamp(created_at or "")
+        if created_at and created_text(ts) == created_at:
+            created[i] = ts
+        else:
+            flag |= V2_CREATED_TEXT
+            extras.append(created_at or "")
+        flags[i] = flag
+        if notes_b64 is not None:
+            try:
+                notes = base64.b64decode(notes_b64.encode("ascii")).decode("utf-8")
+            except Exception:
+                notes = ""
+        name = (name or "").encode("utf-8")
+        notes = (notes or "").encode("utf-8")
+        lengths[i] = len(name)
+        lengths[n + i] = len(notes)
+        texts.append(name)
+        texts.append(notes)
+    for text in extras:
+        text = text.encode("utf-8")
+        texts.append(V2_LENGTH.pack(len(text)))
+        texts.append(text)
+    return b"".join([priorities, flags, struct.pack(f"<{n}i", *deadlines),
+                     struct.pack(f"<{n}q", *created), struct.pack(f"<{2 * n}I", *lengths)] + texts)
+
+
+def decode_topic_block(data, n, offset):
+    """Todos of the TODO_V2 topic block of `n` todos at `offset` in `data`.
+
+    A damaged block yields the todos before the damage.
+    """
+    todos = []
+    try:
+        priorities = data[offset:offset + n]
+        flags = data[offset + n:offset + 2 * n]
+        deadlines = struct.unpack_from(f"<{n}i", data, offset + 2 * n)
+        created = struct.unpack_from(f"<{n}q", data, offset + 6 * n)
+        lengths = struct.unpack_from(f"<{2 * n}I", data, offset + 14 * n)
+        pos = offset + 22 * n
+        last = len(PRIORITIES) - 1
+        for i in range(n):
+            middle = pos + lengths[i]
+            end = middle + lengths[n + i]
+            ordinal = deadlines[i]
+            todos.append(Todo(str(data[pos:middle], "utf-8"), min(priorities[i], last), bool(flags[i] & V2_DONE),
+                              created_text(created[i]), deadline_text(ordinal) if ordinal else None,
+                              str(data[middle:end], "utf-8")))
+            pos = end
+        for todo, flag in zip(todos, flags):
+            if not flag & V2_TEXT:
+                continue
+            texts = []
+            for _ in range(bool(flag & V2_DEADLINE_TEXT) + bool(flag & V2_CREATED_TEXT)):
+                (size,) = V2_LENGTH.unpack_from(data, pos)
+                pos += 4
+                texts.append(str(data[pos:pos + size], "utf-8"))
+                pos += size
+            if flag & V2_DEADLINE_TEXT:
+                todo.deadline = texts.pop(0)
+            if flag & V2_CREATED_TEXT:
+                todo.created_at = texts[0]
+    except (struct.error, ValueError, IndexError, OverflowError):
+        pass
+    return todos
+
+
+def write_snapshot_v2(f, frozen, seq=0):
+    """Write frozen state (see freeze_state) to binary `f` in TODO_V2 format"""
+    entries = []
+    blocks = []
+    for topic, name, todos in frozen:
+        if isinstance(todos, tuple):
+            count, block = todos  # still undecoded: copied through as is
+        else:
+            count, block = len(todos), encode_topic_block(todos)
+        entries.append((topic, count, name.encode("utf-8")))
+        blocks.append(block)
+    offset = len(SNAPSHOT_HEADER_V2) + V2_HEADER.size + sum(V2_TOPIC.size + len(e[2]) for e in entries)
+    f.write(SNAPSHOT_HEADER_V2)
+    f.write(V2_HEADER.pack(seq, len(entries)))
+    for (topic, count, name), block in zip(entries, blocks):
+        f.write(V2_TOPIC.pack(topic, count, offset, len(block), len(name)))
+        f.write(name)
+        offset += len(block)
+    for block in blocks:
+        f.write(block)
+
+
+class LazyTodos(dict):
+    """todos_map over a memory-mapped TODO_V2 file.
+
+    Topics are decoded into Todo lists on first access through [], get(),
+    setdefault() or pop(); until then they are just (count, offset, length)
+    in `blocks`. `in` and del cover both. TopicStats counts undecoded topics
+    straight from the fixed-width columns and SearchIndex tokenizes their
+    text columns, so neither decodes a topic that is not opened. The
+    mapping is dropped once every topic is decoded.
+    """
+
+    def __init__(self, data, blocks):
+        super().__init__()
+        self.data = data      # mmap of the file, or bytes once detached
+        self.blocks = blocks  # topic ID -> (todo count, offset, length)
+
+    def __missing__(self, topic):
+        block = self.blocks.pop(topic, None)
+        if block is None:
+            raise KeyError(topic)
+        todos = decode_topic_block(self.data, block[0], block[1])
+        dict.__setitem__(self, topic, todos)
+        if not self.blocks:
+            self.data = None
+        search_index.topic_decoded(topic, block[0], todos)
+        return todos
+
+    def __contains__(self, topic):
+        return dict.__contains__(self, topic) or topic in self.blocks
+
+    def __setitem__(self, topic, todos):
+        self.blocks.pop(topic, None)
+        dict.__setitem__(self, topic, todos)
+
+    def __delitem__(self, topic):
+        if self.blocks.pop(topic, None) is None:
+            dict.__delitem__(self, topic)
+
+    def __len__(self):
+        return dict.__len__(self) + len(self.blocks)
+
+    def get(self, topic, default=None):
+        return self[topic] if topic in self else default
+
+    def setdefault(self, topic, default=None):
+        if topic in self:
+            return self[topic]
+        self[topic] = default
+        return default
+
+    def pop(self, topic, *default):
+        if topic in self.blocks:
+            self[topic]
+        return dict.pop(self, topic, *default)
+
+    def raw(self, topic):
+        """(count, block bytes) of a topic not decoded yet, else None"""
+        block = self.blocks.get(topic)
+        if block is None:
+            return None
+        count, offset, length = block
+        return count, memoryview(self.data)[offset:offset + length]
+
+    def detach(self):
+        """Copy the rest of the file into memory and unmap it.
+
+        Only needed on Windows, where a mapped file cannot be replaced;
+        elsewhere the mapping keeps the old file alive after a rename.
+        """
+        if self.blocks and not isinstance(self.data, bytes):
+            mapped, self.data = self.data, self.data[:]
+            mapped.close()
+
+    def tally(self, topic, counts, today):
+        """Add an undecoded topic to TopicStats `counts`; False if it is decoded"""
+        block = self.blocks.get(topic)
+        if block is None:
             return False
-        idx = 1
-        topics = []
-        todos_map = {}
-        while idx < len(lines):
-            line = lines[idx]
-            idx += 1
-            if line.startswith("TOPIC:"):
-                topic = line[len("TOPIC:"):]
-                topics.append(topic)
-                todos_map[topic] = []
-                # expect NUM_TODOS next
-                if idx < len(lines) and lines[idx].startswith("NUM_TODOS:"):
-                    try:
-                        n = int(lines[idx].split(":", 1)[1])
-                    except Exception:
-                        n = 0
-                    idx += 1
-                    for _ in range(n):
-                        if idx >= len(lines):
-                            break
-                        meta_line = lines[idx]
-                        idx += 1
-                        if not meta_line.startswith("TODO_META:"):
-                            continue
-                        meta = meta_line[len("TODO_META:"):]
-                        parts = meta.split("\x1f")
-                        if len(parts) < 6:
-                            continue
-                        name = parts[0].replace("\\n", "\n")
-                        priority = int(parts[1]) if parts[1].isdigit() else len(PRIORITIES) - 1
-                        completed = parts[2] == "1"
-                        created = parts[3]
-                        deadline = parts[4] or None
-                        notes_b64 = parts[5]
-                        try:
-                            notes = base64.b64decode(notes_b64.encode("ascii")).decode("utf-8")
-                        except Exception:
-                            notes = ""
-                        todos_map[topic].append({
-                            "name": name,
-                            "priority": priority,
-                            "completed": completed,
-                            "created_at": created,
-                            "deadline": deadline,
-                            "notes": notes
-                        })
-        # apply to app_state
-        app_state["topics"] = topics
-        app_state["todos"] = todos_map
-        # reset indexes safely
-        app_state["topic_index"] = min(app_state.get("topic_index", 0), max(0, len(topics) - 1))
+        n, offset, _ = block
+        data = self.data
+        deadlines = struct.unpack_from(f"<{n}i", data, offset + 2 * n)
+        last = len(PRIORITIES) - 1
+        counts[TopicStats.TOTAL] += n
+        for priority, flag, ordinal in zip(data[offset:offset + n], data[offset + n:offset + 2 * n], deadlines):
+            if flag & V2_DONE:
+                counts[TopicStats.DONE] += 1
+                continue
+            if ordinal and ordinal < today:
+                counts[TopicStats.OVERDUE] += 1
+            elif ordinal == today:
+                counts[TopicStats.TODAY] += 1
+            counts[TopicStats.PRIORITY + min(priority, last)] += 1
         return True
-    except Exception as e:
-        app_state["status_msg"] = f"Load failed: {e}"
-        app_state["status_msg_until"] = time.time() + 3
-        return False
 
-def init_windows_terminal():
-    """Initialize Windows terminal for ANSI escape sequences"""
-    kernel32 = windll.kernel32
-    handle = kernel32.GetStdHandle(STD_OUTPUT_HANDLE)
-    mode = c_ulong()
-    kernel32.GetConsoleMode(handle, byref(mode))
-    mode.value |= ENABLE_VIRTUAL_TERMINAL_PROCESSING
-    mode.value |= ENABLE_PROCESSED_OUTPUT
-    kernel32.SetConsoleMode(handle, mode)
-    
-    # Switch to alternate screen and disable scrolling/wrapping
-    sys.stdout.write(ALT_SCREEN + DISABLE_LINEWRAP + DISABLE_SCROLL)
-    sys.stdout.flush()
+    def texts(self, topic):
+        """Name and notes of each todo of an undecoded topic, read straight
+        from its block (see SearchIndex.build_step); None if it is decoded
+        """
+        block = self.blocks.get(topic)
+        if block is None:
+            return None
+        n, offset, _ = block
+        data = self.data
+        texts = []
+        try:
+            lengths = struct.unpack_from(f"<{2 * n}I", data, offset + 14 * n)
+            pos = offset + 22 * n
+            for i in range(n):
+                middle = pos + lengths[i]
+                end = middle + lengths[n + i]
+                texts.append(str(data[pos:middle], "utf-8") + "\n" + str(data[middle:end], "utf-8"))
+                pos = end
+        except (struct.error, ValueError):
+            pass
+        return texts
 
-def clear_screen():
-    """Clear the terminal screen"""
-    sys.stdout.write(CLEAR_SCREEN + MOVE_TO_TOP)
-    sys.stdout.flush()
 
-def get_terminal_size():
-    """Get terminal dimensions"""
-    size = shutil.get_terminal_size()
-    return (size.columns, size.lines)
+def read_snapshot_v2(f, timings=None):
+    """Map an open TODO_V2 file into (TopicRegistry, LazyTodos, journal_seq).
 
-def strip_ansi(text):
-    """Remove ANSI escape codes from text"""
-    import re
-    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-    return ansi_escape.sub('', text)
+    Only the topic table is read; todos are decoded per topic on demand.
+    A topic whose columns do not fit its block loads empty; a block past the
+    end of the file fails the load.
+    """
+    import mmap
+    start = time.perf_counter()
+    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    seq, count = V2_HEADER.unpack_from(data, len(SNAPSHOT_HEADER_V2))
+    pos = len(SNAPSHOT_HEADER_V2) + V2_HEADER.size
+    topics = TopicRegistry()
+    blocks = {}
+    for _ in range(count):
+        topic_id, n, offset, length, name_size = V2_TOPIC.unpack_from(data, pos)
+        pos += V2_TOPIC.size
+        name = str(data[pos:pos + name_size], "utf-8")
+        pos += name_size
+        if offset + length > len(data):
+            raise ValueError("truncated TODO_V2 file")
+        if length < 22 * n:
+            n = length = 0  # its columns do not fit: a damaged topic loads empty
+        topic = topics.add(name, topic_id=None if topic_id in topics else topic_id)
+        blocks[topic] = (n, offset, length)
+    if timings is not None:
+        timings["snapshot"] = time.perf_counter() - start
+    return topics, LazyTodos(data, blocks), seq
 
 
-def build_display_lines(raw, width):
-    """Wrap raw notes text into display lines of max 'width'.
+def read_snapshot(path, timings=None):
+    """Parse a snapshot into (TopicRegistry, todos_map, journal_seq).
 
-    Returns (lines, line_start_offsets) where line_start_offsets[i] is the
-    raw-string offset of the first character of lines[i].
-    """
-    lines = []
-    starts = []
-    off = 0
-    for paragraph in raw.split('\n'):
-        i = 0
-        while i < len(paragraph):
-            lines.append(paragraph[i:i+width])
-            starts.append(off + i)
-            i += width
-        # If paragraph was empty or exactly multiple of width, still add an empty line for the newline
-        if len(paragraph) == 0:
-            lines.append("")
-            starts.append(off + len(paragraph))
-        # Account for the newline character in raw offsets
-        off += len(paragraph) + 1
-    # If the raw text ended with a newline, we added a trailing empty line; good.
-    return lines, starts
-
-
-def offset_to_rowcol(raw, width, offset):
-    """Map a raw-string offset to (row, col) in wrapped display coordinates."""
-    if offset <= 0:
-        return 0, 0
-    row = 0
-    col = 0
-    cur = 0
-    for paragraph in raw.split('\n'):
-        plen = len(paragraph)
-        i = 0
-        while i < plen:
-            line_len = min(width, plen - i)
-            if cur + line_len >= offset:
-                # offset is inside this wrapped line
-                return row, offset - cur - i
-            i += line_len
-            row += 1
-            cur += line_len
-        # account for the newline
-        if cur + 1 > offset:
-            # offset points to the newline; place cursor at start of next row (empty line)
-            return row + 1, 0
-        cur += 1
-        # new empty line starts after newline
-        if plen == 0:
-            # empty paragraph created a single empty row
-            if cur >= offset:
-                return row, 0
-        #row += 0
-    # If offset beyond end, place at end
-    lines, starts = build_display_lines(raw, width)
-    if not lines:
-        return 0, 0
-    last = lines[-1]
-    return len(lines) - 1, len(last)
-
-
-def rowcol_to_offset(raw, width, row, col):
-    """Inverse of offset_to_rowcol: map display (row,col) to raw offset.
-
-    If row/col beyond end, return len(raw).
+    TODO_V2 files are mapped (see read_snapshot_v2). TODO_V1 files are read
+    in a single streaming pass: lines are never collected and notes are left
+    base64-encoded (see get_notes). Topics keep the ID of a preceding
+    TOPIC_ID line; files written before IDs get fresh ones.
+    Returns None if the file is neither.
     """
-    if row < 0:
-        return 0
-    cur = 0
-    r = 0
-    for paragraph in raw.split('\n'):
-        plen = len(paragraph)
-        i = 0
-        while i < plen:
-            if r == row:
-                return min(cur + i + col, cur + plen)
-            i += min(width, plen - i)
-            cur += min(width, plen - i + (0 if i >= plen else 0))
-            r += 1
-        # newline
-        if r == row:
-            return min(cur + plen, len(raw))
-        cur += 1
-        r += 0
-    return len(raw)
+    with open(path, "rb") as f:
+        if f.read(len(SNAPSHOT_HEADER_V2)) == SNAPSHOT_HEADER_V2:
+            return read_snapshot_v2(f, timings)
+    start = time.perf_counter()
+    topics = TopicRegistry()
+    todos_map = {}
+    seq = 0
+    topic_id = None
+    with open(path, "r", encoding="utf-8") as f:
+        if f.readline().rstrip("\n") != "TODO_V1":
+            return None
+        current = None      # todo list of the topic being read
+        remaining = 0       # lines left in the current NUM_TODOS block
+        expect_count = False
+        for line in f:
+            line = line.rstrip("\n")
+            if remaining:
+                remaining -= 1
+                if line.startswith("TODO_META:"):
+                    todo = parse_todo_meta(line[10:].split("\x1f"))
+                    if todo is not None:
+                        current.append(todo)
+                continue
+            if expect_count:
+                expect_count = False
+                if line.startswith("NUM_TODOS:"):
+                    try:
+                        remaining = max(0, int(line[10:]))
+                    except ValueError:
+                        remaining = 0
+                    continue
+            if line.startswith("TOPIC:"):
+                if topic_id in topics:
+                    topic_id = None
+                topic = topics.add(line[6:], topic_id=topic_id)
+                topic_id = None
+                current = todos_map[topic] = []
+                # expect NUM_TODOS next
+                expect_count = True
+            elif line.startswith("TOPIC_ID:"):
+                try:
+                    topic_id = int(line[9:])
+                except ValueError:
+                    topic_id = None
+            elif line.startswith("JOURNAL_SEQ:"):
+                try:
+                    seq = int(line[12:])
+                except ValueError:
+                    seq = 0
+    if timings is not None:
+        timings["snapshot"] = time.perf_counter() - start
+    return topics, todos_map, seq
 
 
-def color_cell_write(canvas, row, col, text, color):
-    """Write text into canvas per-character with a color wrapper.
+def apply_journal_record(topics, todos_map, op, fields, by_name=False):
+    """Replay one journal record onto a TopicRegistry and its todos_map.
 
-    Avoid embedding raw ANSI sequences into canvas cells; instead wrap each
-    visible character so alignment stays correct.
+    Records name topics by ID; `by_name` reads TODO_JOURNAL_V1 records,
+    which used topic names and positions instead.
     """
-    for k, ch in enumerate(text):
-        if col + k >= len(canvas[0]):
-            break
-        canvas[row][col + k] = color + ch + NORMAL
+    if by_name and op == "TOPIC_ADD":
+        todos_map[topics.add(fields[0])] = []
+        return
+    if by_name and op == "TOPIC_DEL":
+        fields = [topics[int(fields[0])]]
+    elif by_name:
+        fields = [topics.id_of(fields[0])] + fields[1:]
+        if fields[0] is None:
+            raise KeyError(fields[0])
+    else:
+        fields = [int(fields[0])] + fields[1:]
+    topic = fields[0]
+    if op == "TOPIC_ADD":
+        todos_map[topics.add(fields[1], topic_id=topic)] = []
+    elif op == "TOPIC_DEL":
+        topics.delete(topic)
+        todos_map.pop(topic, None)
+    elif op == "TOPIC_RENAME":
+        topics.rename(topic, fields[1])
+    elif op == "TOPIC_MOVE":
+        topics.move(topic, int(fields[1]))
+    elif op == "TODO_ADD":
+        todo = parse_todo_meta(fields[2:])
+        if todo is not None:
+            todos_map.setdefault(topic, []).insert(int(fields[1]), todo)
+    elif op == "TODO_DEL":
+        todos_map[topic].pop(int(fields[1]))
+    elif op == "TODO_SET":
+        todo = todos_map[topic][int(fields[1])]
+        if fields[2] == "completed":
+            todo.completed = fields[3] == "1"
+        elif fields[2] == "priority":
+            todo.priority = min(int(fields[3]), len(PRIORITIES) - 1)
+    elif op == "NOTES":
+        todo = todos_map[topic][int(fields[1])]
+        a, b = int(fields[2]), int(fields[3])
+        text = base64.b64decode(fields[4].encode("ascii")).decode("utf-8")
+        todo.notes_buffer().replace(a, b, text)
 
 
-def deadline_status(deadline_str):
-    """Return status for a deadline string (DD-MM-YYYY) -> 'ok','today','past'.
+def replay_journal(path, topics, todos_map, after_seq):
+    """Apply records newer than `after_seq` from the journal at `path`.
 
-    Non-parseable or empty deadlines return 'ok'.
+    Stops at the first torn or malformed record. Returns the last seq applied.
     """
-    if not deadline_str:
-        return 'ok'
+    last = after_seq
     try:
-        d = datetime.strptime(deadline_str, "%d-%m-%Y").date()
-    except Exception:
-        return 'ok'
-    today = date.today()
-    if d < today:
-        return 'past'
-    if d == today:
-        return 'today'
-    return 'ok'
+        f = open(path, "r", encoding="utf-8", newline="\n")
+    except FileNotFoundError:
+        return last
+    with f:
+        header = f.readline().rstrip("\n")
+        if header not in (JOURNAL_HEADER, JOURNAL_HEADER_V1):
+            return last
+        by_name = header == JOURNAL_HEADER_V1
+        for line in f:
+            if not line.endswith("\n"):
+                break  # crash during the last append
+            parts = line[:-1].split("\x1f")
+            try:
+                seq = int(parts[0])
+                if seq <= last:
+                    continue
+                apply_journal_record(topics, todos_map, parts[1], parts[2:], by_name)
+            except (ValueError, IndexError, KeyError, AttributeError):
+                break
+            last = seq
+    return last
+
+
+def journal_is_current(path):
+    """True unless the journal at `path` exists in an older format"""
+    for name in (path, path + ".old"):
+        try:
+            with open(name, "r", encoding="utf-8", newline="\n") as f:
+                if f.readline().rstrip("\n") != JOURNAL_HEADER:
+                    return False
+        except FileNotFoundError:
+            pass
+    return True
+
+
+class Journal:
+    """Append-only log of mutations since the last snapshot.
+
+    Mutators call record(); a save hands the pending records to the writer
+    thread (see SaveWriter), which appends them to <data>.journal instead of
+    rewriting the snapshot. Once the journal grows
+    past JOURNAL_COMPACT_BYTES it is folded into a fresh snapshot on a
+    background thread.
+    """
+
+    def __init__(self):
+        self.seq = 0            # last sequence number handed out
+        self.pending = []       # [seq, op, fields] not yet written
+        self.path = None        # snapshot the journal belongs to
+        self.compactor = None   # background compaction thread
+        self.error = None       # exception of the last compaction, set by its thread
+
+    def reset(self, path, seq):
+        """Start journaling against the snapshot at `path`"""
+        self.path = path
+        self.seq = seq
+        self.pending = []
+
+    def record(self, op, *fields):
+        """Queue a mutation. NOTES fields carry raw text, encoded on write."""
+        dirty.mark()
+        if not JOURNAL_MODE:
+            return
+        if op == "NOTES" and self.pending:
+            last = self.pending[-1]
+            lf = last[2]
+            # Coalesce a run of typing into one splice record
+            if (last[1] == "NOTES" and lf[0] == fields[0] and lf[1] == fields[1]
+                    and lf[2] == lf[3] and fields[2] == fields[3]
+                    and fields[2] == lf[2] + len(lf[4])):
+                lf[4] += fields[4]
+                return
+        self.seq += 1
+        self.pending.append([self.seq, op, list(fields)])
+
+    def take(self):
+        """Hand the pending records to the writer; recording starts a new batch"""
+        records, self.pending = self.pending, []
+        return records
+
+    def encode(self, records):
+        lines = []
+        for seq, op, fields in records:
+            if op == "NOTES":
+                fields = [fields[0], str(fields[1]), str(fields[2]), str(fields[3]),
+                          base64.b64encode(fields[4].encode("utf-8")).decode("ascii")]
+            lines.append("\x1f".join([str(seq), op] + [str(x) for x in fields]) + "\n")
+        return "".join(lines)
+
+    def append(self, path, records):
+        """Append `records` (from take) to the journal of `path` and fsync it;
+        returns the journal's new size. Runs on the writer thread.
+        """
+        journal_path = get_journal_path(path)
+        new_file = not os.path.exists(journal_path)
+        start = 0 if new_file else os.path.getsize(journal_path)
+        try:
+            with open(journal_path, "a", encoding="utf-8", newline="\n") as f:
+                if new_file:
+                    f.write(JOURNAL_HEADER + "\n")
+                if records:
+                    f.write(self.encode(records))
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+        except BaseException:
+            # Cut off a partly written record: the retry would be glued onto
+            # it and replay stops at the first line it cannot parse
+            try:
+                if new_file:
+                    os.remove(journal_path)
+                else:
+                    os.truncate(journal_path, start)
+            except OSError:
+                pass
+            raise
+        if new_file:
+            sync_dir(journal_path)
+        return size
+
+    def compacting(self):
+        return self.compactor is not None and self.compactor.is_alive()
+
+    def poll(self):
+        """Report a finished compaction; False if it failed"""
+        if self.compactor is None or self.compactor.is_alive():
+            return True
+        self.compactor.join()
+        self.compactor = None
+        error, self.error = self.error, None
+        if error is not None:
+            app_state["status_msg"] = f"Compaction failed: {error}"
+            app_state["status_msg_until"] = time.time() + 3
+        return error is None
+
+    def wait(self):
+        """Block until a running compaction has finished; False if it failed"""
+        if self.compactor is not None:
+            self.compactor.join()
+        return self.poll()
+
+    def compact(self):
+        """Fold the journal into a new snapshot on a background thread.
+
+        The journal is first moved aside to <journal>.old so new records go
+        to a fresh file. The snapshot records the seq it covers, so a crash
+        at any point replays to the same state.
+        """
+        import threading
+        if self.compacting():
+            return
+        path = self.path
+        journal_path = get_journal_path(path)
+        old_path = journal_path + ".old"
+        frozen = freeze_state()
+        seq = self.seq
+        try:
+            if os.path.exists(old_path):
+                # Left over from an interrupted compaction: merge into it
+                with open(journal_path, "r", encoding="utf-8", newline="\n") as src:
+                    src.readline()
+                    rest = src.read()
+                with open(old_path, "a", encoding="utf-8", newline="\n") as dst:
+                    dst.write(rest)
+                os.remove(journal_path)
+            else:
+                os.replace(journal_path, old_path)
+        except OSError as e:
+            # Nothing is lost: the journal is still replayed on load
+            app_state["status_msg"] = f"Compaction failed: {e}"
+            app_state["status_msg_until"] = time.time() + 3
+            return
+
+        def run():
+            try:
+                write_atomic(path, lambda f: write_snapshot_v2(f, frozen, seq), binary=True)
+                os.remove(old_path)
+            except BaseException as e:
+                self.error = e  # reported by poll(); <journal>.old is still replayed
+            wake_main_loop()
+
+        self.error = None
+        self.compactor = threading.Thread(target=run, name="todo-compact", daemon=True)
+        self.compactor.start()
+
+
+journal = Journal()
+
+
+def remove_journals(path):
+    """Delete the journals of `path` once a snapshot there contains them"""
+    journal_path = get_journal_path(path)
+    for stale in (journal_path, journal_path + ".old"):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+
+class SaveWriter:
+    """Writes saves on a background thread so the UI never waits on the disk.
+
+    The UI thread only captures what to write: the pending journal records,
+    or a frozen snapshot. The writer encodes and fsyncs it, then wakes the
+    main loop, whose poll() reports the result. A save requested while one
+    is being written is coalesced: one more capture is taken when the
+    running write finishes, however many requests arrived meanwhile.
+    """
+
+    def __init__(self):
+        self.thread = None
+        self.job = None      # what the running write was handed
+        self.captured = 0    # dirty changes the running write covers
+        self.result = None   # (exception or None, journal size), set by the writer
+        self.queued = None   # path of a save requested during the write
+
+    def busy(self):
+        return self.thread is not None
+
+    def request(self, path):
+        """Save to `path` now, or right after the running write"""
+        self.poll()
+        if self.busy():
+            self.queued = path
+        else:
+            self.start(path)
+        app_state["status_msg"] = f"Saving {os.path.basename(path)}..."
+        app_state["status_msg_until"] = time.time() + 60
+
+    def start(self, path):
+        import threading
+        if JOURNAL_MODE and journal.path == path and os.path.exists(path):
+            job = ("journal", path, journal.take())
+        else:
+            # Full snapshot; it contains everything, so older journals go
+            journal.wait()
+            job = ("snapshot", path, freeze_state(), journal.seq)
+            journal.reset(path, journal.seq)
+        self.captured = dirty.changes
+        dirty.reset(path)
+        self.job = job
+        self.result = None
+        self.thread = threading.Thread(target=self.run, args=(job,), name="todo-save", daemon=True)
+        self.thread.start()
+
+    def run(self, job):
+        try:
+            if job[0] == "journal":
+                size = journal.append(job[1], job[2])
+            else:
+                _, path, frozen, seq = job
+                write_atomic(path, lambda f: write_snapshot_v2(f, frozen, seq), binary=True)
+                remove_journals(path)
+                size = 0
+            self.result = (None, size)
+        except BaseException as e:
+            self.result = (e, 0)
+        wake_main_loop()
+
+    def poll(self):
+        """Collect a finished write and start a queued one.
+
+        Returns True if the collected write succeeded, False if it failed or
+        is still running (or there was none).
+        """
+        if self.thread is None or self.thread.is_alive():
+            return False
+        self.thread.join()
+        self.thread = None
+        error, size = self.result
+        kind, path = self.job[:2]
+        if error is None:
+            if kind == "journal" and size > JOURNAL_COMPACT_BYTES:
+                journal.compact()
+            dirty.failures = 0
+            app_state["status_msg"] = f"Saved {os.path.basename(path)}"
+            app_state["status_msg_until"] = time.time() + 2
+        else:
+            if kind == "journal":
+                journal.pending[:0] = self.job[2]  # retried by the next save
+            else:
+                journal.path = None  # the next save must be a full snapshot again
+            dirty.changes += self.captured
+            dirty.last = time.time()
+            dirty.path = None
+            dirty.failures += 1
+            app_state["status_msg"] = f"Save failed: {error}"
+            app_state["status_msg_until"] = time.time() + 3
+        self.job = None
+        if self.queued is not None:
+            path, self.queued = self.queued, None
+            self.start(path)
+            app_state["status_msg"] = f"Saving {os.path.basename(path)}..."
+            app_state["status_msg_until"] = time.time() + 60
+        return error is None
+
+    def wait(self):
+        """Finish the running write, any queued one and a compaction they
+        started; False if the last write failed
+        """
+        ok = False
+        while self.thread is not None:
+            self.thread.join()
+            ok = self.poll()
+        journal.wait()
+        return ok
+
+
+saver = SaveWriter()
+
+
+class DirtyTracker:
+    """Counts the mutations made since the state was last captured for a save.
+
+    Journal.record marks every mutation. The main loop autosaves once they
+    have been quiet for AUTOSAVE_QUIET_MS, or straight away when
+    AUTOSAVE_CHANGES of them pile up. After a failed save it backs off,
+    doubling the wait on each further failure, so a full disk or read-only
+    directory is not retried in a tight loop. save_data skips the write when
+    nothing changed since the file at that path was loaded or saved.
+    """
+
+    BACKOFF_MAX = 60  # seconds between retries of a failing autosave
+
+    def __init__(self):
+        self.changes = 0
+        self.last = 0.0     # time.time() of the latest change (or failed save)
+        self.path = None    # file holding everything in memory except `changes`
+        self.failures = 0   # consecutive failed saves
+
+    def mark(self):
+        self.changes += 1
+        self.last = time.time()
+
+    def reset(self, path):
+        """Memory now matches the file at `path` (None: no file does)"""
+        self.changes = 0
+        self.path = path
+
+    def clean(self, path):
+        return not self.changes and self.path == path
+
+    def deadline(self):
+        """time.time() at which to autosave, or None"""
+        if not self.changes or not AUTOSAVE_QUIET_MS or saver.queued is not None:
+            return None
+        if self.failures:
+            return self.last + min(AUTOSAVE_QUIET_MS / 1000 * 2 ** self.failures, self.BACKOFF_MAX)
+        if self.changes >= AUTOSAVE_CHANGES:
+            return self.last
+        return self.last + AUTOSAVE_QUIET_MS / 1000
+
+    def due(self):
+        deadline = self.deadline()
+        return deadline is not None and deadline <= time.time()
+
+
+dirty = DirtyTracker()
+
+
+def save_data(path=None, wait=True):
+    """Persist app_state topics/todos.
+
+    In journal mode (the default) only the mutations since the last save are
+    appended to <path>.journal; the snapshot itself is rewritten only the
+    first time and by background compaction. Otherwise the whole snapshot is
+    rewritten. Either way the file is written by the background writer (see
+    SaveWriter); with `wait` False this returns once the state is captured
+    and the outcome shows in status_msg. Snapshots go to a temp file that is
+    fsynced and renamed into place, journal appends are fsynced. Nothing is
+    written when nothing changed since `path` was loaded or saved.
+
+    Snapshots are written in the binary TODO_V2 format (see the layout above
+    V2_HEADER). The older text format (TODO_V1) is still read, and written
+    by `Todo.py convert --format v1`:
+    TODO_V1
+    JOURNAL_SEQ:<last journal record folded into this snapshot>
+    TOPIC_ID:<stable topic id>
+    TOPIC:<topic_name>
+    NUM_TODOS:<n>
+    TODO_META:<name>\x1f<priority>\x1f<completed>\x1f<created_at>\x1f<deadline>\x1f<notes_b64>
+    ...
+
+    Journal format: a JOURNAL_HEADER line, then one record per line:
+    <seq>\x1f<op>\x1f<topic id>\x1f<fields...>
+    """
+    if path is None:
+        path = get_data_path()
+    start = time.perf_counter()
+    if dirty.clean(path) and not saver.busy():
+        app_state["status_msg"] = "No changes to save"
+        app_state["status_msg_until"] = time.time() + 2
+        return True
+    try:
+        saver.request(path)
+        if profiler.enabled:
+            profiler.add("save", start)
+        return saver.wait() if wait else True
+    except Exception as e:
+        app_state["status_msg"] = f"Save failed: {e}"
+        app_state["status_msg_until"] = time.time() + 3
+        return False
+
+
+def load_data(path=None):
+    """Deserialize the .todo file (and replay its journal) into app_state.
+    If file missing or invalid, do nothing.
+
+    Per-phase timings (seconds) are left in app_state["load_timings"].
+    """
+    if path is None:
+        path = get_data_path()
+    if not os.path.exists(path):
+        return False
+    try:
+        timings = {}
+        saver.wait()
+        journal.wait()
+        snapshot = read_snapshot(path, timings)
+        if snapshot is None:
+            return False
+        topics, todos_map, seq = snapshot
+        start = time.perf_counter()
+        journal_path = get_journal_path(path)
+        # An interrupted compaction leaves records in .old; they come first
+        seq = replay_journal(journal_path + ".old", topics, todos_map, seq)
+        seq = replay_journal(journal_path, topics, todos_map, seq)
+        # never append ID records to a name-based journal: the next save
+        # writes a full snapshot instead (see save_data)
+        journal.reset(path if journal_is_current(journal_path) else None, seq)
+        dirty.reset(path)
+        timings["journal"] = time.perf_counter() - start
+        # apply to app_state
+        app_state["topics"] = topics
+        app_state["todos"] = todos_map
+        display_order.clear()
+        search_index.clear()
+        topic_stats.clear()
+        undo_log.clear()
+        # reset indexes safely
+        app_state["topic_index"] = min(app_state.get("topic_index", 0), max(0, len(topics) - 1))
+        timings["total"] = sum(timings.values())
+        app_state["load_timings"] = timings
+        return True
+    except Exception as e:
+        app_state["status_msg"] = f"Load failed: {e}"
+        app_state["status_msg_until"] = time.time() + 3
+        return False
+
+
+# Terminal escape sequences -> the msvcrt scan codes handle_input expects
+# after a b'\xe0' prefix
+ANSI_KEYS = {
+    b"A": b"H",   # Up
+    b"B": b"P",   # Down
+    b"C": b"M",   # Right
+    b"D": b"K",   # Left
+    b"H": b"G",   # Home
+    b"F": b"O",   # End
+    b"3~": b"S",  # Delete
+}
+
+
+class KeyDecoder:
+    """Turn raw terminal bytes into msvcrt-style key tokens.
+
+    Arrow keys and friends become b'\\xe0' followed by their scan code,
+    DEL becomes Backspace (b'\\x08'), LF becomes Enter (b'\\r') and UTF-8
+    sequences stay together as a single token. A bracketed paste becomes one
+    token: PASTE_START followed by the pasted bytes.
+    """
+
+    def __init__(self):
+        self.tokens = deque()
+        self.pending = b""  # incomplete escape/UTF-8 sequence
+        self.paste = None  # bytes of a bracketed paste still arriving
+
+    def feed(self, data):
+        """Decode `data`, keeping any incomplete trailing sequence pending."""
+        buf = self.pending + data
+        tokens = self.tokens
+        i = 0
+        n = len(buf)
+        while i < n:
+            if self.paste is not None:
+                end = buf.find(PASTE_END, i)
+                if end < 0:
+                    # keep a possibly split end marker pending
+                    keep = max(i, n - len(PASTE_END) + 1)
+                    self.paste += buf[i:keep]
+                    i = keep
+                    break
+                tokens.append(PASTE_START + bytes(self.paste) + buf[i:end])
+                self.paste = None
+                i = end + len(PASTE_END)
+                continue
+            b = buf[i]
+            if b == 0x1b:
+                if i + 1 >= n:
+                    break  # lone ESC so far; may be the start of a sequence
+                if buf[i + 1] in (0x5b, 0x4f):  # '[' or 'O'
+                    j = i + 2
+                    while j < n and not (0x40 <= buf[j] <= 0x7e):
+                        j += 1
+                    if j >= n:
+                        break  # sequence not complete yet
+                    if buf[i:j + 1] == PASTE_START:
+                        self.paste = bytearray()
+                        i = j + 1
+                        continue
+                    code = ANSI_KEYS.get(buf[i + 2:j + 1])
+                    if code is not None:
+                        tokens.append(b"\xe0")
+                        tokens.append(code)
+                    i = j + 1
+                    continue
+                tokens.append(b"\x1b")
+                i += 1
+            elif b >= 0x80:
+                size = 2 if b < 0xe0 else 3 if b < 0xf0 else 4
+                if i + size > n:
+                    break
+                tokens.append(buf[i:i + size])
+                i += size
+            else:
+                if b == 0x7f:
+                    tokens.append(b"\x08")
+                elif b == 0x0a:
+                    tokens.append(b"\r")
+                else:
+                    tokens.append(buf[i:i + 1])
+                i += 1
+        self.pending = buf[i:]
+
+    def flush(self):
+        """Give up waiting on a pending escape: treat it as a bare Esc key."""
+        if self.paste is None and self.pending.startswith(b"\x1b"):
+            rest = self.pending[1:]
+            self.pending = b""
+            self.tokens.append(b"\x1b")
+            self.feed(rest)
+
+    def take_text(self, stop=b""):
+        """Pop the run of printable keys (and Enter, as a newline) at the
+        front of the queue as one string. Keys in `stop` end the run."""
+        tokens = self.tokens
+        run = []
+        while tokens:
+            token = tokens[0]
+            if len(token) == 1:
+                if not (0x20 <= token[0] <= 0x7e or token == b"\r") or token in stop:
+                    break
+            elif token[0] < 0xc0:
+                break  # not a UTF-8 sequence (e.g. a paste token)
+            run.append(b"\n" if token == b"\r" else token)
+            tokens.popleft()
+        return b"".join(run).decode("utf-8", errors="ignore")
+
+
+class TerminalBackend:
+    """Keys in, escape sequences out.
+
+    getch() returns one key per call in msvcrt form: bytes for ordinary keys,
+    b'\\xe0' followed by a scan code for arrow and editing keys.
+    """
+
+    def start(self):
+        """Put the terminal into full-screen raw mode"""
+        # Switch to alternate screen and disable scrolling/wrapping
+        self.write(ALT_SCREEN + DISABLE_LINEWRAP + DISABLE_SCROLL)
+        self.flush()
+
+    def stop(self):
+        """Restore the terminal"""
+
+    def key_pending(self):
+        raise NotImplementedError
+
+    def getch(self):
+        raise NotImplementedError
+
+    def pending_text(self, stop=b""):
+        """Without waiting, take the queued run of printable keys (Enter as a
+        newline) as one string, so typing or an unbracketed paste is applied
+        in one edit. Keys in `stop` end the run."""
+        return ""
+
+    def wait(self, timeout):
+        """Block until a key is pending, the terminal is resized, wake() is
+        called or `timeout` (seconds, None = forever) passes. Returns True if
+        a key is ready."""
+        raise NotImplementedError
+
+    def wake(self):
+        """Interrupt wait() from another thread"""
+
+    def write(self, data):
+        sys.stdout.write(data)
+
+    def flush(self):
+        sys.stdout.flush()
+
+    def get_size(self):
+        size = shutil.get_terminal_size()
+        return (size.columns, size.lines)
+
+
+class WindowsBackend(TerminalBackend):
+    """Windows console via msvcrt and kernel32"""
+
+    def __init__(self):
+        import ctypes
+        import msvcrt
+        self.ctypes = ctypes
+        self.msvcrt = msvcrt
+        self.kernel32 = ctypes.windll.kernel32
+
+        class INPUT_RECORD(ctypes.Structure):
+            """Console INPUT_RECORD; only the size matters, records are discarded."""
+            _fields_ = [("EventType", ctypes.c_ushort), ("_pad", ctypes.c_ushort),
+                        ("_event", ctypes.c_byte * 16)]
+
+        self.INPUT_RECORD = INPUT_RECORD
+
+    def start(self):
+        """Initialize Windows terminal for ANSI escape sequences"""
+        ctypes = self.ctypes
+        kernel32 = self.kernel32
+        handle = kernel32.GetStdHandle(STD_OUTPUT_HANDLE)
+        mode = ctypes.c_ulong()
+        kernel32.GetConsoleMode(handle, ctypes.byref(mode))
+        mode.value |= ENABLE_VIRTUAL_TERMINAL_PROCESSING
+        mode.value |= ENABLE_PROCESSED_OUTPUT
+        kernel32.SetConsoleMode(handle, mode)
+        # Resize events wake the input wait in the main loop
+        self.in_handle = kernel32.GetStdHandle(STD_INPUT_HANDLE)
+        in_mode = ctypes.c_ulong()
+        kernel32.GetConsoleMode(self.in_handle, ctypes.byref(in_mode))
+        kernel32.SetConsoleMode(self.in_handle, in_mode.value | ENABLE_WINDOW_INPUT)
+        super().start()
+
+    def key_pending(self):
+        return self.msvcrt.kbhit()
+
+    def getch(self):
+        return self.msvcrt.getch()
+
+    def pending_text(self, stop=b""):
+        msvcrt = self.msvcrt
+        run = []
+        while msvcrt.kbhit():
+            key = msvcrt.getch()
+            if not (0x20 <= key[0] <= 0x7e or key == b"\r") or key in stop:
+                msvcrt.ungetch(key)  # the next getch sees it again
+                break
+            run.append(b"\n" if key == b"\r" else key)
+        return b"".join(run).decode("ascii")
+
+    def wait(self, timeout):
+        if self.key_pending():
+            return True
+        ctypes = self.ctypes
+        kernel32 = self.kernel32
+        handle = self.in_handle
+        # Round up so a timer is never woken a fraction of a millisecond early
+        wait_ms = INFINITE if timeout is None else max(0, int(timeout * 1000) + 1)
+        if kernel32.WaitForSingleObject(handle, wait_ms) != WAIT_OBJECT_0:
+            return False
+        # Count the queued records before asking kbhit, so records that arrive
+        # afterwards are never touched by the discard below
+        count = ctypes.c_ulong()
+        kernel32.GetNumberOfConsoleInputEvents(handle, ctypes.byref(count))
+        if self.key_pending():
+            return True
+        if count.value:
+            # Only key-up, focus and resize records are queued; drop them or the
+            # handle stays signalled and the wait turns into a busy loop
+            records = (self.INPUT_RECORD * count.value)()
+            read = ctypes.c_ulong()
+            kernel32.ReadConsoleInputW(handle, records, count.value, ctypes.byref(read))
+        return False
+
+    def wake(self):
+        # A focus record signals the input handle; wait() discards it
+        record = self.INPUT_RECORD()
+        record.EventType = FOCUS_EVENT
+        written = self.ctypes.c_ulong()
+        self.kernel32.WriteConsoleInputW(self.in_handle, self.ctypes.byref(record), 1,
+                                         self.ctypes.byref(written))
+
+
+class PosixBackend(TerminalBackend):
+    """termios raw mode on stdin, ANSI key sequences decoded by KeyDecoder"""
+
+    def __init__(self):
+        import selectors
+        import signal
+        import termios
+        import tty
+        self.termios = termios
+        self.tty = tty
+        self.signal = signal
+        self.fd = sys.stdin.fileno()
+        self.decoder = KeyDecoder()
+        self.saved_attrs = None
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.fd, selectors.EVENT_READ, "stdin")
+        # SIGWINCH and wake() write to this pipe to wake the selector
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_r, False)
+        os.set_blocking(self.wake_w, False)
+        self.selector.register(self.wake_r, selectors.EVENT_READ, "wake")
+        self.old_wakeup_fd = None
+        self.old_winch = None
+        self.woken = False  # a wake was drained before wait() got to it
+
+    def start(self):
+        self.saved_attrs = self.termios.tcgetattr(self.fd)
+        self.tty.setraw(self.fd)
+        self.old_winch = self.signal.signal(self.signal.SIGWINCH, lambda signum, frame: None)
+        self.old_wakeup_fd = self.signal.set_wakeup_fd(self.wake_w, warn_on_full_buffer=False)
+        self.write(BRACKETED_PASTE_ON)
+        super().start()
+
+    def stop(self):
+        self.write(BRACKETED_PASTE_OFF)
+        self.flush()
+        if self.old_winch is not None:
+            self.signal.signal(self.signal.SIGWINCH, self.old_winch)
+            self.signal.set_wakeup_fd(self.old_wakeup_fd)
+            self.old_winch = None
+        if self.saved_attrs is not None:
+            self.termios.tcsetattr(self.fd, self.termios.TCSAFLUSH, self.saved_attrs)
+            self.saved_attrs = None
+
+    def fill(self, timeout):
+        """Read and decode whatever stdin delivers within `timeout`.
+
+        Returns True if any key bytes arrived.
+        """
+        got = False
+        for key, _ in self.selector.select(timeout):
+            if key.data == "wake":
+                self.woken = True
+                try:
+                    while os.read(self.wake_r, 512):
+                        pass
+                except BlockingIOError:
+                    pass
+            else:
+                data = os.read(self.fd, 4096)
+                if data:
+                    self.decoder.feed(data)
+                    got = True
+        return got
+
+    def key_pending(self):
+        decoder = self.decoder
+        if not decoder.tokens:
+            self.fill(0)
+            if not decoder.tokens and decoder.pending:
+                # Esc may be the start of a sequence; give the rest a moment
+                if not self.fill(ESC_SEQUENCE_TIMEOUT):
+                    decoder.flush()
+        return bool(decoder.tokens)
+
+    def getch(self):
+        while not self.key_pending():
+            self.fill(None)
+        return self.decoder.tokens.popleft()
+
+    def pending_text(self, stop=b""):
+        parts = []
+        while True:
+            parts.append(self.decoder.take_text(stop))
+            # stop at a non-text key, or once stdin has nothing more buffered
+            if self.decoder.tokens or not self.fill(0):
+                break
+        return "".join(parts)
+
+    def wait(self, timeout):
+        if self.key_pending():
+            return True
+        # key_pending() may already have drained a wake or resize
+        if not self.woken:
+            self.fill(timeout)
+        self.woken = False
+        return self.key_pending()
+
+    def wake(self):
+        try:
+            os.write(self.wake_w, b"\0")
+        except BlockingIOError:
+            pass  # the pipe is full, so the selector is awake anyway
+
+
+class FakeBackend(TerminalBackend):
+    """In-memory terminal for tests and benchmarks.
+
+    Feed it raw terminal bytes with feed(); everything written is kept in
+    `output` (or counted only, when `keep_output` is False).
+    """
+
+    def __init__(self, width=120, height=40, keep_output=True):
+        self.width = width
+        self.height = height
+        self.keep_output = keep_output
+        self.decoder = KeyDecoder()
+        self.output = []
+        self.bytes_written = 0
+
+    def feed(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.decoder.feed(data)
+        self.decoder.flush()
+
+    def key_pending(self):
+        return bool(self.decoder.tokens)
+
+    def getch(self):
+        if not self.decoder.tokens:
+            raise EOFError("fake terminal has no more input")
+        return self.decoder.tokens.popleft()
+
+    def pending_text(self, stop=b""):
+        return self.decoder.take_text(stop)
+
+    def wait(self, timeout):
+        return self.key_pending()
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        if self.keep_output:
+            self.output.append(data)
+
+    def flush(self):
+        pass
+
+    def get_size(self):
+        return (self.width, self.height)
+
+
+BACKENDS = {
+    "windows": WindowsBackend,
+    "posix": PosixBackend,
+    "fake": FakeBackend,
+}
+
+_backend = None
+
+
+def get_backend():
+    """Return the active terminal backend, creating it on first use.
+
+    TODO_TERMINAL=windows|posix|fake overrides the platform default.
+    """
+    global _backend
+    if _backend is None:
+        name = os.environ.get("TODO_TERMINAL") or ("windows" if os.name == "nt" else "posix")
+        _backend = BACKENDS[name]()
+    return _backend
+
+
+def set_backend(backend):
+    """Install `backend` as the active terminal backend (e.g. a FakeBackend)"""
+    global _backend
+    _backend = backend
+    renderer.invalidate()
+
+
+def wake_main_loop():
+    """Interrupt the main loop's wait from a worker thread"""
+    backend = _backend
+    if backend is not None:
+        try:
+            backend.wake()
+        except OSError:
+            pass  # the terminal is already shut down
+
+
+def clear_screen():
+    """Clear the terminal screen"""
+    backend = get_backend()
+    backend.write(CLEAR_SCREEN + MOVE_TO_TOP)
+    backend.flush()
+
+def get_terminal_size():
+    """Get terminal dimensions"""
+    return get_backend().get_size()
+
+def key_pending():
+    """True if a keypress is waiting to be read"""
+    return get_backend().key_pending()
+
+
+def wait_for_input(timeout):
+    """Block until a key is pending, the terminal is resized or `timeout` passes.
+
+    `timeout` is in seconds (None = wait forever). Returns True if a key is
+    ready to read.
+    """
+    return get_backend().wait(timeout)
+
+
+def next_timer_deadline():
+    """Return the time.time() of the next scheduled repaint, or None.
+
+    Timers: status message expiry, the notes caret blink, autosave and
+    midnight (deadline badges change when the date rolls over). An
+    unfinished palette scan or search index build asks for the next frame
+    right away.
+    """
+    today_ordinal()  # make sure the midnight timer is in the future
+    deadlines = [app_state["_today_until"]]
+    autosave = dirty.deadline()
+    if autosave is not None:
+        deadlines.append(autosave)
+    until = app_state.get("status_msg_until", 0)
+    if app_state.get("status_msg") and until > time.time():
+        deadlines.append(until)
+    if app_state.get("active_tab") == "notes" and not app_state.get("nav_mode", True):
+        deadlines.append(app_state.get("_cursor_last_blink", 0) + CURSOR_BLINK_INTERVAL)
+    if app_state["palette_mode"] and palette_scanning():
+        deadlines.append(time.time())  # keep matching between keys
+    if search_index.building():
+        deadlines.append(time.time())
+    return min(deadlines) if deadlines else None
+
+
+ANSI_ESCAPE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+FOREGROUND_SGR = re.compile(r'\x1B\[(?:3[0-7]|9[0-7])m')  # replaces only the foreground
+
+
+def strip_ansi(text):
+    """Remove ANSI escape codes from text"""
+    return ANSI_ESCAPE.sub('', text)
+
+
+def notes_panel_width(terminal_width):
+    """Wrap width of the notes panel, shared by render_frame and caret moves"""
+    side_width = min(max(MIN_SIDE_WIDTH, terminal_width // 4), terminal_width // 3)
+    return max(1, terminal_width - side_width - 2)
+
+
+# Canvas cell attributes: every distinct SGR prefix gets a small ID so a
+# cell is a (char, ID) pair instead of a `color + ch + NORMAL` string
+ATTR_SGR = [""]  # attribute ID -> SGR prefix; 0 is the terminal default
+_attr_ids = {"": 0, NORMAL: 0}
+_attr_switch = {}  # (from ID or None, to ID) -> escape sequence
+
+
+def attr_id(sgr):
+    """Return the attribute ID of an SGR prefix, registering it on first use"""
+    attr = _attr_ids.get(sgr)
+    if attr is None:
+        attr = len(ATTR_SGR)
+        if attr > 255:
+            raise ValueError("too many distinct canvas attributes")
+        ATTR_SGR.append(sgr)
+        _attr_ids[sgr] = attr
+    return attr
+
+
+def attr_switch(current, attr):
+    """Escape sequence that changes the terminal from `current` to `attr`.
+
+    `current` is None when the terminal state is unknown. Going from one
+    plain foreground colour to another skips the reset.
+    """
+    seq = _attr_switch.get((current, attr))
+    if seq is None:
+        sgr = ATTR_SGR[attr]
+        if current and attr and FOREGROUND_SGR.fullmatch(ATTR_SGR[current]) and FOREGROUND_SGR.fullmatch(sgr):
+            seq = sgr
+        else:
+            seq = NORMAL + sgr
+        _attr_switch[(current, attr)] = seq
+    return seq
+
+
+class Canvas:
+    """One frame of cells: per row, a list of characters and a bytearray of
+    attribute IDs (see attr_id). Rows may be indexed from the end (-1)."""
+
+    __slots__ = ("width", "height", "chars", "attrs")
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.chars = [[" "] * width for _ in range(height)]
+        self.attrs = [bytearray(width) for _ in range(height)]
+
+    def put(self, y, x, text, attr=0):
+        """Write text at (y, x) in a single attribute, clipped to the row"""
+        n = min(len(text), self.width - x)
+        if n <= 0:
+            return
+        self.chars[y][x:x + n] = text[:n]
+        self.attrs[y][x:x + n] = bytes((attr,)) * n
+
+    def blit(self, rows, x, y):
+        """Copy (chars, attrs) rows, e.g. from draw_box, with their top-left at (x, y)"""
+        if not rows:
+            return
+        n = max(0, min(len(rows[0][0]), self.width - x))
+        for chars, attrs, (src_chars, src_attrs) in zip(self.chars[y:], self.attrs[y:], rows):
+            chars[x:x + n] = src_chars[:n]
+            attrs[x:x + n] = src_attrs[:n]
+
+
+def today_ordinal():
+    """Today's day ordinal, recomputed only when the date rolls over."""
+    now = time.time()
+    if now >= app_state["_today_until"]:
+        today = date.today()
+        app_state["_today_ordinal"] = today.toordinal()
+        tomorrow = date.fromordinal(today.toordinal() + 1)
+        app_state["_today_until"] = time.mktime(tomorrow.timetuple())
+    return app_state["_today_ordinal"]
+
+
+def ordinal_status(ordinal):
+    """'ok', 'today' or 'past' for a deadline day ordinal."""
+    if ordinal == NO_DEADLINE:
+        return 'ok'
+    today = today_ordinal()
+    if ordinal < today:
+        return 'past'
+    if ordinal == today:
+        return 'today'
+    return 'ok'
+
+
+def todo_sort_key(todo, index, mode):
+    """Sort key of one todo for `mode`; the index keeps equal keys in list order."""
+    if mode == "priority":
+        # sort by priority index (lower = higher priority), then by earlier deadline
+        return (todo.priority, todo.deadline_ord, index)
+    if mode == "deadline":
+        # sort by deadline (earlier first, none last), then by priority
+        return (todo.deadline_ord, todo.priority, index)
+    # created: older first
+    return (todo.created_ts, index)
+
+
+class DisplayOrderCache:
+    """Sorted display order per (topic, sort mode), kept across frames.
+
+    Each entry holds the sorted keys, the resulting list of todo indices and
+    a reverse map index -> display position. Appends are merged in place;
+    other structural changes drop the topic's entries, which are rebuilt on
+    next use.
+    """
+
+    def __init__(self):
+        self.entries = {}  # (topic, mode) -> [keys, order, positions or None]
+
+    def clear(self):
+        self.entries.clear()
+
+    def entry(self, topic, mode):
+        entry = self.entries.get((topic, mode))
+        if entry is None:
+            todos = app_state.get("todos", {}).get(topic, [])
+            keys = [todo_sort_key(t, i, mode) for i, t in enumerate(todos)]
+            keys.sort()
+            entry = [keys, [k[-1] for k in keys], None]
+            self.entries[(topic, mode)] = entry
+        return entry
+
+    def order(self, topic, mode):
+        return self.entry(topic, mode)[1]
+
+    def position(self, topic, mode, index):
+        """Display position of todo `index` (0 if unknown)"""
+        entry = self.entry(topic, mode)
+        if entry[2] is None:
+            entry[2] = {i: pos for pos, i in enumerate(entry[1])}
+        return entry[2].get(index, 0)
+
+    def todo_added(self, topic, index):
+        todos = app_state["todos"][topic]
+        for mode in SORT_MODES:
+            entry = self.entries.get((topic, mode))
+            if entry is None:
+                continue
+            if index != len(todos) - 1:
+                # an insert in the middle renumbers later todos
+                self.invalidate(topic)
+                return
+            key = todo_sort_key(todos[index], index, mode)
+            pos = bisect.bisect_left(entry[0], key)
+            entry[0].insert(pos, key)
+            entry[1].insert(pos, index)
+            entry[2] = None
+
+    def invalidate(self, topic):
+        for mode in SORT_MODES:
+            self.entries.pop((topic, mode), None)
+
+
+display_order = DisplayOrderCache()
+
+
+class TopicStats:
+    """Per-topic todo counters, adjusted by the mutators instead of rescanned.
+
+    counts(topic) is [total, completed, overdue, due today, then open todos
+    per priority]; the deadline buckets only count open todos. A topic is
+    counted on first use and kept up to date afterwards, so badges cost
+    O(visible topics) per frame. The deadline buckets depend on the date,
+    so everything is recounted once when it rolls over.
+    """
+
+    TOTAL, DONE, OVERDUE, TODAY, PRIORITY = range(5)
+
+    def __init__(self):
+        self.by_topic = {}  # topic ID -> counts
+        self.totals = None  # counts summed over all topics
+        self.today = None
+
+    def clear(self):
+        self.by_topic.clear()
+        self.totals = None
+
+    def check_date(self):
+        today = today_ordinal()
+        if today != self.today:
+            self.today = today
+            self.clear()
+
+    def tally(self, counts, todo, sign):
+        counts[TopicStats.TOTAL] += sign
+        if todo.completed:
+            counts[TopicStats.DONE] += sign
+            return
+        if todo.deadline_ord < self.today:
+            counts[TopicStats.OVERDUE] += sign
+        elif todo.deadline_ord == self.today:
+            counts[TopicStats.TODAY] += sign
+        counts[TopicStats.PRIORITY + todo.priority] += sign
+
+    def counts(self, topic):
+        self.check_date()
+        counts = self.by_topic.get(topic)
+        if counts is None:
+            counts = [0] * (TopicStats.PRIORITY + len(PRIORITIES))
+            todos_map = app_state["todos"]
+            if not (isinstance(todos_map, LazyTodos) and todos_map.tally(topic, counts, self.today)):
+                for todo in todos_map.get(topic, ()):
+                    self.tally(counts, todo, 1)
+            self.by_topic[topic] = counts
+        return counts
+
+    def total(self):
+        self.check_date()
+        if self.totals is None:
+            totals = [0] * (TopicStats.PRIORITY + len(PRIORITIES))
+            for topic in app_state["topics"]:
+                for k, n in enumerate(self.counts(topic)):
+                    totals[k] += n
+            self.totals = totals
+        return self.totals
+
+    def changed(self, topic, todo, sign):
+        """Count `todo` into (+1) or out of (-1) `topic`"""
+        self.check_date()
+        if topic in self.by_topic:
+            self.tally(self.by_topic[topic], todo, sign)
+        if self.totals is not None:
+            self.tally(self.totals, todo, sign)
+
+    def topic_removed(self, topic):
+        """Call before the topic's todos are dropped"""
+        if self.totals is not None:
+            for k, n in enumerate(self.counts(topic)):
+                self.totals[k] -= n
+        self.by_topic.pop(topic, None)
+
+
+topic_stats = TopicStats()
+
+
+def get_todo_display_order(topic):
+    """Return a list of indices for todos in `topic` sorted according to current sort mode.
+
+    The returned list contains original indices into the underlying todos list.
+    It is cached (see DisplayOrderCache) and must not be modified.
+    """
+    return display_order.order(topic, app_state.get("sort_mode", "priority"))
+
+
+def get_todo_display_position(topic, index):
+    """Return where todo `index` appears in the current display order, in O(1)."""
+    return display_order.position(topic, app_state.get("sort_mode", "priority"), index)
+
+
+SEARCH_TOKEN = re.compile(r"\w+")
+
+
+def search_tokens(text):
+    """Set of lowercased word tokens in `text`"""
+    return set(SEARCH_TOKEN.findall(text.lower()))
+
+
+class SearchIndex:
+    """Inverted index from word tokens to the topics and todos containing them.
+
+    Todo postings hold Todo objects (by identity), so they stay valid while
+    indices shift; topic IDs are posted separately. A todo of a topic still
+    undecoded in a TODO_V2 file is posted as (topic, index) from the raw
+    block, and swapped for its Todo when the topic is decoded. A sorted
+    vocabulary answers prefix queries with a bisect. Topics and todos are
+    added and removed as they change; an edited todo's notes are only
+    re-tokenized by the next search. After a load the main loop builds the
+    index a slice at a time in idle frames (see build_step); a search
+    before it is done finishes the build at once. Until a topic has been
+    indexed, changes to it are left to the build.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.todos = {}  # token -> set of Todos or (topic, index)
+        self.topics = {}  # token -> set of topic IDs
+        self.vocabulary = []  # sorted tokens of both
+        self.terms = {}  # todo key or topic ID -> its tokens
+        self.owner = {}  # todo key -> topic
+        self.stale = set()  # Todos whose notes changed
+        self.queue = None  # topics still to index while building
+        self.runs = []  # sorted batches of new tokens while building
+        self.fresh = []  # new tokens not in a run yet
+        self.dropped = set()  # tokens in a run that lost their last posting
+        self.ready = False
+
+    def building(self):
+        return self.queue is not None
+
+    def start(self):
+        """Begin a fresh build over the current topics; see build_step"""
+        self.clear()
+        self.queue = list(app_state["topics"])
+        self.queue.reverse()  # popped from the end, so indexed in order
+
+    def build_step(self, budget=None):
+        """Index queued topics for about `budget` seconds (None = all of them).
+
+        Returns True once the index is complete.
+        """
+        if self.ready:
+            return True
+        if self.queue is None:
+            self.start()
+        topics = app_state["topics"]
+        todos_map = app_state["todos"]
+        postings = self.todos
+        terms = self.terms
+        owner = self.owner
+        queue = self.queue
+        until = None if budget is None else time.perf_counter() + budget
+        while queue:
+            topic = queue.pop()
+            if topic in terms or topic not in topics:
+                continue  # indexed when it was restored, or deleted since
+            terms[topic] = search_tokens(topics.name(topic))
+            self.post(self.topics, topic, terms[topic])
+            texts = todos_map.texts(topic) if isinstance(todos_map, LazyTodos) else None
+            if texts is None:
+                entries = [(todo, self.todo_tokens(todo)) for todo in todos_map.get(topic, ())]
+            else:
+                entries = [((topic, i), search_tokens(text)) for i, text in enumerate(texts)]
+            for key, words in entries:
+                terms[key] = words
+                for token in words:
+                    bucket = postings.get(token)
+                    if bucket is None:
+                        if token not in self.topics:
+                            self.add_token(token)
+                        bucket = postings[token] = set()
+                    bucket.add(key)
+                owner[key] = topic
+            if until is not None and time.perf_counter() > until:
+                self.cut_run()
+                return False
+        self.cut_run()
+        vocabulary = []
+        for run in self.runs:
+            vocabulary += run
+        vocabulary.sort()  # merges the runs
+        if self.dropped:
+            dropped = self.dropped
+            vocabulary = [token for token in vocabulary if token not in dropped]
+        self.vocabulary = vocabulary
+        self.runs = []
+        self.dropped = set()
+        self.queue = None
+        self.ready = True
+        # The index and the data live until exit; keep them out of the full
+        # collections, which would otherwise walk them all (~220 ms at 100k todos)
+        gc.freeze()
+        return True
+
+    def cut_run(self):
+        """Sort the tokens found by a build step into a run, merging runs
+        of similar size so the final merge stays cheap
+        """
+        runs = self.runs
+        if self.fresh:
+            self.fresh.sort()
+            runs.append(self.fresh)
+            self.fresh = []
+        while len(runs) > 1 and len(runs[-2]) <= 2 * len(runs[-1]):
+            merged = runs.pop(-2)
+            merged += runs.pop()
+            merged.sort()
+            runs.append(merged)
+
+    def add_token(self, token):
+        """A token got its first posting"""
+        if self.ready:
+            bisect.insort(self.vocabulary, token)
+        elif token in self.dropped:
+            self.dropped.discard(token)  # still in its run
+        else:
+            self.fresh.append(token)
+
+    def drop_token(self, token):
+        """A token lost its last posting"""
+        if self.ready:
+            del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+        else:
+            self.dropped.add(token)
+
+    def todo_tokens(self, todo):
+        notes = todo.notes_b64
+        if notes is not None:
+            # tokenize lazily loaded notes without keeping them decoded
+            try:
+                notes = base64.b64decode(notes.encode("ascii")).decode("utf-8")
+            except Exception:
+                notes = ""
+        else:
+            notes = todo.notes or ""
+        return search_tokens(todo.name + "\n" + notes)
+
+    def post(self, postings, key, tokens):
+        for token in tokens:
+            keys = postings.get(token)
+            if keys is None:
+                if token not in self.todos and token not in self.topics:
+                    self.add_token(token)
+                keys = postings[token] = set()
+            keys.add(key)
+
+    def unpost(self, postings, key, tokens):
+        for token in tokens:
+            keys = postings[token]
+            keys.discard(key)
+            if not keys:
+                del postings[token]
+                if token not in self.todos and token not in self.topics:
+                    self.drop_token(token)
+
+    def add_topic(self, topic):
+        if self.ready or self.building():
+            self.terms[topic] = search_tokens(topic_name(topic))
+            self.post(self.topics, topic, self.terms[topic])
+
+    def remove_topic(self, topic, todos=()):
+        if topic in self.terms:
+            self.unpost(self.topics, topic, self.terms.pop(topic))
+            for todo in todos:
+                self.remove_todo(todo)
+
+    def rename_topic(self, topic):
+        if topic in self.terms:
+            self.unpost(self.topics, topic, self.terms.pop(topic))
+            self.add_topic(topic)
+
+    def add_todo(self, topic, todo):
+        if topic in self.terms:
+            self.owner[todo] = topic
+            self.terms[todo] = self.todo_tokens(todo)
+            self.post(self.todos, todo, self.terms[todo])
+
+    def remove_todo(self, todo):
+        if todo in self.owner:
+            self.unpost(self.todos, todo, self.terms.pop(todo))
+            del self.owner[todo]
+            self.stale.discard(todo)
+
+    def topic_decoded(self, topic, count, todos):
+        """Swap the (topic, index) postings of a just decoded topic for its Todos"""
+        if topic not in self.terms:
+            return  # not indexed yet: the build will see it decoded
+        terms = self.terms
+        owner = self.owner
+        postings = self.todos
+        for i in range(count):
+            key = (topic, i)
+            words = terms.pop(key, None)
+            if words is None:
+                continue
+            del owner[key]
+            if i >= len(todos):
+                self.unpost(postings, key, words)  # past the damage in its block
+                continue
+            todo = todos[i]
+            for token in words:
+                bucket = postings[token]
+                bucket.discard(key)
+                bucket.add(todo)
+            terms[todo] = words
+            owner[todo] = topic
+
+    def todo_keys(self, topic):
+        """Index keys of a topic's todos, without decoding it"""
+        todos_map = app_state["todos"]
+        block = todos_map.blocks.get(topic) if isinstance(todos_map, LazyTodos) else None
+        if block is None:
+            return todos_map.get(topic, ())
+        owner = self.owner
+        return [(topic, i) for i in range(block[0]) if (topic, i) in owner]
+
+    def notes_changed(self, todo):
+        if todo in self.owner:
+            self.stale.add(todo)
+
+    def refresh(self):
+        for todo in self.stale:
+            if todo in self.owner:
+                self.unpost(self.todos, todo, self.terms[todo])
+                self.terms[todo] = self.todo_tokens(todo)
+                self.post(self.todos, todo, self.terms[todo])
+        self.stale.clear()
+
+    def lookup(self, prefix):
+        """(topics, todos) with a token starting with `prefix`"""
+        vocabulary = self.vocabulary
+        i = bisect.bisect_left(vocabulary, prefix)
+        j = bisect.bisect_left(vocabulary, prefix + "\U0010ffff", i)
+        empty = ()
+        topics = set().union(*[self.topics.get(token, empty) for token in vocabulary[i:j]])
+        todos = set().union(*[self.todos.get(token, empty) for token in vocabulary[i:j]])
+        return topics, todos
+
+    def search(self, query, limit):
+        """Match every query word as a prefix; a todo also matches words of its topic.
+
+        Returns (total, results) with at most `limit` (topic, todo or None)
+        pairs, topics first, in display order.
+        """
+        self.build_step()
+        self.refresh()
+        words = SEARCH_TOKEN.findall(query.lower())
+        if not words:
+            return 0, []
+        todos_map = app_state["todos"]
+        found = [self.lookup(word) for word in words]
+        found.sort(key=lambda f: len(f[0]) + len(f[1]))
+        topics = matched = None
+        for hit_topics, hits in found:
+            # a todo matches a word through its own text or its topic's name
+            hits.update(*[self.todo_keys(topic) for topic in hit_topics])
+            topics = hit_topics if topics is None else topics & hit_topics
+            matched = hits if matched is None else matched & hits
+            if not matched and not topics:
+                break
+        # list hits in display order, stopping once `limit` is reached
+        results = [(topic, None) for topic in app_state["topics"] if topic in topics][:limit]
+        if matched and len(results) < limit:
+            owners = None
+            if len(matched) < 10 * limit:
+                # sparse: only walk the topics that hold a match
+                owner = self.owner
+                owners = {owner[t] for t in matched}
+            for topic in app_state["topics"]:
+                if owners is not None and topic not in owners:
+                    continue
+                keys = self.todo_keys(topic)
+                if keys and isinstance(keys[0], tuple):
+                    # undecoded: decode it only if it is listed
+                    hit = [key[1] for key in keys if key in matched]
+                    if hit:
+                        todos = todos_map[topic]
+                        results.extend((topic, todos[i]) for i in hit if i < len(todos))
+                else:
+                    results.extend((topic, t) for t in keys if t in matched)
+                if len(results) >= limit:
+                    break
+            del results[limit:]
+        return len(topics) + len(matched), results
+
+
+search_index = SearchIndex()
+
+_box_cache = {}  # (width, height, title, is_selected, is_active) -> (chars, attrs) rows
+
+
+def draw_box(width, height, title="", is_selected=False, is_active=False):
+    """Creates a box with optional title and border colors based on selection state.
+
+    Returns (chars, attrs) rows for Canvas.blit, memoised per geometry and
+    focus state; the rows are shared and must not be modified.
+    """
+    key = (width, height, title, is_selected, is_active)
+    box = _box_cache.get(key)
+    if box is not None:
+        return box
+    color = attr_id(ACTIVE_COLOR if is_active else (SELECTED_COLOR if is_selected else NORMAL))
+
+    # Title space, colored separately to give the active tab a tab-like look
+    title_space = f" {title} " if title else ""
+    if is_active:
+        title_color = attr_id(TAB_BG + TAB_FG)
+    elif is_selected:
+        title_color = attr_id(INFO_LABEL_COLOR)
+    else:
+        title_color = 0
+    remaining_width = width - len(title_space) - 2  # -2 for corners
+    top_text = "┌" + title_space + "─" * remaining_width + "┐"
+    top_attrs = bytearray((color,)) * len(top_text)
+    top_attrs[1:1 + len(title_space)] = bytes((title_color,)) * len(title_space)
+    top = (list(top_text), top_attrs)
+    middle = (list("│" + " " * (width - 2) + "│"), bytearray((color,)) * width)
+    bottom = (list("└" + "─" * (width - 2) + "┘"), bytearray((color,)) * width)
+    box = [top]
+    box.extend(middle for _ in range(height - 2))
+    box.append(bottom)
+    if len(_box_cache) > 64:
+        _box_cache.clear()  # geometry changed a lot (resizing); start over
+    _box_cache[key] = box
+    return box
+
+class UndoLog:
+    """Undo/redo as a log of inverse deltas, never copies of the data.
+
+    Each mutator records just enough to reverse itself: the text a notes
+    edit removed and inserted, the Todo a delete took out, a deleted
+    topic's name, position and todo list. undo() and redo() re-apply an
+    entry through the same mutators, so the journal, caches and counters
+    follow, at a cost proportional to the change. Consecutive typing or
+    backspacing in one todo's notes is a single step; a newline ends it.
+    Entries are charged the text they hold and the oldest are dropped
+    once the log passes `limit` bytes.
+    """
+
+    OVERHEAD = 128  # rough bytes per entry besides the text it holds
+    LABELS = {"TOPIC_ADD": "new topic", "TOPIC_DEL": "delete topic", "TOPIC_RENAME": "rename topic",
+              "TOPIC_MOVE": "move topic", "TODO_ADD": "new todo", "TODO_DEL": "delete todo",
+              "TODO_TOGGLE": "toggle todo", "NOTES": "notes edit"}
+
+    def __init__(self, limit=UNDO_LIMIT_BYTES):
+        self.limit = limit
+        self.undo_stack = deque()  # [op, size, topic, fields...], newest last
+        self.redo_stack = []
+        self.size = 0  # bytes charged to both stacks
+        self.applying = False  # undo/redo in progress: mutators record nothing
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.size = 0
+
+    def record(self, op, size, topic, *fields):
+        """Log a mutation; `size` is the bytes of text the entry keeps alive"""
+        if self.applying or not self.limit:
+            return
+        if self.redo_stack:
+            self.size -= sum(entry[1] for entry in self.redo_stack)
+            self.redo_stack.clear()
+        if op == "NOTES" and self.coalesce(topic, *fields):
+            return
+        entry = [op, size + self.OVERHEAD, topic, *fields]
+        self.undo_stack.append(entry)
+        self.size += entry[1]
+        self.evict()
+
+    def coalesce(self, topic, index, start, removed, inserted):
+        """Fold a notes edit into the previous entry if it continues it"""
+        if not self.undo_stack:
+            return False
+        last = self.undo_stack[-1]
+        if last[0] != "NOTES" or last[2] != topic or last[3] != index:
+            return False
+        last_start, last_removed, last_inserted = last[4:]
+        if not removed and not last_removed:
+            # typing on from where the last insert ended, up to a newline
+            if start != last_start + len(last_inserted) or "\n" in last_inserted or "\n" in inserted[:-1]:
+                return False
+            last[6] = last_inserted + inserted
+        elif not inserted and not last_inserted:
+            if start + len(removed) == last_start:  # Backspace
+                last[4] = start
+                last[5] = removed + last_removed
+            elif start == last_start:  # Delete
+                last[5] = last_removed + removed
+            else:
+                return False
+        else:
+            return False
+        last[1] += len(removed) + len(inserted)
+        self.size += len(removed) + len(inserted)
+        self.evict()
+        return True
 
+    def evict(self):
+        """Drop the oldest entries until the log fits in `limit`"""
+        while self.size > self.limit and self.undo_stack:
+            self.size -= self.undo_stack.popleft()[1]
+        while self.size > self.limit and self.redo_stack:
+            self.size -= self.redo_stack.pop(0)[1]
 
-def get_todo_display_order(topic):
-    """Return a list of indices for todos in `topic` sorted according to current sort mode.
+    def undo(self):
+        """Reverse the newest entry; returns its label, or None if there is none"""
+        if not self.undo_stack:
+            return None
+        entry = self.undo_stack.pop()
+        self.apply(entry, True)
+        self.redo_stack.append(entry)
+        return self.LABELS[entry[0]]
 
-    The returned list contains original indices into the underlying todos list.
-    """
-    todos = app_state.get("todos", {}).get(topic, [])
-    indices = list(range(len(todos)))
-    mode = app_state.get("sort_mode", "priority")
+    def redo(self):
+        """Re-apply the newest undone entry; returns its label, or None"""
+        if not self.redo_stack:
+            return None
+        entry = self.redo_stack.pop()
+        self.apply(entry, False)
+        self.undo_stack.append(entry)
+        return self.LABELS[entry[0]]
 
-    def deadline_key(t):
-        d = t.get("deadline")
-        # treat None/empty as far future
-        return d if d else "9999-12-31"
+    def apply(self, entry, undo):
+        """Run an entry backwards (undo) or forwards, selecting what it touched"""
+        op, _, topic, *fields = entry
+        topics = app_state["topics"]
+        self.applying = True
+        try:
+            if op in ("TOPIC_ADD", "TOPIC_DEL"):
+                name, position, todos = fields
+                if (op == "TOPIC_ADD") == undo:
+                    delete_topic(topics.index(topic))
+                else:
+                    restore_topic(topic, name, position, todos)
+                    app_state["topic_index"] = position
+            elif op == "TOPIC_RENAME":
+                rename_topic(topics.index(topic), fields[0] if undo else fields[1])
+                app_state["topic_index"] = topics.index(topic)
+            elif op == "TOPIC_MOVE":
+                old, new = fields
+                move_topic(new if undo else old, old if undo else new)
+            else:
+                app_state["topic_index"] = topics.index(topic)
+                index = fields[0]
+                if op in ("TODO_ADD", "TODO_DEL"):
+                    if (op == "TODO_ADD") == undo:
+                        delete_todo(app_state["topic_index"], index)
+                    else:
+                        insert_todo(topic, fields[1], index)
+                        app_state["todo_index"] = index
+                elif op == "TODO_TOGGLE":
+                    toggle_todo(app_state["topic_index"], index)
+                    app_state["todo_index"] = index
+                elif op == "NOTES":
+                    start, removed, inserted = fields[1:]
+                    old, new = (inserted, removed) if undo else (removed, inserted)
+                    app_state["todo_index"] = index
+                    edit_notes(start, start + len(old), new)
+                    app_state["notes_cursor_offset"] = start + len(new)
+                    app_state["notes_selection_anchor"] = None
+            app_state["last_topic_index"] = app_state["topic_index"]
+        finally:
+            self.applying = False
 
-    if mode == "priority":
-        # sort by priority index (lower = higher priority), then by earlier deadline
-        indices.sort(key=lambda i: (todos[i].get("priority", len(PRIORITIES) - 1), deadline_key(todos[i])))
-    elif mode == "deadline":
-        # sort by deadline (earlier first), then by priority
-        indices.sort(key=lambda i: (deadline_key(todos[i]), todos[i].get("priority", len(PRIORITIES) - 1)))
-    else:  # created
-        # sort by created_at string (lexicographic YYYY-MM-DD HH:MM:SS) -> older first
-        indices.sort(key=lambda i: todos[i].get("created_at", ""))
 
-    return indices
+undo_log = UndoLog()
+
+
+def todo_undo_size(todo):
+    """Bytes of text an undo entry holding `todo` keeps alive"""
+    return len(todo.name) + todo.notes_size()
 
-def draw_box(width, height, title="", is_selected=False, is_active=False):
-    """Creates a box with optional title and border colors based on selection state"""
-    color = ACTIVE_COLOR if is_active else (SELECTED_COLOR if is_selected else NORMAL)
-    # Calculate title space (visible) and allow title coloring separately
-    title_space = f" {title} " if title else ""
-    title_visible_len = len(strip_ansi(title_space))
-    remaining_width = width - title_visible_len - 2  # -2 for corners
-    # Colorize title differently for active tab to give a tab-like look
-    if title:
-        if is_active:
-            title_display = f"{TAB_BG}{TAB_FG}{title_space}{NORMAL}"
-        elif is_selected:
-            title_display = f"{INFO_LABEL_COLOR}{title_space}{NORMAL}"
-        else:
-            title_display = title_space
-    else:
-        title_display = title_space
-    # Top border: left corner, title, then border color for the rest
-    top = f"{color}┌{title_display}{color}{'─' * remaining_width}┐{NORMAL}"
-    middle = f"{color}│{' ' * (width - 2)}│{NORMAL}"
-    bottom = f"{color}└{'─' * (width - 2)}┘{NORMAL}"
-    assert len(strip_ansi(top)) == width
-    assert len(strip_ansi(middle)) == width
-    assert len(strip_ansi(bottom)) == width
-    box = [top]
-    box.extend(middle for _ in range(height - 2))
-    box.append(bottom)
-    return box
 
 def create_topic(name):
-    """Adds a new topic and makes it the current selection"""
-    app_state["topics"].append(name)
+    """Adds a new topic and makes it the current selection; returns its ID"""
+    topic = app_state["topics"].add(name)
+    app_state["todos"][topic] = []
+    journal.record("TOPIC_ADD", topic, name)
+    undo_log.record("TOPIC_ADD", len(name), topic, name, len(app_state["topics"]) - 1, [])
+    search_index.add_topic(topic)
     app_state["topic_index"] = len(app_state["topics"]) - 1
     app_state["last_topic_index"] = app_state["topic_index"]
     # Switch to topics focus mode
@@ -421,17 +2937,60 @@ def create_topic(name):
     # Finish input mode after creating a single topic
     app_state["input_mode"] = False
     app_state["input_callback"] = None
+    return topic
 
 def delete_topic(index):
     """Removes a topic and its todos, updates selection"""
     if 0 <= index < len(app_state["topics"]):
-        topic = app_state["topics"].pop(index)
+        topic = app_state["topics"][index]
+        name = app_state["topics"].name(topic)
+        todos = app_state["todos"].get(topic, [])
+        undo_log.record("TOPIC_DEL", len(name) + sum(map(todo_undo_size, todos)), topic, name, index, todos)
+        app_state["topics"].delete(topic)
+        journal.record("TOPIC_DEL", topic)
+        search_index.remove_topic(topic, app_state["todos"].get(topic, ()))
+        topic_stats.topic_removed(topic)
         if topic in app_state["todos"]:
             del app_state["todos"][topic]
+        display_order.invalidate(topic)
         # fix topic_index bounds
         app_state["topic_index"] = min(index, max(0, len(app_state["topics"]) - 1))
         app_state["last_topic_index"] = app_state["topic_index"]
 
+def rename_topic(index, name):
+    """Renames the topic at `index`; its ID and todos stay put"""
+    if name and 0 <= index < len(app_state["topics"]):
+        topic = app_state["topics"][index]
+        old = app_state["topics"].name(topic)
+        app_state["topics"].rename(topic, name)
+        journal.record("TOPIC_RENAME", topic, name)
+        undo_log.record("TOPIC_RENAME", len(old) + len(name), topic, old, name)
+        search_index.rename_topic(topic)
+
+def move_topic(index, new_index):
+    """Moves the topic at `index` to `new_index` and keeps it selected"""
+    topics = app_state["topics"]
+    if 0 <= index < len(topics) and 0 <= new_index < len(topics) and index != new_index:
+        topic = topics[index]
+        topics.move(topic, new_index)
+        journal.record("TOPIC_MOVE", topic, new_index)
+        undo_log.record("TOPIC_MOVE", 0, topic, index, new_index)
+        app_state["topic_index"] = new_index
+        app_state["last_topic_index"] = new_index
+
+def restore_topic(topic, name, position, todos):
+    """Puts a deleted topic back under its old ID at `position`, with its todos"""
+    topics = app_state["topics"]
+    topics.add(name, topic_id=topic)
+    app_state["todos"][topic] = []
+    journal.record("TOPIC_ADD", topic, name)
+    search_index.add_topic(topic)
+    if position < len(topics) - 1:
+        topics.move(topic, position)
+        journal.record("TOPIC_MOVE", topic, position)
+    for todo in todos:
+        insert_todo(topic, todo)
+
 def create_todo(name):
     """Step 1: Start creating a new todo - asks for priority"""
     app_state["multi_step_data"]["name"] = name
@@ -440,8 +2999,8 @@ def create_todo(name):
     app_state["input_prompt"] = f"Priority? (1={PRIORITIES[0]},2={PRIORITIES[1]},3={PRIORITIES[2]},4={PRIORITIES[3]}): "
     app_state["input_callback"] = todo_priority_step
 
-def todo_priority_step(priority_input):
-    """Step 2: Save todo priority, then ask for deadline"""
+def parse_priority(priority_input):
+    """Map a 1-based priority answer to a PRIORITIES index ('None' if invalid)"""
     try:
         priority_index = int(priority_input) - 1
         if not (0 <= priority_index < len(PRIORITIES)):
@@ -450,6 +3009,25 @@ def todo_priority_step(priority_input):
     except Exception:
         # On parse error default to 'None'
         priority_index = len(PRIORITIES) - 1
+    return priority_index
+
+
+def parse_deadline(deadline_input):
+    """Return a validated DD-MM-YYYY deadline, or None for skip/invalid input"""
+    if not deadline_input or deadline_input.strip().lower() == 's':
+        return None
+    # Expect DD-MM-YYYY; validate roughly
+    try:
+        time.strptime(deadline_input.strip(), "%d-%m-%Y")
+        return deadline_input.strip()
+    except Exception:
+        # invalid format -> treat as no deadline
+        return None
+
+
+def todo_priority_step(priority_input):
+    """Step 2: Save todo priority, then ask for deadline"""
+    priority_index = parse_priority(priority_input)
 
     # store the chosen priority and prompt for deadline (or skip)
     app_state["multi_step_data"]["priority"] = priority_index
@@ -462,35 +3040,12 @@ def todo_deadline_step(deadline_input):
     """Step 3: Save deadline (if given) and create the todo"""
     name = app_state["multi_step_data"].get("name", "")
     priority_index = app_state["multi_step_data"].get("priority", len(PRIORITIES) - 1)
-    deadline = None
-
-    if deadline_input and deadline_input.lower() == 's':
-        deadline = None
-    elif deadline_input:
-        # Expect DD-MM-YYYY; validate roughly
-        try:
-            time.strptime(deadline_input.strip(), "%d-%m-%Y")
-            deadline = deadline_input.strip()
-        except Exception:
-            # invalid format -> treat as no deadline
-            deadline = None
+    deadline = parse_deadline(deadline_input)
 
     if name and app_state["topics"]:
         current_topic = app_state["topics"][app_state["topic_index"]]
-        if current_topic not in app_state["todos"]:
-            app_state["todos"][current_topic] = []
-        # record creation time
-        created = time.strftime("%d-%m-%Y %H:%M:%S", time.localtime())
-        app_state["todos"][current_topic].append({
-            "name": name,
-            "priority": priority_index,
-            "completed": False,
-            "created_at": created,
-            "deadline": deadline,
-            "notes": ""
-        })
         # select the newly added todo
-        app_state["todo_index"] = len(app_state["todos"][current_topic]) - 1
+        app_state["todo_index"] = add_todo(current_topic, name, priority_index, deadline)
 
     # finish input mode and remain in focus mode on todos
     app_state["multi_step_data"] = {}
@@ -498,12 +3053,38 @@ def todo_deadline_step(deadline_input):
     app_state["nav_mode"] = False
     app_state["active_tab"] = "todos"
 
+def add_todo(topic, name, priority_index, deadline):
+    """Append a new todo to `topic` and return its index"""
+    # record creation time
+    created = time.strftime("%d-%m-%Y %H:%M:%S", time.localtime())
+    return insert_todo(topic, Todo(name, priority_index, False, created, deadline))
+
+def insert_todo(topic, todo, index=None):
+    """Insert an existing Todo into `topic` (appends by default); returns its index"""
+    if topic not in app_state["todos"]:
+        app_state["todos"][topic] = []
+    todos = app_state["todos"][topic]
+    if index is None:
+        index = len(todos)
+    todos.insert(index, todo)
+    display_order.todo_added(topic, index)
+    search_index.add_todo(topic, todo)
+    topic_stats.changed(topic, todo, 1)
+    journal.record("TODO_ADD", topic, index, *format_todo_meta(todo))
+    undo_log.record("TODO_ADD", 0, topic, index, todo)
+    return index
+
 def delete_todo(topic_index, todo_index):
     """Removes a todo and updates selection if needed"""
     if topic_index < len(app_state["topics"]):
         topic = app_state["topics"][topic_index]
         if topic in app_state["todos"] and todo_index < len(app_state["todos"][topic]):
-            app_state["todos"][topic].pop(todo_index)
+            todo = app_state["todos"][topic].pop(todo_index)
+            display_order.invalidate(topic)
+            search_index.remove_todo(todo)
+            topic_stats.changed(topic, todo, -1)
+            journal.record("TODO_DEL", topic, todo_index)
+            undo_log.record("TODO_DEL", todo_undo_size(todo), topic, todo_index, todo)
             # adjust todo_index
             app_state["todo_index"] = min(todo_index, max(0, len(app_state["todos"].get(topic, [])) - 1))
 
@@ -512,10 +3093,236 @@ def toggle_todo(topic_index, todo_index):
     if topic_index < len(app_state["topics"]):
         topic = app_state["topics"][topic_index]
         if topic in app_state["todos"] and todo_index < len(app_state["todos"][topic]):
-            app_state["todos"][topic][todo_index]["completed"] = not app_state["todos"][topic][todo_index]["completed"]
+            todo = app_state["todos"][topic][todo_index]
+            topic_stats.changed(topic, todo, -1)
+            todo.completed = not todo.completed
+            topic_stats.changed(topic, todo, 1)
+            journal.record("TODO_SET", topic, todo_index, "completed", "1" if todo.completed else "0")
+            undo_log.record("TODO_TOGGLE", 0, topic, todo_index)
+
+def edit_notes(start, end, text):
+    """Replace notes[start:end] of the selected todo with `text`"""
+    topic = app_state["topics"][app_state.get("topic_index", 0)]
+    todo_index = app_state.get("todo_index", 0)
+    todo = app_state["todos"][topic][todo_index]
+    buf = todo.notes_buffer()
+    removed = buf.slice(start, end) if end > start else ""
+    buf.replace(start, end, text)
+    search_index.notes_changed(todo)
+    journal.record("NOTES", topic, todo_index, start, end, text)
+    undo_log.record("NOTES", len(removed) + len(text), topic, todo_index, start, removed, text)
+
+
+class FrameRenderer:
+    """Retained front buffer that only repaints the cells that changed.
+
+    `present` diffs the new canvas against the last one written and emits a
+    cursor move per changed run; within a run, same-attribute cells go out
+    as one string and SGR is switched only when the attribute ID changes.
+    An unchanged canvas writes nothing.
+    """
+
+    # Unchanged cells shorter than this between two changed runs are rewritten
+    # instead of paying for another cursor move (ESC[row;colH is ~8 bytes)
+    MAX_GAP = 6
+
+    def __init__(self):
+        self.front = None  # Canvas currently on screen
+        self.size = None   # (width, height) of the front buffer
+
+    def invalidate(self):
+        """Forget the front buffer so the next frame is a full repaint."""
+        self.front = None
+
+    def present(self, canvas, out):
+        """Write the difference between `canvas` and the front buffer to `out`.
+
+        Returns the number of characters written.
+        """
+        began = time.perf_counter()
+        width, height = canvas.width, canvas.height
+        parts = []
+        front = self.front
+        if front is None or self.size != (width, height):
+            # First frame or resize: clear and paint everything
+            parts.append(NORMAL + CLEAR_SCREEN)
+            front = None
+        current = None  # unknown terminal attribute state
+        for y in range(height):
+            chars = canvas.chars[y]
+            attrs = canvas.attrs[y]
+            if front is None:
+                runs = [(0, width)]
+            else:
+                old_chars = front.chars[y]
+                old_attrs = front.attrs[y]
+                if old_chars == chars and old_attrs == attrs:
+                    continue
+                changed = [x for x, a, b, c, d in zip(range(width), old_chars, chars, old_attrs, attrs)
+                           if a != b or c != d]
+                # group into runs, bridging short unchanged gaps
+                runs = []
+                start = prev = changed[0]
+                for x in changed:
+                    if x - prev > self.MAX_GAP + 1:
+                        runs.append((start, prev + 1))
+                        start = x
+                    prev = x
+                runs.append((start, prev + 1))
+            for x, end in runs:
+                parts.append(f"\033[{y + 1};{x + 1}H")
+                # one string per stretch of equal attributes
+                stops = [i for i in range(x + 1, end) if attrs[i] != attrs[i - 1]]
+                stops.append(end)
+                for stop in stops:
+                    attr = attrs[x]
+                    if attr != current:
+                        parts.append(attr_switch(current, attr))
+                        current = attr
+                    parts.append("".join(chars[x:stop]))
+                    x = stop
+        self.front = canvas
+        self.size = (width, height)
+        if not parts:
+            if profiler.enabled:
+                profiler.add("join", began)
+            return 0
+        parts.append(NORMAL)
+        data = "".join(parts)
+        if profiler.enabled:
+            profiler.add("join", began)
+            began = time.perf_counter()
+        out.write(data)
+        out.flush()
+        if profiler.enabled:
+            profiler.add("write", began)
+        return len(data)
+
+
+renderer = FrameRenderer()
+
+
+class FrameProfiler:
+    """Per-phase timings of the main loop, shown as an overlay row.
+
+    Phases, in milliseconds: canvas (blank canvas and box chrome), fill
+    (panel contents), join (diff and escape string), write (terminal write
+    and flush), input (a batch of keys) and save. Input and save are
+    charged to the frame painted after them. Each frame also records its
+    key-to-paint latency and bytes written. Recording is on while the
+    overlay is shown or a trace file is set.
+    """
+
+    PHASES = ("canvas", "fill", "join", "write", "input", "save")
+
+    def __init__(self, visible=False, trace_path=None):
+        self.visible = visible
+        self.trace_path = trace_path
+        self.enabled = visible or bool(trace_path)
+        self.trace = None  # open trace file
+        self.frame = {}  # phase -> ms for the frame in progress
+        self.key_time = None  # perf_counter of the oldest key not yet painted
+        self.history = {name: deque(maxlen=PROFILE_WINDOW) for name in self.PHASES + ("total", "latency", "bytes")}
+        self.frames = 0
+        self.overruns = 0  # frames slower than 1/FPS
+
+    def toggle(self):
+        """Show or hide the overlay"""
+        self.visible = not self.visible
+        self.enabled = self.visible or bool(self.trace_path)
+        self.frame = {}
+        self.key_time = None
+
+    def add(self, phase, start):
+        """Charge the time since `start` (a perf_counter value) to `phase`"""
+        self.frame[phase] = self.frame.get(phase, 0.0) + (time.perf_counter() - start) * 1000
+
+    def key_arrived(self):
+        """Note that a key is waiting; the next painted frame closes its latency"""
+        if self.key_time is None:
+            self.key_time = time.perf_counter()
+
+    def end_frame(self, nbytes):
+        """Record the frame just written"""
+        frame = self.frame
+        frame["total"] = sum(frame.get(phase, 0.0) for phase in ("canvas", "fill", "join", "write"))
+        if self.key_time is not None:
+            frame["latency"] = (time.perf_counter() - self.key_time) * 1000
+            self.key_time = None
+        frame["bytes"] = nbytes
+        for name, value in frame.items():
+            self.history[name].append(value)
+        self.frames += 1
+        if frame["total"] > 1000 / FPS:
+            self.overruns += 1
+        if self.trace_path:
+            self.write_trace(frame)
+        self.frame = {}
+
+    def write_trace(self, frame):
+        import json
+        if self.trace is None:
+            self.trace = open(self.trace_path, "a", encoding="utf-8")
+        record = {"frame": self.frames, "time": round(time.time(), 6)}
+        record.update((name, round(value, 4)) for name, value in frame.items())
+        self.trace.write(json.dumps(record) + "\n")
+
+    def close(self):
+        """Flush and close the trace file"""
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+
+    @staticmethod
+    def percentile(values, q):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def overlay_text(self):
+        """One line of p50/p99 figures over the recent frames"""
+        fields = [f"{self.frames} frames, {self.overruns} over {1000 / FPS:.0f}ms"]
+        for name in ("total", "canvas", "fill", "join", "write", "input", "save", "latency"):
+            values = self.history[name]
+            if values:
+                label = "key>paint" if name == "latency" else name
+                fields.append(f"{label} {self.percentile(values, 0.5):.2f}/{self.percentile(values, 0.99):.2f}")
+        if self.history["bytes"]:
+            fields.append(f"bytes {self.percentile(self.history['bytes'], 0.5)}/{self.percentile(self.history['bytes'], 0.99)}")
+        return "p50/p99 ms | " + " | ".join(fields)
+
+
+profiler = FrameProfiler(PROFILE_MODE, PROFILE_TRACE)
+
+
+def scroll_viewport(scroll, selected, total, visible):
+    """Return the first visible row of a list viewport.
+
+    The previous offset is kept unless `selected` (a row, or None) would
+    fall within VIEWPORT_OVERSCAN rows of an edge or off screen, then it
+    moves just enough. Always clamped to the list length.
+    """
+    if selected is not None:
+        margin = min(VIEWPORT_OVERSCAN, (visible - 1) // 2)
+        if selected < scroll + margin:
+            scroll = selected - margin
+        elif selected > scroll + visible - 1 - margin:
+            scroll = selected - visible + 1 + margin
+    return max(0, min(scroll, total - visible))
+
+
+def draw_result_list(canvas, lines, selected, scroll_key, top, left, width, height):
+    """Draw a scrolling list of lines at (top, left) with `selected` highlighted"""
+    first = scroll_viewport(app_state.get(scroll_key, 0), selected, len(lines), height)
+    app_state[scroll_key] = first
+    for i, line in enumerate(lines[first:first + height]):
+        is_sel = first + i == selected
+        line = f"{'>' if is_sel else ' '} {line}"
+        canvas.put(top + i, left, line[:width], attr_id(SELECTED_COLOR) if is_sel else 0)
+
 
 def render_frame(terminal_width, terminal_height):
     """Draws all UI elements and calculates their positions"""
+    start = time.perf_counter()
     # Reserve bottom line for help text/input
     usable_height = terminal_height - 1
     
@@ -530,41 +3337,13 @@ def render_frame(terminal_width, terminal_height):
     main_panel_height = usable_height - info_height
     
     # Create canvas first
-    canvas = [[" " for _ in range(terminal_width)] for _ in range(terminal_height)]
-    
-    def write_box_to_canvas(box, x, y):
-        """Places a box on screen, handling color codes properly"""
-        current_color = NORMAL
-        for box_y, line in enumerate(box):
-            if y + box_y >= terminal_height:
-                break
-                
-            canvas_x = x
-            chars = list(line)
-            while chars and canvas_x < terminal_width:
-                if chars[0] == '\033':  # ANSI escape sequence
-                    code = []
-                    while chars and chars[0] != 'm':
-                        code.append(chars.pop(0))
-                    if chars:
-                        code.append(chars.pop(0))
-                    current_color = ''.join(code)
-                else:
-                    if canvas_x < terminal_width:
-                        canvas[y + box_y][canvas_x] = current_color + chars.pop(0) + NORMAL
-                    canvas_x += 1
+    canvas = Canvas(terminal_width, terminal_height)
     
     # Create and position boxes
     # Track topic selection (always show selected topic)
     selected_topic_index = app_state.get("topic_index", 0)
     app_state["last_topic_index"] = app_state.get("topic_index", 0)
 
-    # Create topics box
-    topics_lines = []
-    for i, topic in enumerate(app_state["topics"]):
-        prefix = ">" if i == selected_topic_index else " "
-        topics_lines.append(f"{prefix} {topic}")
-    
     # Write topics content
     topics_box = draw_box(
         side_width, 
@@ -574,26 +3353,6 @@ def render_frame(terminal_width, terminal_height):
         not app_state["nav_mode"] and app_state["active_tab"] == "topics"
     )
     
-    # Build todos content in display order according to sort mode
-    todos_lines = []
-    if app_state["topics"]:
-        current_topic = app_state["topics"][app_state.get("topic_index", 0)]
-        todos = app_state["todos"].get(current_topic, [])
-        ordered_indices = get_todo_display_order(current_topic)
-        selected_underlying = app_state.get("todo_index", 0)
-        for disp_i, orig_i in enumerate(ordered_indices):
-            todo = todos[orig_i]
-            prefix = ">" if (orig_i == selected_underlying and app_state["active_tab"] == "todos") else " "
-            checkbox = "☑" if todo.get("completed") else "☐"
-            name = todo.get('name', '')
-            line_text = f"{prefix} {checkbox} {name}"
-            name_start = len(f"{prefix} {checkbox} ")
-            # Get deadline info and status (today/past/ok)
-            deadline = todo.get('deadline') or ""
-            status = deadline_status(deadline)
-            todos_lines.append((line_text, todo.get("priority"), name_start, orig_i, status, deadline))
-    # Create todos box (content will be built in display order below)
-
     todos_box = draw_box(
         side_width, 
         files_panel_height, 
@@ -611,39 +3370,48 @@ def render_frame(terminal_width, terminal_height):
     main_box = draw_box(
         main_width, 
         main_panel_height, 
-        "Notes",
+        "Search" if app_state["search_mode"] else "Go to topic" if app_state["palette_mode"] else "Notes",
         app_state["nav_mode"] and app_state["active_tab"] == "notes",
-        not app_state["nav_mode"] and app_state["active_tab"] == "notes"
+        app_state["search_mode"] or app_state["palette_mode"] or (not app_state["nav_mode"] and app_state["active_tab"] == "notes")
     )
     
+    if profiler.enabled:
+        profiler.add("canvas", start)
+        start = time.perf_counter()
+
     # Draw the topics box first (top left)
-    write_box_to_canvas(topics_box, 0, 0)
+    canvas.blit(topics_box, 0, 0)
     
-    # Show topics with scrolling if needed
+    # Show topics with scrolling if needed; only the visible rows are formatted
+    topics = app_state["topics"]
     visible_topics = max(1, side_panel_height - 2)  # Account for box borders
-    total_topics = len(topics_lines)
-    if total_topics > 0:
-        start_topic = max(0, min(selected_topic_index - visible_topics // 2, max(0, total_topics - visible_topics)))
-    else:
-        start_topic = 0
+    total_topics = len(topics)
+    start_topic = scroll_viewport(app_state["topic_scroll"], selected_topic_index, total_topics, visible_topics)
+    app_state["topic_scroll"] = start_topic
 
-    for vis_i in range(visible_topics):
-        idx = start_topic + vis_i
-        if idx >= total_topics:
-            break
-        line = topics_lines[idx]
+    for vis_i, idx in enumerate(range(start_topic, min(total_topics, start_topic + visible_topics))):
         # color selected topic differently
         is_sel = (idx == selected_topic_index)
-        for j, ch in enumerate(line):
-            if j >= side_width - 2:
-                break
-            if is_sel:
-                canvas[1 + vis_i][1 + j] = SELECTED_COLOR + ch + NORMAL
-            else:
-                canvas[1 + vis_i][1 + j] = ch
+        topic = topics[idx]
+        line = f"{'>' if is_sel else ' '} {topics.name(topic)}"
+        # right-aligned open/done/overdue badge from the maintained counters
+        counts = topic_stats.counts(topic)
+        parts = [(f"{counts[TopicStats.TOTAL] - counts[TopicStats.DONE]}☐", NORMAL),
+                 (f"{counts[TopicStats.DONE]}☑", STATUS_OK)]
+        if counts[TopicStats.OVERDUE]:
+            parts.append((f"{DEADLINE_PAST}{counts[TopicStats.OVERDUE]}", STATUS_WARN))
+        badge_len = sum(len(text) + 1 for text, _ in parts)
+        name_room = side_width - 2 - badge_len
+        if name_room < 6:
+            parts, name_room = [], side_width - 2
+        canvas.put(1 + vis_i, 1, line[:name_room], attr_id(SELECTED_COLOR) if is_sel else 0)
+        col = 1 + name_room + 1
+        for text, color in parts:
+            canvas.put(1 + vis_i, col, text, attr_id(color))
+            col += len(text) + 1
     
     # Write todos content
-    write_box_to_canvas(todos_box, 0, side_panel_height)
+    canvas.blit(todos_box, 0, side_panel_height)
     # Render sort badge on the top border of the Todos box (right-aligned)
     if app_state.get("topics"):
         sort_mode = app_state.get("sort_mode", "priority").capitalize()
@@ -651,67 +3419,77 @@ def render_frame(terminal_width, terminal_height):
         badge_row = side_panel_height  # top border line of the Todos box
         # compute starting column so badge is right-aligned inside the top border (avoid corners)
         badge_col = max(1, side_width - 1 - len(badge))
-        for k, ch in enumerate(badge[: max(0, side_width - 2)]):
-            if badge_col + k < side_width - 1:
-                color = INFO_LABEL_COLOR if k < len("Sort:") else CREATED_COLOR
-                canvas[badge_row][badge_col + k] = color + ch + NORMAL
+        badge = badge[:max(0, side_width - 1 - badge_col)]
+        canvas.put(badge_row, badge_col, badge[:len("Sort:")], attr_id(INFO_LABEL_COLOR))
+        canvas.put(badge_row, badge_col + len("Sort:"), badge[len("Sort:"):], attr_id(CREATED_COLOR))
     # Calculate how many todos we can show at once
     visible_todos = max(1, files_panel_height - 2)
-    total_todos = len(todos_lines)
-    # Find where the selected todo will appear in the sorted list
-    selected_display_pos = 0
-    if app_state.get("active_tab") == "todos":
-        sel_under = app_state.get("todo_index", 0)
-        for di, itm in enumerate(todos_lines):
-            if isinstance(itm, tuple) and len(itm) >= 4 and itm[3] == sel_under:
-                selected_display_pos = di
-                break
-
-    if total_todos > 0:
-        start_todo = max(0, min(selected_display_pos - visible_todos // 2, max(0, total_todos - visible_todos)))
-    else:
-        start_todo = 0
+    todos = []
+    ordered_indices = []
+    if app_state["topics"]:
+        current_topic = app_state["topics"][app_state.get("topic_index", 0)]
+        todos = app_state["todos"].get(current_topic, [])
+        ordered_indices = get_todo_display_order(current_topic)
+    total_todos = len(ordered_indices)
+    # Keep the selected todo in view while the Todos tab is active
+    selected_underlying = app_state.get("todo_index", 0)
+    todos_active = app_state["active_tab"] == "todos"
+    selected_display_pos = None
+    if todos_active and total_todos:
+        selected_display_pos = get_todo_display_position(current_topic, selected_underlying)
+    start_todo = scroll_viewport(app_state["todo_scroll"], selected_display_pos, total_todos, visible_todos)
+    app_state["todo_scroll"] = start_todo
 
-    for vis_i in range(visible_todos):
-        idx = start_todo + vis_i
-        if idx >= total_todos:
-            break
-        item = todos_lines[idx]
-        if isinstance(item, tuple) and len(item) >= 3:
-            # tuple shape: (line_text, priority_index, name_start, orig_index, dstat, dstr)
-            line = item[0]
-            pidx = item[1]
-            name_start = item[2]
-            dstat = item[4] if len(item) > 4 else 'ok'
-        else:
-            line = item
-            pidx = None
-            name_start = -1
-            dstat = 'ok'
+    # Only the rows in the viewport are formatted and checked for deadlines
+    for vis_i, disp_i in enumerate(range(start_todo, min(total_todos, start_todo + visible_todos))):
+        orig_i = ordered_indices[disp_i]
+        todo = todos[orig_i]
+        prefix = ">" if (orig_i == selected_underlying and todos_active) else " "
+        checkbox = "☑" if todo.completed else "☐"
+        line = f"{prefix} {checkbox} {todo.name}"
+        name_start = len(f"{prefix} {checkbox} ")
+        pidx = todo.priority
+        # deadline status (today/past/ok)
+        dstat = ordinal_status(todo.deadline_ord)
 
         name_end = len(line)
         # Draw todo text with priority colors for the name part
         canvas_row = side_panel_height + 1 + vis_i
-        for j, ch in enumerate(line):
-            if j >= side_width - 2:
-                break
-            # Color the name part based on priority
-            if pidx is not None and name_start <= j < name_end:
-                color = PRIORITY_COLORS[pidx] if pidx is not None and 0 <= pidx < len(PRIORITY_COLORS) else NORMAL
-                canvas[canvas_row][1 + j] = color + ch + NORMAL
-            else:
-                canvas[canvas_row][1 + j] = ch
-                
+        color = PRIORITY_COLORS[pidx] if 0 <= pidx < len(PRIORITY_COLORS) else NORMAL
+        room = side_width - 2
+        canvas.put(canvas_row, 1, line[:min(name_start, room)])
+        # Color the name part based on priority
+        canvas.put(canvas_row, 1 + name_start, line[name_start:room], attr_id(color))
+
         # Add warning symbols for urgent deadlines
-        if pidx is not None and dstat in ('today', 'past'):
+        if dstat in ('today', 'past'):
             sym = DEADLINE_TODAY if dstat == 'today' else DEADLINE_PAST
             sym_color = DEADLINE_COLOR if dstat == 'today' else STATUS_WARN
             sym_col = name_end
             if sym_col < side_width - 2:
-                canvas[canvas_row][1 + sym_col] = sym_color + sym + NORMAL
+                canvas.put(canvas_row, 1 + sym_col, sym, attr_id(sym_color))
 
     # Write info and main boxes
-    write_box_to_canvas(info_box, side_width, 0)
+    canvas.blit(info_box, side_width, 0)
+    # Global totals on the top border of the Info box, right-aligned; fields
+    # are dropped from the end when the box is too narrow
+    totals = topic_stats.total()
+    fields = [("Open", totals[TopicStats.TOTAL] - totals[TopicStats.DONE], NORMAL),
+              ("Done", totals[TopicStats.DONE], STATUS_OK),
+              ("Overdue", totals[TopicStats.OVERDUE], STATUS_WARN),
+              ("Today", totals[TopicStats.TODAY], DEADLINE_COLOR)]
+    segments = []
+    for label, n, color in fields:
+        segment = [(f" {label}:", INFO_LABEL_COLOR), (f" {n}", color)]
+        if sum(len(text) for text, _ in segments + segment) + 1 > main_width - 2 - len(" Info "):
+            break
+        segments.extend(segment)
+    if segments:
+        segments.append((" ", NORMAL))
+        col = terminal_width - 1 - sum(len(text) for text, _ in segments)
+        for text, color in segments:
+            canvas.put(0, col, text, attr_id(color))
+            col += len(text)
     # Prepare info panel content
     info_lines = []
     info_deadline_stat = 'ok'
@@ -720,7 +3498,7 @@ def render_frame(terminal_width, terminal_height):
     # Get current topic info
     if app_state["topics"]:
         current_topic = app_state["topics"][app_state.get("topic_index", 0)]
-        info_lines.append(f"Topic: {current_topic}")
+        info_lines.append(f"Topic: {topic_name(current_topic)}")
         
         # Get selected todo details if available
         todos = app_state["todos"].get(current_topic, [])
@@ -728,15 +3506,15 @@ def render_frame(terminal_width, terminal_height):
             todo = todos[app_state.get("todo_index", 0)]
             
             # Format todo information
-            status = "Completed" if todo.get("completed") else "Not Completed"
-            info_deadline_str = todo.get('deadline', '') or 'None'
-            info_deadline_stat = deadline_status(todo.get('deadline', ''))
+            status = "Completed" if todo.completed else "Not Completed"
+            info_deadline_str = todo.deadline or 'None'
+            info_deadline_stat = ordinal_status(todo.deadline_ord)
             
             info_lines.extend([
-                f"Todo:  {todo.get('name')}",
+                f"Todo:  {todo.name}",
                 f"State: {status}",
-                f"Prio:  {PRIORITIES[todo.get('priority',0)]} | Due: {info_deadline_str}",
-                f"Date:  {todo.get('created_at','-')}"
+                f"Prio:  {PRIORITIES[todo.priority]} | Due: {info_deadline_str}",
+                f"Date:  {todo.created_at or '-'}"
             ])
         else:
             info_lines.append("No todo selected")
@@ -760,32 +3538,36 @@ def render_frame(terminal_width, terminal_height):
         write_y = i + 1
 
         def write_label_text(text, color):
-            # write visible text with color per-char to avoid embedding raw ANSI sequences
-            for k, ch in enumerate(text):
-                if k < main_width - 2:
-                    canvas[write_y][write_x + k] = color + ch + NORMAL
+            canvas.put(write_y, write_x, text[:main_width - 2], attr_id(color))
 
         if label == "Topic":
             label_text = f"{label}: "
             write_label_text(label_text, INFO_LABEL_COLOR)
             offset = len(label_text)
-            for j, ch in enumerate(val[: main_width - 2 - offset]):
-                canvas[write_y][write_x + offset + j] = SELECTED_COLOR + ch + NORMAL
+            canvas.put(write_y, write_x + offset, val[:main_width - 2 - offset], attr_id(SELECTED_COLOR))
+            # open todos per priority, e.g. "H2 M1 N4"
+            col = offset + len(val) + 2
+            counts = topic_stats.counts(current_topic)
+            for p, prio_name in enumerate(PRIORITIES):
+                n = counts[TopicStats.PRIORITY + p]
+                text = f"{prio_name[0]}{n}"
+                if not n or col + len(text) > main_width - 2:
+                    continue
+                canvas.put(write_y, write_x + col, text, attr_id(PRIORITY_COLORS[p]))
+                col += len(text) + 1
 
         elif label == "Todo":
             label_text = f"{label}: "
             write_label_text(label_text, INFO_LABEL_COLOR)
             offset = len(label_text)
-            for j, ch in enumerate(val[: main_width - 2 - offset]):
-                canvas[write_y][write_x + offset + j] = ch
+            canvas.put(write_y, write_x + offset, val[:main_width - 2 - offset])
 
         elif label == "State":
             label_text = f"{label}: "
             write_label_text(label_text, INFO_LABEL_COLOR)
             offset = len(label_text)
             color = STATUS_OK if val.strip().lower().startswith("completed") else STATUS_WARN
-            for j, ch in enumerate(val[: main_width - 2 - offset]):
-                canvas[write_y][write_x + offset + j] = color + ch + NORMAL
+            canvas.put(write_y, write_x + offset, val[:main_width - 2 - offset], attr_id(color))
 
         elif label == "Prio":
             # val format: '<PRIORITY> | Due: <deadline>'
@@ -799,12 +3581,8 @@ def render_frame(terminal_width, terminal_height):
                 pidx = PRIORITIES.index(prio)
             except ValueError:
                 pidx = None
-            for j, ch in enumerate(prio):
-                if offset + j < main_width - 2:
-                    if pidx is not None:
-                        canvas[write_y][write_x + offset + j] = PRIORITY_COLORS[pidx] + ch + NORMAL
-                    else:
-                        canvas[write_y][write_x + offset + j] = ch
+            canvas.put(write_y, write_x + offset, prio[:max(0, main_width - 2 - offset)],
+                       0 if pidx is None else attr_id(PRIORITY_COLORS[pidx]))
             # color deadline part depending on urgency (use info_deadline_stat computed earlier)
             rest_str = (" | " + rest) if rest else ""
             rest_start = offset + len(prio)
@@ -814,121 +3592,356 @@ def render_frame(terminal_width, terminal_height):
                 dl_color = STATUS_WARN
             elif 'info_deadline_stat' in locals() and info_deadline_stat == 'today':
                 dl_color = DEADLINE_COLOR
-            for j, ch in enumerate(rest_str[: max(0, main_width - 2 - rest_start)]):
-                canvas[write_y][write_x + rest_start + j] = dl_color + ch + NORMAL
+            canvas.put(write_y, write_x + rest_start, rest_str[:max(0, main_width - 2 - rest_start)], attr_id(dl_color))
             # Add warning icon for urgent deadlines
             if info_deadline_stat in ('today', 'past'):
                 sym = DEADLINE_TODAY if info_deadline_stat == 'today' else DEADLINE_PAST
                 sym_color = DEADLINE_COLOR if info_deadline_stat == 'today' else STATUS_WARN
                 sym_pos = rest_start + len(rest_str)
                 if sym_pos < main_width - 2:
-                    canvas[write_y][write_x + sym_pos] = sym_color + sym + NORMAL
+                    canvas.put(write_y, write_x + sym_pos, sym, attr_id(sym_color))
 
         elif label == "Date":
             label_text = f"{label}: "
             write_label_text(label_text, INFO_LABEL_COLOR)
             offset = len(label_text)
-            for j, ch in enumerate(val[: main_width - 2 - offset]):
-                canvas[write_y][write_x + offset + j] = CREATED_COLOR + ch + NORMAL
+            canvas.put(write_y, write_x + offset, val[:main_width - 2 - offset], attr_id(CREATED_COLOR))
 
         else:
             # Fallback: write the whole line plain
-            for j, ch in enumerate(line[: main_width - 2]):
-                canvas[write_y][write_x + j] = ch
+            canvas.put(write_y, write_x, line[:main_width - 2])
 
     # show transient status message if present
     if app_state.get("status_msg") and time.time() < app_state.get("status_msg_until", 0):
         msg = app_state.get("status_msg")
         # place on the line after info lines if space allows
         si = min(len(info_lines), info_height - 2)
-        for j, ch in enumerate(msg[: main_width - 2]):
-            canvas[si + 1][side_width + 1 + j] = ch
+        canvas.put(si + 1, side_width + 1, msg[:main_width - 2])
 
-    write_box_to_canvas(main_box, side_width, info_height)
+    canvas.blit(main_box, side_width, info_height)
 
-    # Get and format todo notes with word wrap. We render an internal caret and selection
-    notes_width = main_width - 2
+    # Get and format todo notes with word wrap. We render an internal caret and selection.
+    # Only the visible rows are sliced out of the buffer; the wrap index maps offsets to rows.
+    notes_width = notes_panel_width(terminal_width)
     notes_height = main_panel_height - 2
-    note_lines = []
-    note_line_starts = []  # line start offsets
-    raw_notes = ""
-    # Get notes for selected todo
-    if app_state["topics"]:
+    buf = None
+    if app_state["search_mode"]:
+        update_search()
+        lines = [topic_name(topic) + ("" if todo is None else f" / {todo.name}")
+                 for topic, todo in app_state["search_results"]]
+        draw_result_list(canvas, lines, app_state["search_pos"], "_search_scroll",
+                         info_height + 1, side_width + 1, notes_width, notes_height)
+    elif app_state["palette_mode"]:
+        update_palette()
+        lines = [topic_name(app_state["topics"][i]) for i in app_state["palette_results"]]
+        draw_result_list(canvas, lines, app_state["palette_pos"], "_palette_scroll",
+                         info_height + 1, side_width + 1, notes_width, notes_height)
+    elif app_state["topics"]:
         topic = app_state["topics"][app_state.get("topic_index", 0)]
         todos = app_state["todos"].get(topic, [])
         if todos and 0 <= app_state.get("todo_index", 0) < len(todos):
-            todo = todos[app_state.get("todo_index", 0)]
-            raw_notes = todo.get("notes", "") or ""
-            note_lines, note_line_starts = build_display_lines(raw_notes, notes_width)
-    # Selection/cursor
-    sel_anchor = app_state.get("notes_selection_anchor")
-    cursor_off = app_state.get("notes_cursor_offset", 0)
-    if sel_anchor is not None:
-        sel_start = min(sel_anchor, cursor_off)
-        sel_end = max(sel_anchor, cursor_off)
-    else:
-        sel_start = sel_end = None
-
-    for i, line in enumerate(note_lines[:notes_height]):
-        start_off = note_line_starts[i] if i < len(note_line_starts) else 0
-        for j, ch in enumerate(line[:notes_width]):
-            raw_off = start_off + j
-            # Draw caret at cursor, highlight selection
-            if raw_off == cursor_off and app_state.get("active_tab") == "notes" and not app_state.get("nav_mode", True) and app_state["topics"] and app_state.get("_cursor_visible", True):
-                if sel_start is not None and sel_start <= cursor_off < sel_end:
-                    canvas[info_height + 1 + i][side_width + 1 + j] = "\033[7m|" + NORMAL
-                else:
-                    canvas[info_height + 1 + i][side_width + 1 + j] = SELECTED_COLOR + "|" + NORMAL
+            buf = todos[app_state.get("todo_index", 0)].notes_buffer()
+    if buf is not None and notes_height > 0:
+        wrap = buf.wrap_index(notes_width)
+        # Selection/cursor
+        sel_anchor = app_state.get("notes_selection_anchor")
+        cursor_off = min(app_state.get("notes_cursor_offset", 0), len(buf))
+        if sel_anchor is not None:
+            sel_start = min(sel_anchor, cursor_off)
+            sel_end = max(sel_anchor, cursor_off)
+        else:
+            sel_start = sel_end = None
+        editing = app_state.get("active_tab") == "notes" and not app_state.get("nav_mode", True)
+        caret_row, caret_col = wrap.offset_to_rowcol(cursor_off)
+        if app_state.get("_notes_view") is not buf:
+            # another todo's notes: start from the top
+            app_state["_notes_view"] = buf
+            app_state["notes_scroll"] = 0
+        first_row = scroll_viewport(app_state["notes_scroll"], caret_row if editing else None,
+                                    wrap.total_rows(), notes_height)
+        app_state["notes_scroll"] = first_row
+        reverse = attr_id("\033[7m")
+        for i, (start_off, length) in enumerate(wrap.row_spans(first_row, notes_height)):
+            y = info_height + 1 + i
+            canvas.put(y, side_width + 1, buf.slice(start_off, start_off + length))
+            if sel_start is not None and sel_start < start_off + length and sel_end > start_off:
+                lo = max(sel_start, start_off) - start_off
+                hi = min(sel_end, start_off + length) - start_off
+                canvas.attrs[y][side_width + 1 + lo:side_width + 1 + hi] = bytes((reverse,)) * (hi - lo)
+        # Draw caret, highlighted when it sits inside the selection
+        i = caret_row - first_row
+        if editing and app_state.get("_cursor_visible", True) and 0 <= i < notes_height and caret_col < notes_width:
+            if sel_start is not None and sel_start <= cursor_off < sel_end:
+                canvas.put(info_height + 1 + i, side_width + 1 + caret_col, "|", reverse)
             else:
-                if sel_start is not None and sel_start <= raw_off < sel_end:
-                    canvas[info_height + 1 + i][side_width + 1 + j] = "\033[7m" + ch + NORMAL
-                else:
-                    canvas[info_height + 1 + i][side_width + 1 + j] = ch
-    # Draw caret at end
-    if app_state.get("active_tab") == "notes" and not app_state.get("nav_mode", True) and app_state["topics"] and app_state.get("_cursor_visible", True):
-        if cursor_off == len(raw_notes) and note_lines:
-            last_row = min(len(note_lines)-1, notes_height-1)
-            last_col = len(note_lines[last_row]) if last_row < len(note_lines) else 0
-            if last_col < notes_width:
-                canvas[info_height + 1 + last_row][side_width + 1 + last_col] = SELECTED_COLOR + "|" + NORMAL
+                canvas.put(info_height + 1 + i, side_width + 1 + caret_col, "|", attr_id(SELECTED_COLOR))
     # Blink caret
     now = time.time()
-    if now - app_state.get("_cursor_last_blink", 0) >= 0.5:
+    if now - app_state.get("_cursor_last_blink", 0) >= CURSOR_BLINK_INTERVAL:
         app_state["_cursor_last_blink"] = now
         app_state["_cursor_visible"] = not app_state.get("_cursor_visible", True)
 
     # Add help text or input prompt at bottom
     if app_state["input_mode"]:
         prompt_text = f"{app_state['input_prompt']}{app_state['input_buffer']}_"
-        for i, char in enumerate(prompt_text):
-            if i < terminal_width:
-                canvas[-1][i] = char
+        canvas.put(-1, 0, prompt_text)
+    elif app_state["search_mode"]:
+        total = app_state["search_total"]
+        prompt_text = f"/{app_state['search_query']}_  ({total} match{'' if total == 1 else 'es'}; Up/Down, Enter: open, Esc: cancel)"
+        canvas.put(-1, 0, prompt_text)
+    elif app_state["palette_mode"]:
+        total = app_state["palette_total"]
+        more = "+" if app_state["palette_partial"] else ""
+        prompt_text = f"Topic: {app_state['palette_query']}_  ({total}{more} match{'' if total == 1 and not more else 'es'}; Up/Down, Enter: go, Esc: cancel)"
+        canvas.put(-1, 0, prompt_text)
     else:
         if app_state["input_mode"]:
             help_text = f"INPUT: {app_state.get('input_prompt','')}"
         elif app_state["nav_mode"]:
-            help_text = "NAV MODE | Enter: focus tab, j/k: switch tabs, n: new, S: save, Q: quit"
+            help_text = "NAV MODE | Enter: focus tab, j/k: switch tabs, n: new, /: search, Ctrl-P: go to topic, S: save, Q: quit"
         elif app_state["active_tab"] == "topics":
-            help_text = "TOPICS | j/k: select, n: new topic, d: delete, Enter: todos, Esc: nav, S: save, Q: quit"
+            help_text = "TOPICS | j/k: select, J/K: move, n: new topic, r: rename, d: delete, Enter: todos, /: search, Esc: nav, S: save, Q: quit"
         elif app_state["active_tab"] == "todos":
-            help_text = "TODOS | j/k: select, n: new todo, d: delete, s: cycle sort, Enter: open notes, Space: toggle, Esc: nav, S: save, Q: quit"
+            help_text = "TODOS | j/k: select, n: new todo, d: delete, s: cycle sort, Enter: open notes, Space: toggle, /: search, Esc: nav, S: save, Q: quit"
         elif app_state["active_tab"] == "notes":
-            help_text = "NOTES | type: edit, Enter: newline, Backspace: delete, Esc: close notes, S: save, Q: quit"
+            help_text = "NOTES | type: edit, Enter: newline, Backspace: delete, Ctrl-Z/Y: undo/redo, Esc: close notes, S: save, Q: quit"
         # Show key bindings at the bottom of the screen
         if len(help_text) < terminal_width:
-            for i, ch in enumerate(help_text):
-                canvas[-1][i] = HELP_COLOR + ch + NORMAL
-    
-    # Always render the frame
-    frame = "\n".join("".join(line) for line in canvas)
-    sys.stdout.write(MOVE_TO_TOP)
-    sys.stdout.write(frame)
-    sys.stdout.flush()
+            canvas.put(-1, 0, help_text, attr_id(HELP_COLOR))
+
+    # Timing overlay just above the help line, from the frames before this one
+    if profiler.visible and terminal_height > 1:
+        canvas.put(-2, 0, profiler.overlay_text().ljust(terminal_width), attr_id(TAB_BG + TAB_FG))
+    if profiler.enabled:
+        profiler.add("fill", start)
+
+    # Only the cells that changed since the last frame are written
+    written = renderer.present(canvas, get_backend())
+    if profiler.enabled:
+        profiler.end_frame(written)
+
+def update_search():
+    """Re-run the search if the query changed since the last frame"""
+    query = app_state["search_query"]
+    if app_state.get("_search_done") == query:
+        return
+    app_state["_search_done"] = query
+    total, results = search_index.search(query, SEARCH_RESULT_LIMIT)
+    app_state["search_total"] = total
+    app_state["search_results"] = results
+    app_state["search_pos"] = 0
+
+
+def open_search_result(topic, todo):
+    """Select a search hit: the topic, or the todo inside it"""
+    if topic not in app_state["topics"]:
+        return
+    app_state["topic_index"] = app_state["topics"].index(topic)
+    app_state["last_topic_index"] = app_state["topic_index"]
+    app_state["nav_mode"] = False
+    app_state["active_tab"] = "topics"
+    if todo is not None:
+        for i, t in enumerate(app_state["todos"].get(topic, ())):
+            if t is todo:
+                app_state["todo_index"] = i
+                app_state["active_tab"] = "todos"
+                break
+
+
+def handle_search_key(backend, key):
+    """Search mode: type to refine, Up/Down to pick, Enter to open, Esc to cancel"""
+    if key == b'\xe0':
+        key = backend.getch()
+        last = max(0, len(app_state["search_results"]) - 1)
+        if key == b'H':  # Up
+            app_state["search_pos"] = max(0, app_state["search_pos"] - 1)
+        elif key == b'P':  # Down
+            app_state["search_pos"] = min(last, app_state["search_pos"] + 1)
+        return True
+    if key == b'\x1b':  # Escape
+        app_state["search_mode"] = False
+    elif key == b'\r':  # Enter
+        update_search()
+        results = app_state["search_results"]
+        if results:
+            open_search_result(*results[min(app_state["search_pos"], len(results) - 1)])
+        app_state["search_mode"] = False
+    elif key == b'\x08':  # Backspace
+        app_state["search_query"] = app_state["search_query"][:-1]
+    else:
+        char = key.decode('utf-8', errors='ignore')
+        if char.isprintable():
+            app_state["search_query"] += char
+    # results are refreshed once per frame by render_frame, not once per key
+    return True
+
+
+def fuzzy_pattern(query):
+    """Regex matching the characters of lowercase `query` in order.
+
+    Each gap is a negated class ("a[^b]*b") rather than ".*?", so the
+    engine never backtracks and a match is the tightest one from its start.
+    """
+    return re.compile(re.escape(query[0]) + "".join(f"[^{re.escape(ch)}]*{re.escape(ch)}" for ch in query[1:]))
+
+
+def open_palette():
+    app_state["search_mode"] = False
+    app_state["palette_mode"] = True
+    app_state["palette_query"] = ""
+    app_state["palette_pos"] = 0
+    # [query, matches, candidates, candidates scanned, prefix matches,
+    # best matches]; matches None = every topic, unranked
+    app_state["_palette_stack"] = [["", None, None, 0, 0, []]]
+    app_state["_palette_names"] = [topic_name(topic).lower() for topic in app_state["topics"]]
+    app_state["_palette_done"] = None
+
+
+def palette_scanning():
+    """True while the palette query still has candidates left to match"""
+    query, hits, source, scanned, prefixed, best = app_state["_palette_stack"][-1]
+    return hits is not None and scanned < len(source) and prefixed < PALETTE_RESULT_LIMIT
+
+
+def scan_palette(entry, names, budget):
+    """Match more of `entry`'s candidates, for at most `budget` seconds (None = all).
+
+    Stops for good once PALETTE_RESULT_LIMIT names start with the query:
+    matches rank by width, then start, then topic order, so nothing after
+    them can rank higher.
+    """
+    query, hits, source, scanned, prefixed, best = entry
+    found = len(hits)
+    search = fuzzy_pattern(query).search
+    width = len(query)
+    until = None if budget is None else time.perf_counter() + budget
+    while scanned < len(source) and prefixed < PALETTE_RESULT_LIMIT:
+        chunk = source[scanned:scanned + 1024]
+        scanned += len(chunk)
+        for n, (i, m) in enumerate(zip(chunk, map(search, map(names.__getitem__, chunk)))):
+            if m:
+                start = m.start()
+                hits.append((m.end() - start, start, i))
+                if start == 0 and m.end() == width:
+                    prefixed += 1
+                    if prefixed == PALETTE_RESULT_LIMIT:
+                        scanned -= len(chunk) - n - 1
+                        break
+        if until is not None and time.perf_counter() > until:
+            break
+    entry[3] = scanned
+    entry[4] = prefixed
+    entry[5] = heapq.nsmallest(PALETTE_RESULT_LIMIT, best + hits[found:])
+
+
+def update_palette(finish=False):
+    """Re-rank the palette if its query changed since the last frame.
+
+    Typing a character can only narrow a subsequence match, so only the
+    topics matched by the longest still-valid earlier query are rescored,
+    plus whatever that query had not scanned yet; Backspace pops back to a
+    previous list. A scan that outlasts PALETTE_SCAN_MS shows what it has
+    and carries on next frame, unless `finish` is set.
+    """
+    query = app_state["palette_query"].lower()
+    changed = app_state.get("_palette_done") != query
+    if not changed and not palette_scanning():
+        return
+    app_state["_palette_done"] = query
+    names = app_state["_palette_names"]
+    stack = app_state["_palette_stack"]
+    while len(stack) > 1 and not query.startswith(stack[-1][0]):
+        stack.pop()
+    entry = stack[-1]
+    if entry[0] != query:
+        base, hits, source, scanned, prefixed, best = entry
+        if hits is None:
+            source = range(len(names))
+        else:
+            source = [hit[2] for hit in hits] + list(source[scanned:])
+        # hits are (match width, match start, topic index) in topic order
+        entry = [query, [], source, 0, 0, []]
+        stack.append(entry)
+    if entry[1] is None:
+        app_state["palette_results"] = list(range(min(len(names), PALETTE_RESULT_LIMIT)))
+        app_state["palette_total"] = len(names)
+        app_state["palette_partial"] = False
+    else:
+        scan_palette(entry, names, None if finish else PALETTE_SCAN_MS / 1000)
+        app_state["palette_results"] = [hit[2] for hit in entry[5]]
+        app_state["palette_total"] = len(entry[1])
+        app_state["palette_partial"] = entry[3] < len(entry[2])
+    if changed:
+        app_state["palette_pos"] = 0
+
+
+def handle_palette_key(backend, key):
+    """Topic palette: type to filter, Up/Down to pick, Enter to go, Esc to cancel"""
+    if key == b'\xe0':
+        key = backend.getch()
+        last = max(0, len(app_state["palette_results"]) - 1)
+        if key == b'H':  # Up
+            app_state["palette_pos"] = max(0, app_state["palette_pos"] - 1)
+        elif key == b'P':  # Down
+            app_state["palette_pos"] = min(last, app_state["palette_pos"] + 1)
+        return True
+    if key == b'\x1b':  # Escape
+        app_state["palette_mode"] = False
+    elif key == b'\r':  # Enter
+        update_palette(finish=True)
+        results = app_state["palette_results"]
+        if results:
+            app_state["topic_index"] = results[min(app_state["palette_pos"], len(results) - 1)]
+            app_state["last_topic_index"] = app_state["topic_index"]
+            app_state["todo_index"] = 0
+            app_state["active_tab"] = "topics"
+            app_state["nav_mode"] = False
+        app_state["palette_mode"] = False
+    elif key == b'\x08':  # Backspace
+        app_state["palette_query"] = app_state["palette_query"][:-1]
+    else:
+        char = key.decode('utf-8', errors='ignore')
+        if char.isprintable():
+            app_state["palette_query"] += char
+    return True
+
+
+def handle_paste(text):
+    """Apply a bracketed paste as a single edit to whatever has the keyboard.
+
+    Notes get the text with newlines (tabs expanded); one-line fields get it
+    flattened to a single line. Elsewhere a paste is ignored.
+    """
+    text = text.replace("\r\n", "\n").replace("\r", "\n").expandtabs(4)
+    text = "".join(ch for ch in text if ch == "\n" or ch.isprintable())
+    line = text.replace("\n", " ")
+    if app_state["input_mode"]:
+        app_state["input_buffer"] += line
+    elif app_state["search_mode"]:
+        app_state["search_query"] += line
+    elif app_state["palette_mode"]:
+        app_state["palette_query"] += line
+    elif not app_state.get("nav_mode", True) and app_state.get("active_tab") == "notes" and app_state["topics"]:
+        todos = app_state["todos"].get(app_state["topics"][app_state.get("topic_index", 0)], [])
+        if text and 0 <= app_state.get("todo_index", 0) < len(todos):
+            buf = todos[app_state.get("todo_index", 0)].notes_buffer()
+            cur = min(app_state.get("notes_cursor_offset", len(buf)), len(buf))
+            edit_notes(cur, cur, text)
+            app_state["notes_cursor_offset"] = cur + len(text)
+            app_state["notes_selection_anchor"] = None
+    return True
+
 
 def handle_input():
     """Handle keyboard input"""
-    if msvcrt.kbhit():
-        key = msvcrt.getch()
+    backend = get_backend()
+    if backend.key_pending():
+        key = backend.getch()
+        if key == b'\x14':  # Ctrl-T: frame timing overlay
+            profiler.toggle()
+            return True
+        if key.startswith(PASTE_START):  # bracketed paste: one token, one edit
+            return handle_paste(key[len(PASTE_START):].decode("utf-8", errors="replace"))
 
         # Handle input mode
         if app_state["input_mode"]:
@@ -965,10 +3978,27 @@ def handle_input():
             except:
                 pass
             return True
+
+        # Search mode and the topic palette take every key until Enter or Esc
+        if app_state["search_mode"]:
+            return handle_search_key(backend, key)
+        if app_state["palette_mode"]:
+            return handle_palette_key(backend, key)
+        if key == b'\x10':  # Ctrl-P: jump to a topic by fuzzy name
+            open_palette()
+            return True
+        if key in (b'\x1a', b'\x19'):  # Ctrl-Z / Ctrl-Y: undo / redo
+            label = undo_log.undo() if key == b'\x1a' else undo_log.redo()
+            if label is None:
+                app_state["status_msg"] = "Nothing to " + ("undo" if key == b'\x1a' else "redo")
+            else:
+                app_state["status_msg"] = ("Undid " if key == b'\x1a' else "Redid ") + label
+            app_state["status_msg_until"] = time.time() + 2
+            return True
             
         # Handle special keys (arrow keys)
         if key == b'\xe0':
-            key = msvcrt.getch()
+            key = backend.getch()
             if app_state["nav_mode"]:
                 if key in (b'H', b'P'):  # Up/Down arrows
                     if app_state["active_tab"] == "topics":
@@ -989,10 +4019,7 @@ def handle_input():
                     todos = app_state["todos"].get(current_topic, [])
                     if todos:
                         ordered = get_todo_display_order(current_topic)
-                        try:
-                            pos = ordered.index(app_state.get("todo_index", 0))
-                        except ValueError:
-                            pos = 0
+                        pos = get_todo_display_position(current_topic, app_state.get("todo_index", 0))
                         if key == b'H':  # Up arrow
                             newpos = max(0, pos - 1)
                         elif key == b'P':  # Down arrow
@@ -1006,25 +4033,24 @@ def handle_input():
                     todos = app_state["todos"].get(current_topic, [])
                     if todos and 0 <= app_state.get("todo_index", 0) < len(todos):
                         todo = todos[app_state["todo_index"]]
-                        raw = todo.get("notes", "") or ""
-                        # approximate notes width using terminal layout
+                        buf = todo.notes_buffer()
+                        # same wrap width as the notes panel, so the index is shared with render_frame
                         tw, th = get_terminal_size()
-                        side_w = min(max(MIN_SIDE_WIDTH, int(tw * 0.2)), int(tw * MAX_SIDE_WIDTH_PERCENT / 100))
-                        notes_w = max(10, tw - side_w - 4)
-                        cur = app_state.get("notes_cursor_offset", len(raw))
+                        wrap = buf.wrap_index(notes_panel_width(tw))
+                        cur = min(app_state.get("notes_cursor_offset", len(buf)), len(buf))
                         # Up/Down/Left/Right
                         if key == b'H':  # Up
-                            r, c = offset_to_rowcol(raw, notes_w, cur)
+                            r, c = wrap.offset_to_rowcol(cur)
                             nr = max(0, r - 1)
-                            app_state["notes_cursor_offset"] = rowcol_to_offset(raw, notes_w, nr, c)
+                            app_state["notes_cursor_offset"] = wrap.rowcol_to_offset(nr, c)
                         elif key == b'P':  # Down
-                            r, c = offset_to_rowcol(raw, notes_w, cur)
+                            r, c = wrap.offset_to_rowcol(cur)
                             nr = r + 1
-                            app_state["notes_cursor_offset"] = rowcol_to_offset(raw, notes_w, nr, c)
+                            app_state["notes_cursor_offset"] = wrap.rowcol_to_offset(nr, c)
                         elif key == b'K':  # Left
                             app_state["notes_cursor_offset"] = max(0, cur - 1)
                         elif key == b'M':  # Right
-                            app_state["notes_cursor_offset"] = min(len(raw), cur + 1)
+                            app_state["notes_cursor_offset"] = min(len(buf), cur + 1)
             return True
             
         key = key.decode('utf-8', errors='ignore')
@@ -1038,8 +4064,8 @@ def handle_input():
             if not todos or not (0 <= app_state.get("todo_index", 0) < len(todos)):
                 return True
             todo = todos[app_state.get("todo_index", 0)]
-            raw = todo.get("notes", "") or ""
-            cur = app_state.get("notes_cursor_offset", len(raw))
+            buf = todo.notes_buffer()
+            cur = app_state.get("notes_cursor_offset", len(buf))
 
             # Escape: close notes view
             if key == '\x1b':
@@ -1052,12 +4078,12 @@ def handle_input():
             if key == '\x03':
                 anchor = app_state.get("notes_selection_anchor")
                 if anchor is None:
-                    app_state["clipboard"] = raw
+                    app_state["clipboard"] = buf.text()
                     app_state["status_msg"] = "Copied all notes"
                 else:
                     a = min(anchor, cur)
                     b = max(anchor, cur)
-                    app_state["clipboard"] = raw[a:b]
+                    app_state["clipboard"] = buf.slice(a, b)
                     app_state["status_msg"] = "Copied selection"
                 app_state["status_msg_until"] = time.time() + 2
                 return True
@@ -1068,8 +4094,8 @@ def handle_input():
                 if anchor is not None:
                     a = min(anchor, cur)
                     b = max(anchor, cur)
-                    app_state["clipboard"] = raw[a:b]
-                    todo["notes"] = raw[:a] + raw[b:]
+                    app_state["clipboard"] = buf.slice(a, b)
+                    edit_notes(a, b, "")
                     app_state["notes_selection_anchor"] = None
                     app_state["notes_cursor_offset"] = a
                     app_state["status_msg"] = "Cut selection"
@@ -1080,14 +4106,18 @@ def handle_input():
             if key == '\x16':
                 clip = app_state.get("clipboard", "")
                 if clip:
-                    todo["notes"] = raw[:cur] + clip + raw[cur:]
+                    edit_notes(cur, cur, clip)
                     app_state["notes_cursor_offset"] = cur + len(clip)
                 return True
 
-            # Enter -> insert newline at cursor
+            # Enter -> insert newline at cursor, with any text queued behind it
             if key == '\r':
-                todo["notes"] = raw[:cur] + "\n" + raw[cur:]
-                app_state["notes_cursor_offset"] = cur + 1
+                text = "\n" + backend.pending_text(stop=b"v")
+                edit_notes(cur, cur, text)
+                app_state["notes_cursor_offset"] = cur + len(text)
+                if text.strip("\n"):
+                    # typed characters clear the selection, as below
+                    app_state["notes_selection_anchor"] = None
                 return True
 
             # Backspace -> delete before cursor or delete selection
@@ -1096,12 +4126,12 @@ def handle_input():
                 if anchor is not None:
                     a = min(anchor, cur)
                     b = max(anchor, cur)
-                    todo["notes"] = raw[:a] + raw[b:]
+                    edit_notes(a, b, "")
                     app_state["notes_cursor_offset"] = a
                     app_state["notes_selection_anchor"] = None
                 else:
                     if cur > 0:
-                        todo["notes"] = raw[:cur-1] + raw[cur:]
+                        edit_notes(cur - 1, cur, "")
                         app_state["notes_cursor_offset"] = cur - 1
                 return True
 
@@ -1113,10 +4143,12 @@ def handle_input():
                     app_state["notes_selection_anchor"] = None
                 return True
 
-            # Insert printable characters at cursor
+            # Insert printable characters at cursor; keys already queued behind
+            # this one (fast typing, a paste without brackets) go in the same edit
             if len(key) == 1 and (32 <= ord(key) <= 126 or ord(key) >= 128):
-                todo["notes"] = raw[:cur] + key + raw[cur:]
-                app_state["notes_cursor_offset"] = cur + 1
+                text = key + backend.pending_text(stop=b"v")
+                edit_notes(cur, cur, text)
+                app_state["notes_cursor_offset"] = cur + len(text)
                 # If there was a selection, clear it
                 app_state["notes_selection_anchor"] = None
                 return True
@@ -1125,7 +4157,7 @@ def handle_input():
 
         # Manual save with uppercase S
         if key == 'S':
-            save_data()
+            save_data(wait=False)
             return True
 
         # Cycle sort modes with lowercase s when in todos focus
@@ -1154,13 +4186,12 @@ def handle_input():
                     app_state["status_msg_until"] = time.time() + 2
                     return True
                 todo = todos[app_state.get("todo_index", 0)]
-                notes = todo.get("notes", "") or ""
-                app_state["notes_cursor_offset"] = len(notes)
+                app_state["notes_cursor_offset"] = len(todo.notes_buffer())
                 app_state["active_tab"] = "notes"
                 app_state["nav_mode"] = False
                 return True
             elif key == 'S':
-                save_data()
+                save_data(wait=False)
                 return True
 
         elif key == '\x1b':  # Escape key
@@ -1168,6 +4199,13 @@ def handle_input():
             
         elif key == 'q':  # Quit
             return False
+
+        elif key == '/':  # Search topics, todo names and notes
+            app_state["search_mode"] = True
+            app_state["search_query"] = ""
+            app_state["search_results"] = []
+            app_state["search_total"] = 0
+            app_state["search_pos"] = 0
             
         elif key == 'n':  # New item (topic or todo) in both nav and focus modes
             # In nav mode or focus mode, create based on active tab
@@ -1185,7 +4223,7 @@ def handle_input():
             if app_state["active_tab"] == "topics" and app_state["topics"]:
                 if app_state["topic_index"] < len(app_state["topics"]):
                     app_state["input_mode"] = True
-                    app_state["input_prompt"] = f"Delete topic '{app_state['topics'][app_state['topic_index']]}' (y/n)? "
+                    app_state["input_prompt"] = f"Delete topic '{topic_name(app_state['topics'][app_state['topic_index']])}' (y/n)? "
                     app_state["input_callback"] = lambda x: delete_topic(app_state["topic_index"]) if x.lower() == 'y' else None
             elif app_state["active_tab"] == "todos" and app_state["topics"]:
                 current_topic = app_state["topics"][app_state["topic_index"]]
@@ -1213,16 +4251,21 @@ def handle_input():
                 elif key == 'j':  # Down
                     app_state["topic_index"] = min(len(app_state["topics"]) - 1, app_state["topic_index"] + 1)
                     app_state["last_topic_index"] = app_state["topic_index"]
+                elif key == 'K':  # Move topic up
+                    move_topic(app_state["topic_index"], app_state["topic_index"] - 1)
+                elif key == 'J':  # Move topic down
+                    move_topic(app_state["topic_index"], app_state["topic_index"] + 1)
+                elif key == 'r' and app_state["topics"]:  # Rename topic
+                    app_state["input_mode"] = True
+                    app_state["input_prompt"] = f"Rename topic '{topic_name(app_state['topics'][app_state['topic_index']])}' to: "
+                    app_state["input_callback"] = lambda x: rename_topic(app_state["topic_index"], x.strip())
             elif app_state["active_tab"] == "todos":
                 if key in ('j', 'k') and app_state["topics"]:
                     current_topic = app_state["topics"][app_state["topic_index"]]
                     todos = app_state["todos"].get(current_topic, [])
                     if todos:
                         ordered = get_todo_display_order(current_topic)
-                        try:
-                            pos = ordered.index(app_state.get("todo_index", 0))
-                        except ValueError:
-                            pos = 0
+                        pos = get_todo_display_position(current_topic, app_state.get("todo_index", 0))
                         if key == 'k':  # Up
                             newpos = max(0, pos - 1)
                         elif key == 'j':  # Down
@@ -1241,42 +4284,575 @@ def handle_input():
             
     return True
 
+def read_batch(path):
+    """Return the non-empty lines of a batch file ('-' = stdin)"""
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    return [ln for ln in lines if ln.strip()]
+
+
+def find_todos(topic, names):
+    """Resolve todo names (or '#<n>' 1-based positions) to indices in `topic`"""
+    todos = app_state["todos"].get(topic, [])
+    by_name = {}
+    for i, t in enumerate(todos):
+        by_name.setdefault(t.get("name"), []).append(i)
+    found = []
+    missing = []
+    for name in names:
+        if name.startswith("#") and name[1:].isdigit() and 0 < int(name[1:]) <= len(todos):
+            found.append(int(name[1:]) - 1)
+        elif name in by_name:
+            found.extend(by_name[name])
+        else:
+            missing.append(name)
+    return sorted(set(found)), missing
+
+
+def format_todo_row(topic, t):
+    """One tab-separated export row"""
+    return "\t".join([
+        topic,
+        (t.get("name") or "").replace("\n", "\\n"),
+        PRIORITIES[t.get("priority", len(PRIORITIES) - 1)],
+        "1" if t.get("completed") else "0",
+        t.get("created_at", ""),
+        t.get("deadline") or "",
+    ])
+
+
+def bench_memory(count=100000):
+    """Measure bytes per todo for the old dict layout and for Todo.
+
+    Both layouts share the same field strings, so the difference is the
+    per-todo container overhead. Returns a dict of results.
+    """
+    import tracemalloc
+    rows = []
+    for i in range(count):
+        rows.append([f"todo {i}", str(i % 4), "1" if i % 3 == 0 else "0",
+                     f"{1 + i % 28:02d}-01-2024 10:{i % 60:02d}:00",
+                     f"{1 + i % 28:02d}-06-2026" if i % 2 else "",
+                     base64.b64encode(f"note {i}".encode("utf-8")).decode("ascii")])
+
+    def as_dict(parts):
+        # the per-todo dict load_data built before Todo existed
+        return {
+            "name": parts[0],
+            "priority": int(parts[1]),
+            "completed": parts[2] == "1",
+            "created_at": parts[3],
+            "deadline": parts[4] or None,
+            "notes": parts[5],
+        }
+
+    results = {"todos": count}
+    for label, build in (("dict", as_dict), ("slots", parse_todo_meta)):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        todos = [build(parts) for parts in rows]
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        results[f"{label}_bytes_per_todo"] = round((after - before) / count, 1)
+        del todos
+    return results
+
+
+# Benchmark datasets: (topics, todos per topic, note bytes, deadline mix)
+BENCH_DATASETS = [
+    (10, 100, 64, "none"),
+    (100, 100, 512, "mixed"),
+    (200, 250, 256, "overdue"),
+]
+BENCH_SIZES = ((80, 24), (120, 40), (200, 60))  # terminal sizes for render_frame
+# Scripted key sequences for handle_input, each from nav mode on the first topic
+BENCH_KEYS = {
+    "topics": b"\r" + b"j" * 100 + b"k" * 100,
+    "todos": b"\r\r" + b"j" * 100 + b"k" * 100,
+    "notes": b"\r\r\r" + b"Some typed text. " * 12 + b"\x08" * 20 + b"\x1b",
+    "search": b"/todo 1" + b"\x1b[B" * 20 + b"\x08" * 6 + b"\x1b",
+    "palette": b"\x10topic 01" + b"\x08" * 8 + b"\x1b",
+}
+
+
+def bench_dataset(topics=50, todos=200, note_bytes=64, deadlines="mixed"):
+    """Replace the loaded topics and todos with a synthetic dataset.
+
+    Every topic gets `todos` todos with mixed priorities and `note_bytes`
+    of notes. `deadlines` is "none", "mixed" (half of the todos, spread a
+    month either side of today) or "overdue" (all in the past). Nothing is
+    journaled or saved.
+    """
+    today = date.today().toordinal()
+
+    def deadline(i):
+        if deadlines == "none" or (deadlines == "mixed" and i % 2 == 0):
+            return ""
+        offset = -1 - i % 30 if deadlines == "overdue" else i % 61 - 30
+        return date.fromordinal(today + offset).strftime("%d-%m-%Y")
+
+    registry = TopicRegistry()
+    todos_map = {}
+    for t in range(topics):
+        topic = registry.add(f"Topic {t:03d}")
+        todos_map[topic] = []
+        for i in range(todos):
+            words = f"note {t}.{i} lorem ipsum dolor sit amet "
+            notes = (words * (note_bytes // len(words) + 1))[:note_bytes]
+            todos_map[topic].append(parse_todo_meta([
+                f"todo {t}.{i}", str(i % 4), "1" if i % 3 == 0 else "0",
+                f"{1 + i % 28:02d}-01-2024 10:{i % 60:02d}:00",
+                deadline(i),
+                base64.b64encode(notes.encode("utf-8")).decode("ascii"),
+            ]))
+    app_state["topics"] = registry
+    app_state["todos"] = todos_map
+    display_order.clear()
+    search_index.clear()
+    topic_stats.clear()
+    undo_log.clear()
+    dirty.reset(None)
+    bench_reset_view()
+
+
+def bench_reset_view():
+    """Back to nav mode on the first topic, with no search or palette open"""
+    app_state.update(active_tab="topics", nav_mode=True, input_mode=False,
+                     search_mode=False, palette_mode=False, topic_index=0, todo_index=0,
+                     topic_scroll=0, todo_scroll=0, notes_scroll=0,
+                     notes_cursor_offset=0, notes_selection_anchor=None)
+
+
+def bench_storage(path):
+    """Time a full snapshot save, a load and decoding every topic, once in
+    TODO_V1 and once in TODO_V2 (at `path`.v1 and `path`.v2), then a
+    journaled save of a single change.
+    """
+    global JOURNAL_MODE
+    results = {}
+    saved_mode = JOURNAL_MODE
+    try:
+        for fmt, write, binary in (("v1", write_snapshot, False), ("v2", write_snapshot_v2, True)):
+            target = f"{path}.{fmt}"
+            start = time.perf_counter()
+            frozen = freeze_state()
+            write_atomic(target, lambda f: write(f, frozen, journal.seq), binary=binary)
+            results[f"{fmt}_save_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            results[f"{fmt}_file_bytes"] = os.path.getsize(target)
+            start = time.perf_counter()
+            load_data(target)
+            results[f"{fmt}_load_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            start = time.perf_counter()
+            for topic in app_state["topics"]:
+                app_state["todos"].get(topic)
+            results[f"{fmt}_decode_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        JOURNAL_MODE = True
+        toggle_todo(0, 0)
+        start = time.perf_counter()
+        save_data(target)
+        results["save_journal_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    finally:
+        JOURNAL_MODE = saved_mode
+        journal.reset(None, 0)
+    return results
+
+
+def bench_sort():
+    """Time building every topic's display order in each of SORT_MODES"""
+    results = {}
+    saved_mode = app_state.get("sort_mode", "priority")
+    try:
+        for mode in SORT_MODES:
+            display_order.clear()
+            app_state["sort_mode"] = mode
+            start = time.perf_counter()
+            for topic in app_state["topics"]:
+                get_todo_display_order(topic)
+            results[f"{mode}_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    finally:
+        app_state["sort_mode"] = saved_mode
+    return results
+
+
+def bench_render(frames=200):
+    """Measure render_frame per layout: time, bytes written and memory
+    allocated per frame, for full repaints and for frames after a cursor
+    move (the common incremental case). Returns a dict of results.
+    """
+    import tracemalloc
+    global renderer
+    saved_backend, saved_renderer = _backend, renderer
+    bench_reset_view()
+    app_state.update(active_tab="todos", nav_mode=False, _cursor_visible=True)
+    todos = len(app_state["todos"].get(app_state["topics"][0], [])) if app_state["topics"] else 0
+    results = {"frames": frames}
+    try:
+        for width, height in BENCH_SIZES:
+            backend = FakeBackend(width, height, keep_output=False)
+            set_backend(backend)
+            renderer = FrameRenderer()
+            for mode in ("full", "scroll"):
+                def frame(i):
+                    if mode == "full":
+                        renderer.invalidate()
+                    else:
+                        app_state["todo_index"] = i % max(1, todos)
+                    render_frame(width, height)
+                frame(0)
+                written = backend.bytes_written
+                start = time.perf_counter()
+                for i in range(frames):
+                    frame(i + 1)
+                elapsed = time.perf_counter() - start
+                label = f"{width}x{height}_{mode}"
+                results[f"{label}_ms"] = round(elapsed / frames * 1000, 3)
+                results[f"{label}_bytes"] = (backend.bytes_written - written) // frames
+                tracemalloc.start()
+                frame(frames + 1)
+                results[f"{label}_alloc_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+                tracemalloc.stop()
+    finally:
+        set_backend(saved_backend)
+        renderer = saved_renderer
+    return results
+
+
+def bench_input(width=120, height=40):
+    """Play each BENCH_KEYS script through handle_input on a FakeBackend,
+    painting a frame after every handle_input call as the main loop does.
+    A call may take a run of typed keys at once, so handling time is
+    reported per key and painting time per frame.
+    """
+    global renderer
+    saved_backend, saved_renderer = _backend, renderer
+    results = {}
+    try:
+        for name, keys in BENCH_KEYS.items():
+            bench_reset_view()
+            backend = FakeBackend(width, height, keep_output=False)
+            set_backend(backend)
+            renderer = FrameRenderer()
+            render_frame(width, height)
+            backend.feed(keys)
+            tokens = backend.decoder.tokens
+            count = len(tokens) - tokens.count(b"\xe0")  # an arrow key is two tokens
+            handled = painted = 0.0
+            frames = 0
+            while backend.key_pending():
+                start = time.perf_counter()
+                handle_input()
+                middle = time.perf_counter()
+                render_frame(width, height)
+                handled += middle - start
+                painted += time.perf_counter() - middle
+                frames += 1
+            results[f"{name}_keys"] = count
+            results[f"{name}_frames"] = frames
+            results[f"{name}_handle_ms_per_key"] = round(handled / max(1, count) * 1000, 4)
+            results[f"{name}_paint_ms_per_frame"] = round(painted / max(1, frames) * 1000, 4)
+    finally:
+        set_backend(saved_backend)
+        renderer = saved_renderer
+        bench_reset_view()
+    return results
+
+
+def bench_suite(frames=100):
+    """Run the storage, sort, render and input benchmarks over every
+    BENCH_DATASETS entry. Returns a JSON-ready dict.
+    """
+    import platform
+    import tempfile
+    results = {
+        "python": platform.python_version(),
+        "platform": sys.platform,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "datasets": [],
+    }
+    for topics, todos, note_bytes, deadlines in BENCH_DATASETS:
+        bench_dataset(topics, todos, note_bytes, deadlines)
+        entry = {"topics": topics, "todos_per_topic": todos,
+                 "note_bytes": note_bytes, "deadlines": deadlines}
+        with tempfile.TemporaryDirectory() as tmp:
+            entry["storage"] = bench_storage(os.path.join(tmp, "bench.todo"))
+        entry["sort"] = bench_sort()
+        entry["render"] = bench_render(frames)
+        entry["input"] = bench_input()
+        results["datasets"].append(entry)
+    return results
+
+
+def run_cli(argv):
+    """Headless subcommands: apply a whole batch with one load and one save.
+
+    Returns the process exit code. The terminal is never touched.
+    """
+    import argparse
+    parser = argparse.ArgumentParser(prog="Todo.py", description="Script todos without the TUI.")
+    parser.add_argument("--data", help="path to the .todo file (default: todos.todo next to Todo.py)")
+    parser.add_argument("--timings", action="store_true", help="print load phase timings to stderr")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("add", help="add todos to a topic (created if missing)")
+    p.add_argument("topic")
+    p.add_argument("names", nargs="*")
+    p.add_argument("-p", "--priority", default="4", help="1=High 2=Medium 3=Low 4=None")
+    p.add_argument("-d", "--deadline", help="DD-MM-YYYY")
+    p.add_argument("-f", "--file", help="batch file ('-' = stdin): name[<TAB>priority[<TAB>deadline]] per line")
+
+    p = sub.add_parser("list", help="list todos")
+    p.add_argument("topic", nargs="?")
+
+    p = sub.add_parser("done", help="mark todos completed")
+    p.add_argument("topic")
+    p.add_argument("names", nargs="*", help="todo names or #<n> positions")
+    p.add_argument("-f", "--file", help="batch file ('-' = stdin): one name per line")
+    p.add_argument("--undo", action="store_true", help="mark as not completed instead")
+
+    p = sub.add_parser("delete", help="delete todos, or the whole topic when no names are given")
+    p.add_argument("topic")
+    p.add_argument("names", nargs="*", help="todo names or #<n> positions")
+    p.add_argument("-f", "--file", help="batch file ('-' = stdin): one name per line")
+
+    p = sub.add_parser("move", help="move todos to another topic (created if missing)")
+    p.add_argument("topic")
+    p.add_argument("dest")
+    p.add_argument("names", nargs="*", help="todo names or #<n> positions")
+    p.add_argument("-f", "--file", help="batch file ('-' = stdin): one name per line")
+
+    p = sub.add_parser("bench", help="run a benchmark (does not touch the data file)")
+    p.add_argument("suite", choices=["memory", "render", "all"])
+    p.add_argument("--todos", type=int, help="number of synthetic todos (memory: 100000, render: 200 per topic)")
+    p.add_argument("--json", help="write the results as JSON to this file ('-' = stdout); 'all' defaults to stdout")
+
+    p = sub.add_parser("export", help="write all todos as TSV or JSON")
+    p.add_argument("--format", choices=["tsv", "json"], default="tsv")
+    p.add_argument("-o", "--output", help="output file (default: stdout)")
+
+    p = sub.add_parser("convert", help="rewrite the data file (and its journal) as one snapshot")
+    p.add_argument("--format", choices=["v2", "v1"], default="v2", help="v2 = binary (default), v1 = older text format")
+    p.add_argument("-o", "--output", help="output file (default: the data file itself)")
+
+    args = parser.parse_args(argv)
+    if args.command == "bench":
+        if args.suite == "all":
+            result = bench_suite()
+        elif args.suite == "render":
+            bench_dataset(todos=args.todos or 200)
+            result = bench_render()
+        else:
+            result = bench_memory(args.todos or 100000)
+        output = args.json or ("-" if args.suite == "all" else None)
+        if output is None:
+            for key, value in result.items():
+                print(f"{key}: {value}")
+        else:
+            import json
+            text = json.dumps(result, indent=2) + "\n"
+            if output == "-":
+                sys.stdout.write(text)
+            else:
+                with open(output, "w", encoding="utf-8") as f:
+                    f.write(text)
+        return 0
+
+    undo_log.limit = 0  # nothing to undo in a one-shot command
+    path = args.data or get_data_path()
+    if os.path.exists(path) and not load_data(path):
+        print(app_state.get("status_msg") or f"Could not read {path}", file=sys.stderr)
+        return 1
+
+    if args.timings and app_state.get("load_timings"):
+        phases = ", ".join(f"{k} {v * 1000:.1f} ms" for k, v in app_state["load_timings"].items())
+        print(f"load: {phases}", file=sys.stderr)
+
+    topics = app_state["topics"]
+
+    def topic_id(name, create=False):
+        topic = topics.id_of(name)
+        if topic is None and create:
+            topic = create_topic(name)
+        return topic
+
+    names = list(getattr(args, "names", None) or [])
+    if getattr(args, "file", None):
+        names.extend(read_batch(args.file))
+
+    changed = False
+    if args.command == "add":
+        topic = topic_id(args.topic, create=True)
+        default_priority = parse_priority(args.priority)
+        default_deadline = parse_deadline(args.deadline)
+        for line in names:
+            fields = line.split("\t")
+            priority = parse_priority(fields[1]) if len(fields) > 1 and fields[1] else default_priority
+            deadline = parse_deadline(fields[2]) if len(fields) > 2 else default_deadline
+            add_todo(topic, fields[0], priority, deadline)
+        print(f"Added {len(names)} todo(s) to {args.topic}")
+        changed = True
+
+    elif args.command == "list":
+        if args.topic and topic_id(args.topic) is None:
+            print(f"No such topic: {args.topic}", file=sys.stderr)
+            return 1
+        for topic in [topic_id(args.topic)] if args.topic else topics:
+            print(topics.name(topic))
+            for i in get_todo_display_order(topic):
+                t = app_state["todos"][topic][i]
+                box = "[x]" if t.get("completed") else "[ ]"
+                due = f", due {t['deadline']}" if t.get("deadline") else ""
+                print(f"  #{i + 1} {box} {t.get('name')} ({PRIORITIES[t.get('priority', 3)]}{due})")
+
+    elif args.command in ("done", "delete", "move"):
+        topic = topic_id(args.topic)
+        if topic is None:
+            print(f"No such topic: {args.topic}", file=sys.stderr)
+            return 1
+        ti = topics.index(topic)
+        if args.command == "delete" and not names:
+            delete_topic(ti)
+            print(f"Deleted topic {args.topic}")
+            changed = True
+        else:
+            indices, missing = find_todos(topic, names)
+            for name in missing:
+                print(f"No such todo in {args.topic}: {name}", file=sys.stderr)
+            todos = app_state["todos"].get(topic, [])
+            if args.command == "done":
+                for i in indices:
+                    if todos[i].get("completed") == args.undo:
+                        toggle_todo(ti, i)
+                print(f"Updated {len(indices)} todo(s)")
+            else:
+                moved = [todos[i] for i in indices]
+                # delete from the back so earlier indices stay valid
+                for i in reversed(indices):
+                    delete_todo(ti, i)
+                if args.command == "move":
+                    dest = topic_id(args.dest, create=True)
+                    for todo in moved:
+                        insert_todo(dest, todo)
+                    print(f"Moved {len(moved)} todo(s) to {args.dest}")
+                else:
+                    print(f"Deleted {len(moved)} todo(s)")
+            changed = bool(indices)
+            if missing:
+                if changed:
+                    save_data(path)
+                return 1
+
+    elif args.command == "export":
+        if args.format == "json":
+            import json
+            data = [{
+                "topic": topics.name(topic),
+                "todos": [{
+                    "name": t.get("name"),
+                    "priority": PRIORITIES[t.get("priority", len(PRIORITIES) - 1)],
+                    "completed": bool(t.get("completed")),
+                    "created_at": t.get("created_at", ""),
+                    "deadline": t.get("deadline"),
+                    "notes": get_notes(t),
+                } for t in app_state["todos"].get(topic, [])],
+            } for topic in topics]
+            text = json.dumps(data, indent=2, ensure_ascii=False) + "\n"
+        else:
+            rows = ["topic\tname\tpriority\tcompleted\tcreated_at\tdeadline"]
+            for topic in topics:
+                rows.extend(format_todo_row(topics.name(topic), t) for t in app_state["todos"].get(topic, []))
+            text = "\n".join(rows) + "\n"
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text)
+        else:
+            sys.stdout.write(text)
+
+    elif args.command == "convert":
+        output = args.output or path
+        frozen = freeze_state()
+        if args.format == "v2":
+            write_atomic(output, lambda f: write_snapshot_v2(f, frozen, journal.seq), binary=True)
+        else:
+            write_atomic(output, lambda f: write_snapshot(f, frozen, journal.seq))
+        if os.path.abspath(output) == os.path.abspath(path):
+            remove_journals(path)
+        print(f"Wrote {output} as TODO_{args.format.upper()}")
+
+    if changed and not save_data(path):
+        print(app_state["status_msg"], file=sys.stderr)
+        return 1
+    return 0
+
+
 def main():
+    # Any arguments select a headless subcommand; no terminal setup at all
+    if len(sys.argv) > 1:
+        return run_cli(sys.argv[1:])
+
     # Initialize terminal
-    init_windows_terminal()
-    sys.stdout.write(HIDE_CURSOR)
-    sys.stdout.flush()
+    backend = get_backend()
+    backend.start()
+    backend.write(HIDE_CURSOR)
+    backend.flush()
     try:
         # Load saved data if available
         try:
             load_data()
         except Exception:
             pass
+        search_index.start()
         
-        # Main loop
+        # Main loop: sleep until a key, a resize or the next timer, then drain
+        # every pending key before painting one frame
         running = True
         while running:
+            # Report a finished background save; autosave once edits pause
+            saver.poll()
+            journal.poll()
+            if dirty.due():
+                save_data(wait=False)
+
             # Get current terminal size
             width, height = get_terminal_size()
             
             # Render frame
             render_frame(width, height)
+
+            # Build the search index a slice at a time while no key waits
+            if search_index.building() and not key_pending():
+                search_index.build_step(SEARCH_BUILD_MS / 1000)
             
-            # Handle input
-            running = handle_input()
+            # Block until there is something to do
+            deadline = next_timer_deadline()
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            wait_for_input(timeout)
             
-            # Control frame rate
-            time.sleep(0.033)  # ~30 FPS
+            # Handle input
+            if profiler.enabled and key_pending():
+                profiler.key_arrived()
+            start = time.perf_counter()
+            while running and key_pending():
+                running = handle_input()
+            if profiler.enabled and profiler.key_time is not None:
+                profiler.add("input", start)
             
     finally:
-        # Auto-save on exit
+        # Auto-save on exit: capture now, finish writing once the terminal is
+        # back. Without changes there is nothing to write, not even a new file.
         try:
-            save_data()
+            if dirty.changes:
+                save_data(wait=False)
         except Exception:
             pass
+        profiler.close()
         # Restore normal screen (don't change the terminal cursor)
-        sys.stdout.write(SHOW_CURSOR + NORMAL_SCREEN)
-        sys.stdout.flush()
+        backend.write(SHOW_CURSOR + NORMAL_SCREEN)
+        backend.flush()
+        backend.stop()
+        saver.wait()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
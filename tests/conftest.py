@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Todo  # noqa: E402
+
+
+def reset_state():
+    """Empty topics/todos, as if the app started without a data file"""
+    Todo.saver.wait()
+    Todo.app_state.update(topics=Todo.TopicRegistry(), todos={}, topic_index=0, todo_index=0,
+                          status_msg="", status_msg_until=0)
+    for cache in (Todo.display_order, Todo.search_index, Todo.topic_stats, Todo.undo_log):
+        cache.clear()
+    Todo.undo_log.limit = Todo.UNDO_LIMIT_BYTES  # run_cli turns it off
+    Todo.journal.reset(None, 0)
+    Todo.dirty.reset(None)
+    Todo.dirty.failures = 0
+
+
+def dump_state():
+    """Everything a save must keep, as plain tuples"""
+    topics = Todo.app_state["topics"]
+    return [(topic, topics.name(topic), [
+        (t.name, t.priority, t.completed, t.created_at, t.deadline, Todo.get_notes(t))
+        for t in Todo.app_state["todos"].get(topic, [])
+    ]) for topic in topics]
+
+
+def reload(path):
+    """Drop the in-memory state and load `path` back; returns dump_state()"""
+    reset_state()
+    assert Todo.load_data(path), Todo.app_state["status_msg"]
+    return dump_state()
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    """Fresh state on a FakeBackend; returns the .todo path to save to"""
+    Todo.set_backend(Todo.FakeBackend(100, 30, keep_output=False))
+    reset_state()
+    yield str(tmp_path / "todos.todo")
+    Todo.saver.wait()
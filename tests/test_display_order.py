@@ -0,0 +1,105 @@
+import datetime
+
+import pytest
+
+import Todo
+
+TODOS = [
+    # name, priority, completed, created_at, deadline
+    ("Late", 1, False, "02-01-2026 10:00:00", "17-10-2026"),
+    ("Today", 2, False, "01-01-2026 10:00:00", "18-10-2026"),
+    ("Tomorrow", 2, True, "03-01-2026 10:00:00", "19-10-2026"),
+    ("Someday", 0, False, "01-01-2025 10:00:00", None),
+    ("Free text", 3, False, "yesterday", "soon"),
+]
+
+
+def populate():
+    topic = Todo.create_topic("Topic")
+    for name, priority, completed, created, deadline in TODOS:
+        Todo.insert_todo(topic, Todo.Todo(name, priority, completed, created, deadline))
+    return topic
+
+
+def check(topic):
+    """Every cached order and position map matches a sort from scratch"""
+    todos = Todo.app_state["todos"][topic]
+    for mode in Todo.SORT_MODES:
+        expected = sorted(range(len(todos)), key=lambda i: Todo.todo_sort_key(todos[i], i, mode))
+        assert Todo.display_order.order(topic, mode) == expected
+        for pos, i in enumerate(expected):
+            assert Todo.display_order.position(topic, mode, i) == pos
+
+
+def cached(topic):
+    return [Todo.display_order.entries.get((topic, mode)) for mode in Todo.SORT_MODES]
+
+
+def test_append_is_merged_in_place(data_path):
+    topic = populate()
+    check(topic)
+    before = cached(topic)
+    Todo.add_todo(topic, "Urgent", 0, "01-01-2026")
+    assert cached(topic) == before and all(a is b for a, b in zip(cached(topic), before))
+    check(topic)
+
+
+@pytest.mark.parametrize("change", ["insert", "delete", "undo delete"])
+def test_structural_changes_drop_the_topic(data_path, change):
+    topic = populate()
+    check(topic)
+    if change == "insert":
+        Todo.insert_todo(topic, Todo.Todo("First", 3), 0)
+    else:
+        Todo.delete_todo(0, 3)
+        if change == "undo delete":
+            check(topic)
+            assert Todo.undo_log.undo() == "delete todo"
+    assert cached(topic) == [None] * len(Todo.SORT_MODES)
+    check(topic)
+
+
+def test_toggle_keeps_the_order(data_path):
+    # completion is not part of any sort key, so the cache stays valid
+    topic = populate()
+    check(topic)
+    before = cached(topic)
+    Todo.toggle_todo(0, 0)
+    Todo.toggle_todo(0, 2)
+    assert all(a is b for a, b in zip(cached(topic), before))
+    check(topic)
+    assert Todo.undo_log.undo() == "toggle todo"
+    check(topic)
+
+
+def test_midnight_keeps_the_order(data_path, monkeypatch):
+    # deadline ordinals are absolute days; the date only changes badges
+    class Tomorrow(datetime.date):
+        @classmethod
+        def today(cls):
+            return cls(2026, 10, 19)
+
+    topic = populate()
+    Todo.render_frame(100, 30)
+    check(topic)
+    before = cached(topic)
+    monkeypatch.setattr(Todo, "date", Tomorrow)
+    Todo.app_state["_today_until"] = 0
+    Todo.render_frame(100, 30)
+    assert Todo.today_ordinal() == Tomorrow.today().toordinal()
+    assert all(a is b for a, b in zip(cached(topic), before))
+    check(topic)
+
+
+def test_priority_change_from_the_journal(data_path):
+    topic = populate()
+    assert Todo.save_data(data_path)
+    Todo.toggle_todo(0, 4)
+    assert Todo.save_data(data_path)
+    with open(Todo.get_journal_path(data_path), "a", encoding="utf-8") as f:
+        f.write("\x1f".join(["99", "TODO_SET", str(topic), "4", "priority", "0"]) + "\n")
+    assert Todo.display_order.order(topic, "priority") == [3, 0, 1, 2, 4]
+    assert Todo.load_data(data_path)  # replays the journal over fresh todos
+    assert Todo.app_state["todos"][topic][4].priority == 0
+    assert Todo.display_order.order(topic, "priority") == [3, 4, 0, 1, 2]
+    check(topic)
@@ -0,0 +1,163 @@
+import os
+
+import pytest
+
+import Todo
+from conftest import dump_state, reload
+
+
+def populate():
+    """Two topics with a few todos, one with notes and odd dates"""
+    work = Todo.create_topic("Work")
+    Todo.add_todo(work, "Report", 0, "01-02-2026")
+    Todo.add_todo(work, "Review", 2, None)
+    home = Todo.create_topic("Home")
+    Todo.insert_todo(home, Todo.Todo("Plants", 1, True, "yesterday", "soon", "water\nweekly"))
+    return work, home
+
+
+def edit(topic_index, todo_index, start, end, text):
+    Todo.app_state["topic_index"] = topic_index
+    Todo.app_state["todo_index"] = todo_index
+    Todo.edit_notes(start, end, text)
+
+
+def journal_lines(path):
+    with open(Todo.get_journal_path(path), encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_changes_after_a_snapshot_go_to_the_journal(data_path):
+    populate()
+    assert Todo.save_data(data_path)
+    assert not os.path.exists(Todo.get_journal_path(data_path))
+    Todo.toggle_todo(0, 1)
+    Todo.rename_topic(1, "House")
+    edit(0, 0, 0, 0, "draft")
+    Todo.delete_todo(0, 1)
+    Todo.move_topic(1, 0)
+    expected = dump_state()
+    assert Todo.save_data(data_path)
+    assert journal_lines(data_path)[0] == Todo.JOURNAL_HEADER
+    assert len(journal_lines(data_path)) == 6
+    assert reload(data_path) == expected
+
+
+def test_replay_after_undo_and_redo(data_path):
+    populate()
+    assert Todo.save_data(data_path)
+    edit(0, 0, 0, 0, "a")
+    edit(0, 0, 1, 1, "b")
+    Todo.delete_topic(1)
+    Todo.toggle_todo(0, 0)
+    assert Todo.undo_log.undo() == "toggle todo"
+    assert Todo.undo_log.undo() == "delete topic"
+    assert Todo.undo_log.undo() == "notes edit"
+    assert Todo.undo_log.redo() == "notes edit"
+    expected = dump_state()
+    assert [len(todos) for _, _, todos in expected] == [2, 1]
+    assert expected[0][2][0][5] == "ab"
+    assert Todo.save_data(data_path)
+    assert reload(data_path) == expected
+
+
+def test_nothing_changed_writes_nothing(data_path):
+    populate()
+    assert Todo.save_data(data_path)
+    mtime = os.stat(data_path).st_mtime_ns
+    assert Todo.save_data(data_path)
+    assert Todo.app_state["status_msg"] == "No changes to save"
+    assert os.stat(data_path).st_mtime_ns == mtime
+    assert not os.path.exists(Todo.get_journal_path(data_path))
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(data_path, monkeypatch):
+    populate()
+    assert Todo.save_data(data_path)
+    monkeypatch.setattr(Todo, "JOURNAL_COMPACT_BYTES", 0)
+    Todo.toggle_todo(0, 0)
+    expected = dump_state()
+    assert Todo.save_data(data_path)  # also waits for the compaction it starts
+    assert os.listdir(os.path.dirname(data_path)) == ["todos.todo"]
+    assert reload(data_path) == expected
+
+
+def test_failed_compaction_keeps_the_moved_journal(data_path, monkeypatch):
+    populate()
+    assert Todo.save_data(data_path)
+    monkeypatch.setattr(Todo, "JOURNAL_COMPACT_BYTES", 0)
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(Todo, "write_atomic", fail)
+    Todo.toggle_todo(0, 0)
+    assert Todo.save_data(data_path)
+    assert Todo.app_state["status_msg"] == "Compaction failed: disk full"
+    assert os.path.exists(Todo.get_journal_path(data_path) + ".old")
+    monkeypatch.undo()
+    expected = dump_state()
+    assert reload(data_path) == expected
+
+    # the next compaction picks up the leftover records too
+    monkeypatch.setattr(Todo, "JOURNAL_COMPACT_BYTES", 0)
+    Todo.toggle_todo(0, 1)
+    expected = dump_state()
+    assert Todo.save_data(data_path)
+    assert os.listdir(os.path.dirname(data_path)) == ["todos.todo"]
+    assert reload(data_path) == expected
+
+
+def test_failed_append_leaves_no_torn_record(data_path, monkeypatch):
+    populate()
+    assert Todo.save_data(data_path)
+    Todo.toggle_todo(0, 0)
+    assert Todo.save_data(data_path)
+    good = journal_lines(data_path)
+
+    def fail(fd):
+        raise OSError("I/O error")
+
+    monkeypatch.setattr(os, "fsync", fail)
+    Todo.toggle_todo(0, 1)
+    assert not Todo.save_data(data_path)
+    assert journal_lines(data_path) == good
+    monkeypatch.undo()
+    Todo.rename_topic(0, "Office")
+    expected = dump_state()
+    assert Todo.save_data(data_path)
+    assert len(journal_lines(data_path)) == len(good) + 2
+    assert reload(data_path) == expected
+
+
+@pytest.mark.parametrize("fail_at", ["write", "fsync", "replace"])
+def test_write_atomic_failure_keeps_the_old_file(tmp_path, monkeypatch, fail_at):
+    path = str(tmp_path / "data.todo")
+    with open(path, "w") as f:
+        f.write("old")
+
+    def write(f):
+        f.write("new")
+        if fail_at == "write":
+            raise ValueError("encode failed")
+
+    def fail(*args):
+        raise OSError(fail_at)
+
+    if fail_at != "write":
+        monkeypatch.setattr(os, fail_at, fail)
+    with pytest.raises((OSError, ValueError)):
+        Todo.write_atomic(path, write)
+    monkeypatch.undo()
+    with open(path) as f:
+        assert f.read() == "old"
+    assert os.listdir(tmp_path) == ["data.todo"]
+
+
+def test_write_atomic_replaces_the_file(tmp_path):
+    path = str(tmp_path / "data.todo")
+    Todo.write_atomic(path, lambda f: f.write(b"new"), binary=True)
+    Todo.write_atomic(path, lambda f: f.write(b"newer"), binary=True)
+    with open(path, "rb") as f:
+        assert f.read() == b"newer"
+    assert os.listdir(tmp_path) == ["data.todo"]
@@ -0,0 +1,162 @@
+import bisect
+import random
+
+import pytest
+
+import Todo
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    """Chunks of 4 characters, so a few edits split and merge them"""
+    monkeypatch.setattr(Todo.NotesBuffer, "CHUNK", 4)
+
+
+def check_chunks(buffer, expected):
+    assert len(buffer) == len(expected)
+    assert "".join(buffer.chunks) == expected
+    assert all(0 < len(c) <= 2 * Todo.NotesBuffer.CHUNK for c in buffer.chunks) or buffer.chunks == [""]
+    assert [buffer.index.prefix(i) for i in range(len(buffer.chunks) + 1)] == \
+        [len("".join(buffer.chunks[:i])) for i in range(len(buffer.chunks) + 1)]
+
+
+def test_chunks_split_and_merge(small_chunks):
+    buffer = Todo.NotesBuffer("abcdefgh")
+    assert buffer.chunks == ["abcd", "efgh"]
+    buffer.insert(2, "0123456")  # over 2 * CHUNK: splits
+    assert buffer.chunks == ["ab01", "2345", "6cd", "efgh"]
+    check_chunks(buffer, "ab0123456cdefgh")
+    buffer.delete(3, 13)  # across three chunks: merged into one
+    assert buffer.chunks == ["ab0gh"]
+    check_chunks(buffer, "ab0gh")
+    buffer.replace(0, 5, "")
+    assert buffer.chunks == [""]
+    check_chunks(buffer, "")
+    buffer.insert(0, "x")
+    check_chunks(buffer, "x")
+
+
+def test_emptied_chunk_is_dropped(small_chunks):
+    buffer = Todo.NotesBuffer("abcdefghij")
+    buffer.delete(4, 8)
+    assert buffer.chunks == ["abcd", "ij"]
+    check_chunks(buffer, "abcdij")
+    assert buffer.slice(3, 5) == "di"
+
+
+def test_merge_of_two_full_chunks_splits(small_chunks):
+    buffer = Todo.NotesBuffer("abcdefghijklmnop")
+    buffer.insert(3, "1234")
+    buffer.insert(19, "5678")
+    assert buffer.chunks == ["abc1234d", "efgh", "ijkl", "mno5678p"]
+    buffer.delete(7, 17)  # leaves 7 + 7 characters: too many for one chunk
+    assert buffer.chunks == ["abc1", "234n", "o567", "8p"]
+    check_chunks(buffer, "abc1234no5678p")
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_edits_match_a_string(small_chunks, seed):
+    rng = random.Random(seed)
+    expected = "".join(rng.choice("ab \n") for _ in range(30))
+    buffer = Todo.NotesBuffer(expected)
+    for step in range(300):
+        start = rng.randint(0, len(expected))
+        end = rng.randint(start, min(len(expected), start + rng.choice([0, 1, 3, 12])))
+        text = "".join(rng.choice("xy\n") for _ in range(rng.choice([0, 1, 2, 9])))
+        buffer.replace(start, end, text)
+        expected = expected[:start] + text + expected[end:]
+        check_chunks(buffer, expected)
+        for _ in range(3):
+            a = rng.randint(-2, len(expected) + 2)
+            b = rng.randint(a, len(expected) + 4)
+            assert buffer.slice(a, b) == expected[max(0, a):b]
+        if step % 10 == 0:
+            assert buffer.text() == expected
+            assert buffer.slice(1, 6) == expected[1:6]  # from the flat copy
+
+
+def test_replace_clamps_the_range():
+    buffer = Todo.NotesBuffer("hello")
+    buffer.replace(3, 99, "p!")
+    assert buffer.text() == "help!"
+    buffer.replace(-5, 1, "w")
+    assert buffer.text() == "welp!"
+    version = buffer.version
+    buffer.replace(2, 2, "")
+    assert buffer.version == version
+
+
+def full_wrap(raw, width):
+    """The full-string wrap used before WrapIndex: (lines, starts)"""
+    lines = []
+    starts = []
+    off = 0
+    for paragraph in raw.split("\n"):
+        for i in range(0, len(paragraph), width):
+            lines.append(paragraph[i:i + width])
+            starts.append(off + i)
+        if not paragraph:
+            lines.append("")
+            starts.append(off)
+        off += len(paragraph) + 1
+    return lines, starts
+
+
+def check_wrap(wrap, raw):
+    width = wrap.width
+    lines, starts = full_wrap(raw, width)
+    assert wrap.total_rows() == len(lines)
+    assert wrap.row_spans(0, len(lines) + 2) == [(s, len(line)) for s, line in zip(starts, lines)]
+    for first in range(0, len(lines), 3):
+        assert wrap.row_spans(first, 2) == [(s, len(line)) for s, line in zip(starts, lines)][first:first + 2]
+    for offset in range(len(raw) + 1):
+        row = bisect.bisect_right(starts, offset) - 1
+        assert wrap.offset_to_rowcol(offset) == (row, offset - starts[row])
+    assert wrap.offset_to_rowcol(len(raw) + 5) == wrap.offset_to_rowcol(len(raw))
+    for row in range(-1, len(lines) + 2):
+        for col in range(-1, width + 2):
+            if row < 0:
+                expected = 0
+            elif row >= len(lines):
+                expected = len(raw)
+            else:
+                expected = starts[row] + max(0, min(col, len(lines[row])))
+            assert wrap.rowcol_to_offset(row, col) == expected
+
+
+@pytest.mark.parametrize("raw", ["", "\n", "abc", "abcdef", "abcdefg\n\nhi\n", "\n\nxyz\nabcdefghijklm"])
+@pytest.mark.parametrize("width", [1, 3, 6])
+def test_wrap_matches_the_full_wrap(raw, width):
+    check_wrap(Todo.WrapIndex(raw, width), raw)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_wrap_follows_edits(small_chunks, seed):
+    rng = random.Random(seed)
+    buffer = Todo.NotesBuffer("".join(rng.choice("ab\n") for _ in range(40)))
+    wrap = buffer.wrap_index(5)
+    for _ in range(150):
+        if rng.random() < 0.5:
+            # at a chunk edge
+            start = buffer.index.prefix(rng.randint(0, len(buffer.chunks)))
+        else:
+            start = rng.randint(0, len(buffer))
+        end = min(len(buffer), start + rng.choice([0, 1, 2, 7]))
+        # newlines in the removed or inserted text split and join paragraphs
+        buffer.replace(start, end, "".join(rng.choice("xy\n") for _ in range(rng.choice([0, 1, 3, 11]))))
+        assert buffer.wrap_index(5) is wrap  # updated, not rebuilt
+        check_wrap(wrap, buffer.text())
+
+
+def test_paragraph_split_and_join():
+    buffer = Todo.NotesBuffer("abcdefgh\nij")
+    wrap = buffer.wrap_index(3)
+    buffer.insert(4, "\n")
+    assert wrap.lengths == [4, 4, 2]
+    check_wrap(wrap, "abcd\nefgh\nij")
+    buffer.delete(3, 11)  # joins the first and last paragraphs
+    assert wrap.lengths == [4]
+    check_wrap(wrap, "abcj")
+    buffer.replace(1, 2, "\n\n")
+    assert wrap.lengths == [1, 0, 2]
+    check_wrap(wrap, "a\n\ncj")
@@ -0,0 +1,119 @@
+import random
+import re
+
+import pytest
+
+import Todo
+
+ESCAPE = re.compile(r"\033\[([0-9;]*)([A-Za-z])")
+
+
+def replay(output, width, height):
+    """Screen after writing `output` to a blank terminal: rows of (char, SGR) cells"""
+    screen = [[(" ", "")] * width for _ in range(height)]
+    sgr = ""
+    y = x = 0
+
+    def put(text):
+        nonlocal x
+        for ch in text:
+            screen[y][x] = (ch, sgr)
+            x += 1
+
+    pos = 0
+    for match in ESCAPE.finditer(output):
+        put(output[pos:match.start()])
+        pos = match.end()
+        params, command = match.groups()
+        if command == "J":
+            screen = [[(" ", sgr)] * width for _ in range(height)]
+        elif command == "H":
+            y, x = (int(n) - 1 for n in params.split(";"))
+        elif command == "m":
+            seq = match.group()
+            if seq == Todo.NORMAL:
+                sgr = ""
+            elif Todo.FOREGROUND_SGR.fullmatch(seq) and (not sgr or Todo.FOREGROUND_SGR.fullmatch(sgr)):
+                sgr = seq  # one plain foreground replaces another
+            else:
+                sgr += seq
+    put(output[pos:])
+    return screen
+
+
+def cells(canvas):
+    return [[(ch, Todo.ATTR_SGR[attr]) for ch, attr in zip(chars, attrs)]
+            for chars, attrs in zip(canvas.chars, canvas.attrs)]
+
+
+def copy(canvas):
+    new = Todo.Canvas(canvas.width, canvas.height)
+    new.chars = [row[:] for row in canvas.chars]
+    new.attrs = [bytearray(row) for row in canvas.attrs]
+    return new
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_diffs_replay_to_the_frame(seed):
+    rng = random.Random(seed)
+    attrs = [0] + [Todo.attr_id(sgr) for sgr in (Todo.ACTIVE_COLOR, Todo.SELECTED_COLOR, Todo.INFO_LABEL_COLOR,
+                                                 Todo.TAB_BG + Todo.TAB_FG)]
+    width, height = 40, 12
+    canvas = Todo.Canvas(width, height)
+    out = Todo.FakeBackend(width, height)
+    renderer = Todo.FrameRenderer()
+    for step in range(40):
+        canvas = copy(canvas)
+        changes = rng.choice([0, 1, 3, 20, 200])
+        for _ in range(changes):
+            y = rng.randrange(height)
+            x = rng.randrange(width)
+            canvas.put(y, x, "".join(rng.choice("ab ─█é") for _ in range(rng.randint(1, 9))), rng.choice(attrs))
+        written = out.bytes_written
+        renderer.present(canvas, out)
+        assert replay("".join(out.output), width, height) == cells(canvas)
+        if changes == 0 and step:
+            assert out.bytes_written == written
+
+
+def populate():
+    for t in range(3):
+        topic = Todo.create_topic(f"Topic {t}")
+        for i in range(5):
+            Todo.add_todo(topic, f"Todo {t}.{i}", i % 4, "01-02-2026" if i % 2 else None)
+
+
+def test_app_frames_replay_to_the_frame(data_path):
+    backend = Todo.FakeBackend(100, 30)
+    Todo.set_backend(backend)
+    populate()
+    Todo.render_frame(100, 30)
+    assert backend.output[0].startswith(Todo.NORMAL + Todo.CLEAR_SCREEN)
+    for change in (lambda: Todo.toggle_todo(0, 1),
+                   lambda: Todo.app_state.update(todo_index=3),
+                   lambda: Todo.app_state.update(topic_index=2, todo_index=0),
+                   lambda: Todo.add_todo(Todo.app_state["topics"][2], "Added", 0, None),
+                   lambda: Todo.delete_topic(0)):
+        change()
+        Todo.render_frame(100, 30)
+        assert replay("".join(backend.output), 100, 30) == cells(Todo.renderer.front)
+    # an unchanged frame writes nothing
+    written = backend.bytes_written
+    Todo.render_frame(100, 30)
+    assert backend.bytes_written == written
+
+
+def test_resize_and_invalidate_repaint_everything(data_path):
+    backend = Todo.FakeBackend(100, 30)
+    Todo.set_backend(backend)
+    populate()
+    Todo.render_frame(100, 30)
+    for invalidate in (False, True):
+        backend.output.clear()
+        if invalidate:
+            Todo.renderer.invalidate()
+        else:
+            backend.width, backend.height = 80, 24
+        Todo.render_frame(80, 24)
+        assert backend.output[0].startswith(Todo.NORMAL + Todo.CLEAR_SCREEN)
+        assert replay("".join(backend.output), 80, 24) == cells(Todo.renderer.front)
@@ -0,0 +1,95 @@
+import Todo
+from conftest import reset_state
+
+
+def populate(topics=30, todos=20):
+    for t in range(topics):
+        topic = Todo.create_topic(f"Project {t} {'alpha' if t % 2 else 'beta'}")
+        for i in range(todos):
+            Todo.insert_todo(topic, Todo.Todo(f"task {t * todos + i}", notes=f"note {i % 7} gamma"))
+
+
+def full_index():
+    index = Todo.SearchIndex()
+    index.build_step()
+    return index
+
+
+def same_index(index, full):
+    assert index.ready
+    index.refresh()  # edited notes are re-tokenized by the next search
+    assert index.vocabulary == full.vocabulary
+    assert index.topics == full.topics
+    assert index.todos == full.todos
+    assert index.owner == full.owner
+
+
+def test_build_in_steps_matches_a_full_build(data_path):
+    populate()
+    Todo.search_index.start()
+    steps = 0
+    while not Todo.search_index.build_step(0):
+        steps += 1
+    assert steps > 1
+    same_index(Todo.search_index, full_index())
+
+
+def test_changes_during_a_build_are_indexed(data_path):
+    populate()
+    index = Todo.search_index
+    index.start()
+    for _ in range(10):
+        index.build_step(0)
+    assert index.building()
+    # topics on both sides of the build front
+    Todo.rename_topic(0, "Renamed zeta")
+    Todo.rename_topic(25, "Later zeta")
+    Todo.delete_todo(1, 0)  # drops the only posting of "20"
+    Todo.delete_todo(28, 0)
+    Todo.app_state["topic_index"], Todo.app_state["todo_index"] = 2, 0
+    Todo.edit_notes(0, 0, "omega ")
+    Todo.delete_topic(3)
+    Todo.undo_log.undo()  # restores topic 3 under its old ID
+    Todo.delete_topic(29)
+    topic = Todo.create_topic("New delta")
+    Todo.insert_todo(topic, Todo.Todo("task 20"))  # "20" again
+    while not index.build_step(0):
+        pass
+    same_index(index, full_index())
+    assert index.search("zeta", 10)[0] == 2 + 40
+    assert index.search("omega", 10)[1] == [(Todo.app_state["topics"][2], Todo.app_state["todos"][Todo.app_state["topics"][2]][0])]
+
+
+def test_search_finishes_a_build(data_path):
+    populate(3, 3)
+    Todo.search_index.start()
+    assert Todo.search_index.search("gamma", 100)[0] == 9
+    assert Todo.search_index.ready
+    reset_state()
+    assert not Todo.search_index.building()
+
+
+def test_build_leaves_v2_topics_undecoded(data_path):
+    populate()
+    Todo.write_atomic(data_path, lambda f: Todo.write_snapshot_v2(f, Todo.freeze_state()), binary=True)
+    reset_state()
+    assert Todo.load_data(data_path)
+    todos_map = Todo.app_state["todos"]
+    index = Todo.search_index
+    index.start()
+    while not index.build_step(0):
+        pass
+    assert len(todos_map.blocks) == 30
+    assert index.search("alpha", 3)[0] == 15 + 15 * 20
+    assert len(todos_map.blocks) == 30
+    # a search decodes just the topics it lists
+    total, results = index.search("gamma", 5)
+    assert total == 600
+    assert [todo.name for _, todo in results] == [f"task {i}" for i in range(5)]
+    assert len(todos_map.blocks) == 29
+    same_index(index, full_index())
+    for topic in Todo.app_state["topics"]:
+        todos_map[topic]
+    assert not any(isinstance(key, tuple) for key in index.owner)
+    same_index(index, full_index())
+    assert index.search("task 599", 5)[1] == [(topic, todos_map[topic][19])]
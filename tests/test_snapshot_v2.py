@@ -0,0 +1,153 @@
+import os
+
+import pytest
+
+import Todo
+from conftest import dump_state, reload, reset_state
+
+ODD_TODOS = [
+    # name, priority, completed, created_at, deadline, notes
+    ("Padded", 0, False, "18-10-2026 09:05:03", "01-02-2026", ""),
+    ("Unpadded deadline", 1, True, "01-01-1970 00:00:00", "1-2-2026", "one\ntwo"),
+    ("Impossible date", 2, False, "yesterday", "31-02-2026", "café ☕"),
+    ("Free text", 3, False, "", "soon", "\n"),
+    ("No deadline", 3, True, "18-10-2026 9:05:03", None, "x" * 1000),
+]
+
+
+def populate():
+    for t in range(3):
+        topic = Todo.create_topic(f"Topic {t}")
+        for name, priority, completed, created, deadline, notes in ODD_TODOS:
+            Todo.insert_todo(topic, Todo.Todo(f"{name} {t}", priority, completed, created, deadline, notes))
+    Todo.create_topic("Empty")
+
+
+def convert(path, fmt, output):
+    assert Todo.run_cli(["--data", path, "convert", "--format", fmt, "-o", output]) == 0
+    reset_state()
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        return f.read(len(Todo.SNAPSHOT_HEADER_V2))
+
+
+def test_v1_v2_v1_round_trip(data_path, tmp_path):
+    populate()
+    expected = dump_state()
+    v1 = str(tmp_path / "a.todo")
+    Todo.write_atomic(v1, lambda f: Todo.write_snapshot(f, Todo.freeze_state()))
+    assert reload(v1) == expected
+
+    v2 = str(tmp_path / "b.todo")
+    convert(v1, "v2", v2)
+    assert read_header(v2) == Todo.SNAPSHOT_HEADER_V2
+    assert reload(v2) == expected
+
+    # written straight from undecoded blocks
+    back = str(tmp_path / "c.todo")
+    convert(v2, "v1", back)
+    with open(v1, "rb") as a, open(back, "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_undecoded_topics_survive_a_save(data_path):
+    populate()
+    expected = dump_state()
+    assert Todo.save_data(data_path)
+    reset_state()
+    assert Todo.load_data(data_path)
+    Todo.toggle_todo(1, 0)  # decodes one topic only
+    assert len(Todo.app_state["todos"].blocks) == 3
+    expected[1][2][0] = expected[1][2][0][:2] + (True,) + expected[1][2][0][3:]
+    assert Todo.save_data(data_path)
+    Todo.journal.path = None  # force a full snapshot
+    Todo.dirty.changes += 1
+    assert Todo.save_data(data_path)
+    assert reload(data_path) == expected
+
+
+def test_tally_matches_decoded_counts(data_path):
+    populate()
+    assert Todo.save_data(data_path)
+    reset_state()
+    assert Todo.load_data(data_path)
+    topics = list(Todo.app_state["topics"])
+    lazy = [list(Todo.topic_stats.counts(topic)) for topic in topics]
+    for topic in topics:
+        Todo.app_state["todos"][topic]
+    Todo.topic_stats.clear()
+    assert lazy == [Todo.topic_stats.counts(topic) for topic in topics]
+
+
+def topic_entries(data):
+    """(offset of the entry, [id, count, offset, length, name size]) per topic"""
+    pos = len(Todo.SNAPSHOT_HEADER_V2)
+    _, count = Todo.V2_HEADER.unpack_from(data, pos)
+    pos += Todo.V2_HEADER.size
+    entries = []
+    for _ in range(count):
+        entry = list(Todo.V2_TOPIC.unpack_from(data, pos))
+        entries.append((pos, entry))
+        pos += Todo.V2_TOPIC.size + entry[4]
+    return entries
+
+
+def test_damaged_topic_loads_empty(data_path):
+    populate()
+    assert Todo.save_data(data_path)
+    with open(data_path, "rb") as f:
+        data = bytearray(f.read())
+    entries = topic_entries(data)
+    pos, entry = entries[1]
+    entry[1] = 100000  # more todos than the block can hold
+    Todo.V2_TOPIC.pack_into(data, pos, *entry)
+    data[entries[2][1][2]] = 200  # out of range priority
+    with open(data_path, "wb") as f:
+        f.write(data)
+
+    reset_state()
+    assert Todo.load_data(data_path)
+    topics = list(Todo.app_state["topics"])
+    Todo.render_frame(100, 30)
+    assert [Todo.topic_stats.counts(t)[Todo.TopicStats.TOTAL] for t in topics] == [5, 0, 5, 0]
+    assert Todo.app_state["todos"][topics[1]] == []
+    assert Todo.app_state["todos"][topics[2]][0].priority == len(Todo.PRIORITIES) - 1
+
+
+def test_v1_out_of_range_priority_is_clamped(data_path):
+    topic = Todo.create_topic("Topic")
+    Todo.insert_todo(topic, Todo.Todo("Urgent", 0))
+    Todo.insert_todo(topic, Todo.Todo("Hand edited", 1))
+    Todo.write_atomic(data_path, lambda f: Todo.write_snapshot(f, Todo.freeze_state()))
+    with open(data_path, encoding="utf-8") as f:
+        text = f.read()
+    with open(data_path, "w", encoding="utf-8") as f:
+        f.write(text.replace("TODO_META:Hand edited\x1f1\x1f", "TODO_META:Hand edited\x1f9\x1f"))
+
+    reset_state()
+    assert Todo.load_data(data_path)
+    Todo.render_frame(100, 30)
+    counts = Todo.topic_stats.counts(topic)
+    assert counts[Todo.TopicStats.PRIORITY:Todo.TopicStats.PRIORITY + len(Todo.PRIORITIES)] == [1, 0, 0, 1]
+    assert Todo.app_state["todos"][topic][1].priority == len(Todo.PRIORITIES) - 1
+
+
+def test_truncated_file_fails_to_load(data_path):
+    populate()
+    assert Todo.save_data(data_path)
+    size = os.path.getsize(data_path)
+    with open(data_path, "r+b") as f:
+        f.truncate(size - 10)
+    reset_state()
+    assert not Todo.load_data(data_path)
+    assert Todo.app_state["status_msg"] == "Load failed: truncated TODO_V2 file"
+
+
+@pytest.mark.parametrize("deadline", ["01-02-2026", "1-2-2026", "31-02-2026", "soon", None])
+def test_deadline_round_trips_through_a_block(deadline):
+    todo = Todo.freeze_todo(Todo.Todo("x", 0, False, "yesterday", deadline, ""))
+    block = Todo.encode_topic_block([todo])
+    (decoded,) = Todo.decode_topic_block(block, 1, 0)
+    assert (decoded.deadline, decoded.created_at) == (deadline, "yesterday")
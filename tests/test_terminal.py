@@ -0,0 +1,131 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+import Todo
+
+
+def decode(*chunks, flush=False):
+    decoder = Todo.KeyDecoder()
+    for chunk in chunks:
+        decoder.feed(chunk)
+    if flush:
+        decoder.flush()
+    return list(decoder.tokens), decoder.pending
+
+
+@pytest.mark.parametrize("sequence, code", [
+    (b"\x1b[A", b"H"), (b"\x1b[B", b"P"), (b"\x1b[C", b"M"), (b"\x1b[D", b"K"),
+    (b"\x1b[H", b"G"), (b"\x1b[F", b"O"), (b"\x1bOA", b"H"), (b"\x1b[3~", b"S"),
+])
+def test_escape_sequences_become_scan_codes(sequence, code):
+    assert decode(sequence) == ([b"\xe0", code], b"")
+
+
+def test_sequence_split_across_reads():
+    assert decode(b"a\x1b", b"[", b"3", b"~b") == ([b"a", b"\xe0", b"S", b"b"], b"")
+
+
+def test_unknown_sequence_is_dropped():
+    assert decode(b"\x1b[1;5Px") == ([b"x"], b"")
+
+
+def test_control_keys_and_utf8():
+    tokens, pending = decode(b"\x7f\n\t", "é€".encode(), b"\xf0\x9f")
+    assert tokens == [b"\x08", b"\r", b"\t", "é".encode(), "€".encode()]
+    assert pending == b"\xf0\x9f"  # rest of the emoji still to come
+
+
+def test_lone_escape_waits_for_flush():
+    assert decode(b"\x1b") == ([], b"\x1b")
+    assert decode(b"\x1b", flush=True) == ([b"\x1b"], b"")
+    assert decode(b"\x1bx") == ([b"\x1b", b"x"], b"")
+    # Esc pressed just before an arrow key
+    assert decode(b"\x1b\x1b[A") == ([b"\x1b", b"\xe0", b"H"], b"")
+
+
+def test_bracketed_paste_split_across_reads():
+    text = b"line one\nline \x1b[A two"
+    chunks = [Todo.PASTE_START[:3], Todo.PASTE_START[3:] + text[:5], text[5:],
+              Todo.PASTE_END[:4], Todo.PASTE_END[4:] + b"q"]
+    tokens, pending = decode(*chunks)
+    assert tokens == [Todo.PASTE_START + text, b"q"]
+    assert pending == b""
+
+
+def test_flush_leaves_an_unfinished_paste_alone():
+    tokens, pending = decode(Todo.PASTE_START + b"abc\x1b", flush=True)
+    assert tokens == []
+
+
+def test_take_text_stops_at_keys():
+    decoder = Todo.KeyDecoder()
+    decoder.feed("ab\ncé".encode() + b"\x1b[Ad")
+    assert decoder.take_text() == "ab\ncé"
+    assert list(decoder.tokens) == [b"\xe0", b"H", b"d"]
+    decoder.tokens.clear()
+    decoder.feed(b"xy:z")
+    assert decoder.take_text(stop=b":") == "xy"
+
+
+def test_fake_backend_feeds_keys_and_keeps_output():
+    backend = Todo.FakeBackend(40, 10)
+    backend.feed("a\x1b[B")
+    assert backend.key_pending()
+    assert [backend.getch() for _ in range(3)] == [b"a", b"\xe0", b"P"]
+    with pytest.raises(EOFError):
+        backend.getch()
+    backend.feed(b"\x1b")  # each feed ends like a read timeout
+    assert backend.getch() == b"\x1b"
+    backend.write("hi")
+    assert backend.output == ["hi"] and backend.get_size() == (40, 10)
+
+
+def test_fake_backend_drives_the_app():
+    backend = Todo.FakeBackend(100, 30)
+    Todo.set_backend(backend)
+    Todo.app_state.update(topics=Todo.TopicRegistry(), todos={}, topic_index=0, todo_index=0,
+                          active_tab="topics", nav_mode=True, input_mode=False)
+    backend.feed("nHome\r")
+    while backend.key_pending():
+        Todo.handle_input()
+    Todo.render_frame(100, 30)
+    assert [Todo.topic_name(t) for t in Todo.app_state["topics"]] == ["Home"]
+    assert "Home" in Todo.strip_ansi("".join(backend.output))
+
+
+@pytest.mark.skipif(os.name != "posix", reason="POSIX terminal backend")
+def test_posix_backend_times_out_a_lone_escape(monkeypatch):
+    import pty
+    import tty
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+
+    class Stdin:
+        def fileno(self):
+            return slave
+
+    monkeypatch.setattr(sys, "stdin", Stdin())
+    backend = Todo.PosixBackend()
+    try:
+        os.write(master, b"\x1b")
+        start = time.perf_counter()
+        assert backend.wait(1)
+        assert time.perf_counter() - start >= Todo.ESC_SEQUENCE_TIMEOUT * 0.9
+        assert backend.getch() == b"\x1b"
+
+        # the rest of a sequence arriving within the timeout completes it
+        os.write(master, b"\x1b[")
+        rest = threading.Timer(Todo.ESC_SEQUENCE_TIMEOUT / 5, os.write, (master, b"A"))
+        rest.start()
+        assert [backend.getch(), backend.getch()] == [b"\xe0", b"H"]
+        rest.join()
+
+        backend.wake()
+        assert not backend.wait(1)  # woken, no key
+    finally:
+        os.close(master)
+        os.close(slave)
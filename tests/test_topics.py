@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+import Todo
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    """Chunks of up to 4 topics, so a few inserts split them"""
+    monkeypatch.setattr(Todo.TopicRegistry, "CHUNK", 2)
+
+
+def check(topics, order, names):
+    """Compare a registry with a plain list of IDs and a dict of names"""
+    assert list(topics) == order
+    assert len(topics) == len(order)
+    assert bool(topics) == bool(order)
+    assert [topics[i] for i in range(len(order))] == order
+    assert [topics[-i] for i in range(1, len(order) + 1)] == order[::-1]
+    assert [topics.index(topic) for topic in order] == list(range(len(order)))
+    for name in set(names.values()) | {"missing"}:
+        ids = [topic for topic in names if names[topic] == name]
+        assert topics.id_of(name) == (min(ids) if ids else None)
+    assert all(topics.name(topic) == names[topic] for topic in order)
+    chunks = topics.chunks
+    assert all(0 < len(c) <= 2 * Todo.TopicRegistry.CHUNK for c in chunks) or chunks == [[]]
+    assert all(topics.chunk_of[topic] is c for c in chunks for topic in c)
+    assert [topics.chunk_pos[id(c)] for c in chunks] == list(range(len(chunks)))
+
+
+def test_out_of_range():
+    topics = Todo.TopicRegistry()
+    with pytest.raises(IndexError):
+        topics[0]
+    with pytest.raises(ValueError):
+        topics.index(0)
+    topic = topics.add("a")
+    assert topics[-1] == topic
+    with pytest.raises(IndexError):
+        topics[1]
+    with pytest.raises(IndexError):
+        topics[-2]
+
+
+def test_chunks_split_and_empty_ones_go(small_chunks):
+    topics = Todo.TopicRegistry()
+    ids = [topics.add(str(i)) for i in range(5)]
+    assert topics.chunks == [ids[:2], ids[2:]]  # split in half past 4
+    for topic in ids[2:]:
+        topics.delete(topic)
+    assert topics.chunks == [ids[:2]]
+    check(topics, ids[:2], {topic: str(topic) for topic in ids[:2]})
+    for topic in ids[:2]:
+        topics.delete(topic)
+    assert topics.chunks == [[]]
+    check(topics, [], {})
+
+
+def test_duplicate_names_resolve_to_the_oldest():
+    topics = Todo.TopicRegistry()
+    first = topics.add("Work")
+    second = topics.add("Work", position=0)
+    assert topics.id_of("Work") == first
+    topics.rename(first, "Old work")
+    assert topics.id_of("Work") == second
+    topics.rename(first, "Work")
+    assert topics.id_of("Work") == first
+    topics.delete(first)
+    assert topics.id_of("Work") == second
+    topics.add("Work", topic_id=first)  # restored under its old ID
+    assert topics.id_of("Work") == first
+    assert list(topics) == [second, first]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_changes_match_a_list(small_chunks, seed):
+    rng = random.Random(seed)
+    topics = Todo.TopicRegistry()
+    order = []
+    names = {}
+    deleted = []
+    for _ in range(400):
+        op = rng.random()
+        if op < 0.4 or not order:
+            name = rng.choice("abc")
+            position = rng.choice([None, rng.randint(0, len(order) + 1)])
+            if deleted and rng.random() < 0.3:
+                topic = topics.add(name, position, topic_id=deleted.pop())
+            else:
+                topic = topics.add(name, position)
+            order.insert(len(order) if position is None else position, topic)
+            names[topic] = name
+        elif op < 0.6:
+            topic = rng.choice(order)
+            topics.delete(topic)
+            order.remove(topic)
+            del names[topic]
+            deleted.append(topic)
+        elif op < 0.85:
+            topic = rng.choice(order)
+            position = rng.randint(0, len(order))
+            topics.move(topic, position)
+            order.remove(topic)
+            order.insert(position, topic)
+        else:
+            topic = rng.choice(order)
+            names[topic] = rng.choice("abc")
+            topics.rename(topic, names[topic])
+        check(topics, order, names)
@@ -0,0 +1,122 @@
+import Todo
+
+
+def populate():
+    topic = Todo.create_topic("Topic")
+    Todo.add_todo(topic, "First", 0, None)
+    Todo.add_todo(topic, "Second", 1, None)
+    return topic
+
+
+def edit(todo_index, start, end, text):
+    Todo.app_state["topic_index"] = 0
+    Todo.app_state["todo_index"] = todo_index
+    Todo.edit_notes(start, end, text)
+
+
+def notes(todo_index):
+    return Todo.get_notes(Todo.app_state["todos"][Todo.app_state["topics"][0]][todo_index])
+
+
+def charged(log):
+    """Bytes the stacks actually hold, to check log.size against"""
+    return sum(entry[1] for entry in log.undo_stack) + sum(entry[1] for entry in log.redo_stack)
+
+
+def test_typing_is_one_step_up_to_a_newline(data_path):
+    populate()
+    log = Todo.undo_log
+    log.clear()
+    for i, ch in enumerate("ab\ncd"):
+        edit(0, i, i, ch)
+    assert [entry[0] for entry in log.undo_stack] == ["NOTES", "NOTES"]
+    assert log.size == charged(log) == 2 * log.OVERHEAD + 5
+    assert log.undo() == "notes edit"
+    assert notes(0) == "ab\n"
+    assert log.undo() == "notes edit"
+    assert notes(0) == ""
+    assert log.undo() is None
+    assert log.redo() == "notes edit"
+    assert log.redo() == "notes edit"
+    assert notes(0) == "ab\ncd"
+    assert log.size == charged(log)
+
+
+def test_backspace_and_delete_runs(data_path):
+    populate()
+    edit(0, 0, 0, "hello world")
+    log = Todo.undo_log
+    log.clear()
+    for i in (11, 10, 9):  # Backspace from the end
+        edit(0, i - 1, i, "")
+    for _ in range(2):  # Delete at the start
+        edit(0, 0, 1, "")
+    assert notes(0) == "llo wo"
+    assert len(log.undo_stack) == 2
+    log.undo()
+    assert notes(0) == "hello wo"
+    log.undo()
+    assert notes(0) == "hello world"
+
+
+def test_runs_end_on_a_jump_or_another_todo(data_path):
+    populate()
+    log = Todo.undo_log
+    log.clear()
+    edit(0, 0, 0, "a")
+    edit(0, 1, 1, "b")
+    edit(0, 0, 0, "c")  # jumped back
+    edit(1, 0, 0, "d")  # another todo
+    edit(1, 1, 1, "e")
+    Todo.toggle_todo(0, 1)
+    edit(1, 2, 2, "f")  # after another change
+    assert [len(entry[6]) if entry[0] == "NOTES" else None for entry in log.undo_stack] == [2, 1, 2, None, 1]
+    while log.undo():
+        pass
+    assert notes(0) == notes(1) == ""
+
+
+def test_oldest_entries_go_past_the_limit(data_path):
+    populate()
+    log = Todo.undo_log
+    log.clear()
+    log.limit = 3 * log.OVERHEAD + 10
+    for _ in range(5):
+        Todo.toggle_todo(0, 0)
+    assert len(log.undo_stack) == 3
+    assert log.size == charged(log) == 3 * log.OVERHEAD
+    # a typing run that outgrows the limit pushes out older entries
+    for i in range(200):
+        edit(1, i, i, "x")
+    assert [entry[0] for entry in log.undo_stack] == ["NOTES"]
+    assert log.size == charged(log) == log.OVERHEAD + 200
+    # an entry bigger than the limit is not kept at all
+    edit(0, 0, 0, "y" * (log.limit + 1))
+    assert not log.undo_stack
+    assert log.size == 0
+
+
+def test_redo_entries_count_and_go_on_a_new_change(data_path):
+    populate()
+    log = Todo.undo_log
+    log.clear()
+    edit(0, 0, 0, "first\n")
+    edit(0, 6, 6, "second")
+    log.undo()
+    log.undo()
+    assert not log.undo_stack and len(log.redo_stack) == 2
+    assert log.size == charged(log) == 2 * log.OVERHEAD + 12
+    Todo.toggle_todo(0, 0)
+    assert not log.redo_stack
+    assert log.size == charged(log) == log.OVERHEAD
+    assert log.redo() is None
+
+
+def test_limit_zero_records_nothing(data_path):
+    populate()
+    log = Todo.undo_log
+    log.clear()
+    log.limit = 0
+    Todo.toggle_todo(0, 0)
+    edit(0, 0, 0, "a")
+    assert not log.undo_stack and log.size == 0